@@ -0,0 +1,268 @@
+"""
+cancellation module
+
+Cancel the pool tasks of a job, or of a request whose client went away.
+A cancelled token is a Redis key, so the API and a separate job worker tier
+see the same state. The worker process running a task of a cancelled token
+kills the process groups of its external tools (ffmpeg, soffice, magick),
+the task then fails and removes its temp output like on any other failure.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Set
+
+import redis
+
+from Database.connection import get_redis
+from Helpers.subprocess_runner import kill_running_processes
+from config import settings
+
+CANCEL_KEY_PREFIX = "cancel:"
+
+# Routes whose requests run pool tasks long enough to be worth cancelling
+CANCELLABLE_PATH_PREFIXES = (
+    "/api/convert_to/",
+    "/api/compress/",
+    "/api/remove_background",
+    "/api/upload/",
+)
+
+# Token of the job or request submitting pool tasks, on the API/job worker side
+_cancel_token: ContextVar[Optional[str]] = ContextVar("cancel_token", default=None)
+
+# Tokens of the tasks running in this worker process, with their task count,
+# and the ones found cancelled. One watcher thread per process checks them all
+_watched_tokens: Dict[str, int] = {}
+_cancelled_tokens: Set[str] = set()
+_watch_lock = threading.Condition()
+_watcher: Optional[threading.Thread] = None
+
+
+class TaskCancelled(Exception):
+    """Raised in place of the result of a cancelled pool task"""
+
+
+def _cancel_key(token: str) -> str:
+    return f"{CANCEL_KEY_PREFIX}{token}"
+
+
+@contextmanager
+def cancellable(token: str) -> Iterator[None]:
+    """Make the pool tasks submitted in this block cancellable with token"""
+    context_token = _cancel_token.set(token)
+    try:
+        yield
+    finally:
+        _cancel_token.reset(context_token)
+
+
+def current_cancel_token() -> Optional[str]:
+    """The token set by cancellable, None outside a job or request"""
+    return _cancel_token.get()
+
+
+def cancel(token: str, redis_client: Optional[redis.Redis] = None) -> None:
+    """
+    Cancel the tasks of a token, the mark expires with the jobs
+
+    Parameters:
+    -----------
+        token(str): job id or request token
+        redis_client(redis.Redis): optional, the application client by default
+    """
+    (redis_client or get_redis()).set(_cancel_key(token), "1", ex=settings.JOB_TTL_SECONDS)
+
+
+def is_cancelled(token: str, redis_client: Optional[redis.Redis] = None) -> bool:
+    """Whether a token was cancelled, False when Redis can not be reached"""
+    try:
+        return bool((redis_client or get_redis()).exists(_cancel_key(token)))
+    except redis.RedisError:
+        return False
+
+
+def _discard_output(result) -> None:
+    """Remove the temp outputs of a task that finished after its cancellation"""
+    if isinstance(result, dict):
+        output_path = result.get("OutputFilePath")
+        if output_path and os.path.exists(output_path):
+            os.unlink(output_path)
+    elif isinstance(result, (list, tuple)):
+        for item in result:
+            _discard_output(item)
+
+
+def _cancelled_among(tokens: List[str]) -> List[str]:
+    """The tokens that were cancelled, checked in one Redis round trip"""
+    pipe = get_redis().pipeline(transaction=False)
+    for token in tokens:
+        pipe.exists(_cancel_key(token))
+    return [token for token, found in zip(tokens, pipe.execute()) if found]
+
+
+def _watch_tokens() -> None:
+    """
+    Watcher thread of a worker process, polls the watched tokens every
+    CANCEL_POLL_SECONDS and kills the external tools of the process while
+    one of its running tasks is cancelled
+    """
+    while True:
+        with _watch_lock:
+            while not _watched_tokens:
+                _watch_lock.wait()
+            _watch_lock.wait(settings.CANCEL_POLL_SECONDS)
+            tokens = [token for token in _watched_tokens if token not in _cancelled_tokens]
+
+        if tokens:
+            try:
+                found = _cancelled_among(tokens)
+            except redis.RedisError:
+                found = []
+        else:
+            found = []
+
+        with _watch_lock:
+            _cancelled_tokens.update(token for token in found if token in _watched_tokens)
+            # Keep going, the task may start another tool before it notices
+            if _cancelled_tokens:
+                kill_running_processes()
+
+
+def _watch(token: str) -> None:
+    """Add a token to the watched ones, starting the watcher of this process"""
+    global _watcher # pylint: disable=global-statement
+
+    with _watch_lock:
+        _watched_tokens[token] = _watched_tokens.get(token, 0) + 1
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch_tokens, daemon=True)
+            _watcher.start()
+        elif len(_watched_tokens) == 1:
+            # Wake the watcher up from waiting for a first token
+            _watch_lock.notify_all()
+
+
+def _unwatch(token: str) -> bool:
+    """Stop watching a token for one task, returns whether it was cancelled"""
+    with _watch_lock:
+        cancelled = token in _cancelled_tokens
+        _watched_tokens[token] -= 1
+        if not _watched_tokens[token]:
+            del _watched_tokens[token]
+            _cancelled_tokens.discard(token)
+        return cancelled
+
+
+def run_cancellable(token: str, func, *args):
+    """
+    Run a pool task that stops when its token is cancelled, runs in the worker
+
+    The watcher thread of the process polls the tokens of its running tasks
+    and once one is cancelled kills the external tools the task starts.
+    In-process work such as Pillow can not be interrupted, its result is
+    discarded.
+
+    Raises:
+    -------
+        TaskCancelled: if the token was cancelled before or while the task ran
+    """
+    if is_cancelled(token):
+        raise TaskCancelled("The task was cancelled before it started")
+
+    _watch(token)
+
+    try:
+        result = func(*args)
+    except Exception as e:
+        if _unwatch(token):
+            raise TaskCancelled("The task was cancelled") from e
+        raise
+
+    if _unwatch(token):
+        _discard_output(result)
+        raise TaskCancelled("The task was cancelled")
+
+    return result
+
+
+def _cancel_quietly(token: str) -> None:
+    """cancel, a Redis outage only leaves the tasks running"""
+    try:
+        cancel(token)
+    except redis.RedisError as e:
+        print(f"Failed to cancel the request tasks: {str(e)}")
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    Cancel the pool tasks of a conversion, compression or background removal
+    request when its client disconnects before the response is complete
+
+    This covers a streamed ZIP the client drops half way: the batches that
+    did not finish yet are cancelled along with their tools. Other requests,
+    such as a login or a job submission, get no token.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(CANCELLABLE_PATH_PREFIXES)
+            or not settings.CANCEL_ON_DISCONNECT
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        token = uuid.uuid4().hex
+        body_received = asyncio.Event()
+        response_complete = False
+        cancelled = False
+
+        def cancel_tasks() -> Optional[asyncio.Future]:
+            nonlocal cancelled
+            if cancelled or response_complete:
+                return None
+            cancelled = True
+            return asyncio.get_running_loop().run_in_executor(None, _cancel_quietly, token)
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.disconnect" or not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        async def watch_disconnect() -> None:
+            # The application reads the body first, then only a disconnect can come
+            await body_received.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+
+            pending = cancel_tasks()
+            if pending is not None:
+                await pending
+
+        watcher = asyncio.create_task(watch_disconnect())
+
+        try:
+            with cancellable(token):
+                await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            watcher.cancel()
+            # The response was cut short, by a disconnect or an error, what
+            # still runs for it is wasted. Not awaited, the cancel goes
+            # through even when this request is being cancelled itself
+            cancel_tasks()
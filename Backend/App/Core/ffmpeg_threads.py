@@ -0,0 +1,104 @@
+"""
+ffmpeg threads module
+
+Share the cores between the ffmpeg processes running at the same time.
+Without explicit -threads every ffmpeg sizes its thread pools for the whole
+machine, so a batch of videos on the worker pool oversubscribes the CPU
+many times over.
+"""
+import multiprocessing
+import os
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from config import settings
+
+# Number of leased ffmpeg jobs, of pool tasks submitted and not finished
+# yet and of pool workers, shared with the worker processes
+_running = multiprocessing.Value('i', 0)
+_pool_tasks = multiprocessing.Value('i', 0)
+_pool_workers = multiprocessing.Value('i', 1)
+
+
+def get_shared_counters() -> tuple:
+    """The shared counters, handed to the workers through the pool initializer"""
+    return _running, _pool_tasks, _pool_workers
+
+
+def init_ffmpeg_threads(running, pool_tasks, pool_workers) -> None:
+    """Use the counters of the parent process, called in every worker"""
+    global _running, _pool_tasks, _pool_workers # pylint: disable=global-statement
+    _running = running
+    _pool_tasks = pool_tasks
+    _pool_workers = pool_workers
+
+
+def set_pool_workers(workers: int) -> None:
+    """Size of the worker pool, set when it starts"""
+    _pool_workers.value = max(1, workers)
+
+
+def pool_task_submitted() -> None:
+    """Count a task handed to the worker pool"""
+    with _pool_tasks.get_lock():
+        _pool_tasks.value += 1
+
+
+def pool_task_finished() -> None:
+    """Count a pool task that finished, failed or was cancelled"""
+    with _pool_tasks.get_lock():
+        _pool_tasks.value = max(0, _pool_tasks.value - 1)
+
+
+def thread_budget() -> int:
+    """Cores shared by the ffmpeg jobs, FFMPEG_THREAD_BUDGET or every core"""
+    return settings.FFMPEG_THREAD_BUDGET or os.cpu_count() or 1
+
+
+def acquire_threads() -> int:
+    """
+    Lease a share of the budget for one ffmpeg job
+
+    The share is the budget divided by the ffmpeg jobs running or by the
+    busy pool workers, whichever is more. A lone job gets every core, and
+    in a full batch the first job already counts the tasks queued behind
+    it, so the jobs split the cores evenly instead of the early ones
+    keeping a larger share.
+
+    Returns:
+    --------
+        int: the number of threads to give ffmpeg
+    """
+    with _running.get_lock():
+        _running.value += 1
+        running = _running.value
+
+    busy_workers = min(_pool_tasks.value, _pool_workers.value)
+
+    return max(1, thread_budget() // max(running, busy_workers))
+
+
+def release_threads() -> None:
+    """Give back a lease taken with acquire_threads"""
+    with _running.get_lock():
+        _running.value = max(0, _running.value - 1)
+
+
+@contextmanager
+def ffmpeg_threads() -> Iterator[int]:
+    """Lease threads for the duration of an ffmpeg run"""
+    threads = acquire_threads()
+    try:
+        yield threads
+    finally:
+        release_threads()
+
+
+def decoder_thread_args(threads: int) -> List[str]:
+    """Global filter threads and decoder threads, goes before -i"""
+    return ['-filter_threads', str(threads), '-threads', str(threads)]
+
+
+def encoder_thread_args(threads: int) -> List[str]:
+    """Encoder threads, goes before the output"""
+    return ['-threads', str(threads)]
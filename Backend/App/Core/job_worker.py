@@ -0,0 +1,268 @@
+"""
+job worker module
+
+Consume queued jobs from Redis and run them on the shared worker pool.
+The consumer runs inside the API process when JOB_WORKER_ENABLED is set,
+or as its own tier with `python -m Core.job_worker` from the App folder.
+"""
+import asyncio
+import os
+import signal
+from pathlib import Path
+from typing import List, Set
+
+import redis
+
+from Database.connection import SessionLocal, get_redis
+from Repositories.job_repository import JobRepository
+from Repositories.conversion_repository import ConversionRepository
+from Repositories.compression_repository import CompressionRepository
+from Repositories.remove_background_repository import RemoveBackgroundRepository
+from Schemas.job import JobFileResult, JobSubmit
+from Core.worker_pool import get_worker_pool
+from Core.office_pool import get_office_pool
+from Core.progress import report_progress_to
+from Core.cancellation import cancel, cancellable, is_cancelled
+from Helpers.upload_spool import release_spooled
+from Helpers.zip_stream import discard_when_done
+from config import settings
+
+# operation -> (repository class, batch method, accepted options)
+JOB_OPERATIONS = {
+    "convert_image": (ConversionRepository, "convert_images_batch", {"output_format", "max_width", "max_height", "effort"}),
+    "convert_video_audio": (ConversionRepository, "convert_video_audio_batch", {"output_format", "timeout", "codec", "speed", "crf"}),
+    "convert_gif": (ConversionRepository, "convert_gif_batch", {"output_format", "timeout"}),
+    "convert_pdf": (ConversionRepository, "convert_pdf_office_batch", {"output_format", "timeout"}),
+    "compress_image": (CompressionRepository, "compress_images_batch", {"quality", "timeout", "effort", "engine", "target_bytes"}),
+    "compress_video": (CompressionRepository, "compress_videos_batch", {"quality", "timeout", "codec", "speed", "crf"}),
+    "compress_audio": (CompressionRepository, "compress_audios_batch", {"bitrate", "timeout"}),
+    "compress_pdf": (CompressionRepository, "compress_pdfs_batch", {"quality", "timeout"}),
+    "remove_background": (RemoveBackgroundRepository, "remove_backgrounds_batch", set()),
+}
+
+
+def download_name(job: JobSubmit, input_path: str) -> str:
+    """
+    Name of the output file inside the download, same as the sync endpoints
+    """
+    stem = Path(input_path).stem
+
+    if job.operation == "convert_pdf":
+        return f"{stem}.pdf"
+    if job.operation.startswith("convert"):
+        output_format = str(job.options.get("output_format", "")).lstrip('.').lower()
+        return f"{stem}.{output_format}"
+    if job.operation.startswith("compress"):
+        return f"{stem}_compressed{Path(input_path).suffix.lower()}"
+
+    return f"{stem}_removedbg.png"
+
+
+def _delete_outputs(output_paths: List[str]) -> None:
+    """Delete job outputs nobody will download"""
+    for output_path in output_paths:
+        try:
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+        except OSError as e:
+            print(f"Failed to delete job output {output_path}: {str(e)}")
+
+
+def sweep_job_outputs(redis_client: redis.Redis) -> None:
+    """Delete the outputs of the jobs that expired before they were downloaded"""
+    _delete_outputs(JobRepository.pop_expired_outputs(redis_client))
+
+
+async def run_output_sweeper(redis_client: redis.Redis, stop_event: asyncio.Event) -> None:
+    """
+    Sweep the expired job outputs in a thread every
+    JOB_OUTPUT_SWEEP_INTERVAL_SECONDS until stop_event is set
+    """
+    while not stop_event.is_set():
+        try:
+            await asyncio.to_thread(sweep_job_outputs, redis_client)
+        except redis.RedisError as e:
+            print(f"Job outputs could not be swept: {str(e)}")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.JOB_OUTPUT_SWEEP_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_job(redis_client: redis.Redis, job_id: str) -> None:
+    """
+    Run one queued job and keep its status up to date in Redis
+
+    Parameters:
+    -----------
+        redis_client(redis.Redis): the job store
+        job_id(str): the job to run
+    """
+    job = JobRepository.load_job(redis_client, job_id)
+    if job is None:
+        return
+
+    user_id, request, job_status = job
+    if job_status.status == "cancelled":
+        release_spooled(request.input_paths, job_id)
+        return
+
+    repository_class, method_name, option_names = JOB_OPERATIONS[request.operation]
+    options = {key: value for key, value in request.options.items() if key in option_names}
+
+    job_status.status = "running"
+    JobRepository.save_status(redis_client, job_status)
+
+    db = SessionLocal()
+    pending: List[asyncio.Future] = []
+    try:
+        repository = repository_class(db, user_id)
+        run_batch = getattr(repository, method_name)
+
+        # One batch per file so the progress moves as each file finishes,
+        # background removal keeps its chunks to share the forward pass and
+        # office documents share a soffice run when the listeners are down
+        if request.operation == "convert_pdf":
+            batches = await repository.office_batches(request.input_paths)
+        else:
+            chunk_size = max(1, settings.REMBG_BATCH_SIZE) if request.operation == "remove_background" else 1
+            batches = [
+                request.input_paths[i:i + chunk_size]
+                for i in range(0, len(request.input_paths), chunk_size)
+            ]
+        pending = [run_batch(batch, **options) for batch in batches]
+
+        # The tasks copy the context here, their ffmpeg runs publish progress
+        # and stop when the job is cancelled
+        with report_progress_to(JobRepository.events_channel(job_id)), cancellable(job_id):
+            pending = [asyncio.ensure_future(batch) for batch in pending]
+
+        for next_done in asyncio.as_completed(pending):
+            batch_results = await next_done
+            # Deleted when the job expires if nobody downloads them
+            JobRepository.track_outputs(redis_client, [
+                output_path for _, output_path, _, success in batch_results if success and output_path
+            ])
+
+            for input_path, output_path, output_size, success in batch_results:
+                search = getattr(repository, "target_searches", {}).get(input_path, {})
+                job_status.results.append(JobFileResult(
+                    input_path=input_path,
+                    output_path=output_path or None,
+                    output_size=output_size or 0,
+                    download_name=download_name(request, input_path),
+                    success=success,
+                    quality=search.get("Quality"),
+                    iterations=search.get("Iterations"),
+                    target_reached=search.get("TargetReached")
+                ))
+                if success:
+                    job_status.completed += 1
+                else:
+                    job_status.failed += 1
+
+            job_status.progress = (job_status.completed + job_status.failed) / job_status.total
+            JobRepository.save_status(redis_client, job_status)
+
+        if await asyncio.to_thread(is_cancelled, job_id, redis_client):
+            # Nobody will download the outputs that finished before the cancel
+            _delete_outputs([result.output_path for result in job_status.results if result.output_path])
+            job_status.status = "cancelled"
+            job_status.error = "The job was cancelled"
+        elif job_status.completed:
+            job_status.status = "completed"
+        else:
+            job_status.status = "failed"
+            job_status.error = "All the files failed"
+
+    except Exception as e:
+        print(f"Job {job_id} failed: {str(e)}")
+        job_status.status = "failed"
+        job_status.error = str(e)
+
+        # Stop the batches still running, a failed job has nothing to download
+        try:
+            await asyncio.to_thread(cancel, job_id, redis_client)
+        except redis.RedisError:
+            pass
+        discard_when_done(pending)
+        _delete_outputs([result.output_path for result in job_status.results if result.output_path])
+
+    finally:
+        db.close()
+        JobRepository.save_status(redis_client, job_status)
+        release_spooled(request.input_paths, job_id)
+
+
+async def run_worker(stop_event: asyncio.Event) -> None:
+    """
+    Pop jobs from the queue until stop_event is set
+
+    At most JOB_WORKER_CONCURRENCY jobs run at the same time, the running
+    jobs are awaited before returning. The outputs of expired jobs are
+    swept meanwhile.
+    """
+    redis_client = get_redis()
+    slots = asyncio.Semaphore(settings.JOB_WORKER_CONCURRENCY)
+    running: Set[asyncio.Task] = set()
+    output_sweeper = asyncio.create_task(run_output_sweeper(redis_client, stop_event))
+
+    async def _run(job_id: str) -> None:
+        try:
+            await run_job(redis_client, job_id)
+        finally:
+            slots.release()
+
+    while not stop_event.is_set():
+        await slots.acquire()
+
+        try:
+            job_id = await asyncio.to_thread(JobRepository.pop_next_job_id, redis_client, 1)
+        except redis.RedisError as e:
+            slots.release()
+            print(f"Job queue unavailable: {str(e)}")
+            await asyncio.sleep(5)
+            continue
+
+        if job_id is None:
+            slots.release()
+            continue
+
+        task = asyncio.create_task(_run(job_id))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    await output_sweeper
+
+
+async def main() -> None:
+    """Run a standalone worker tier"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    worker_pool = get_worker_pool()
+    worker_pool.start()
+    if settings.WORKER_POOL_WARMUP:
+        await worker_pool.warm_up()
+
+    office_pool = get_office_pool()
+    if settings.OFFICE_POOL_ENABLED:
+        await office_pool.start()
+
+    try:
+        await run_worker(stop_event)
+    finally:
+        worker_pool.shutdown(wait=settings.WORKER_POOL_DRAIN_ON_SHUTDOWN)
+        office_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,374 @@
+"""
+office pool module
+
+Long running headless LibreOffice listeners for office to PDF. Each
+listener is a unoserver process with its own soffice and persistent
+profile, documents are handed to it over XML-RPC so a conversion no
+longer pays for starting soffice and creating a profile. A listener is
+restarted after OFFICE_POOL_MAX_CONVERSIONS documents, when it crashed,
+when a document runs past its timeout and when the job or request of the
+document is cancelled.
+
+Needs unoserver 2.x on PATH (pip install unoserver, with the Python that
+LibreOffice's uno module works in). Without it the repositories fall back
+to one soffice per document.
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import xmlrpc.client
+from pathlib import Path
+from typing import List, Optional
+
+from Core.cancellation import TaskCancelled, current_cancel_token, is_cancelled
+from Helpers.subprocess_runner import new_process_group_kwargs, kill_pid_tree
+from config import settings
+
+HEALTH_CHECK_TIMEOUT = 5
+# Idle listeners are pinged before use after this many seconds
+HEALTH_CHECK_INTERVAL = 60
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    """XML-RPC transport with a socket timeout"""
+    def __init__(self, timeout: float):
+        super().__init__()
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self._timeout
+        return connection
+
+
+class OfficeListener:
+    """
+    One unoserver process and its soffice, converting one document at a time
+    """
+    def __init__(self, index: int, unoserver_path: str, soffice_path: str):
+        self.index = index
+        self.unoserver_path = unoserver_path
+        self.soffice_path = soffice_path
+        self.port = settings.OFFICE_POOL_BASE_PORT + 2 * index
+        self.uno_port = self.port + 1
+        self.profile_dir = Path(settings.OFFICE_POOL_PROFILE_DIR) / f"listener_{index}"
+
+        self.process: Optional[subprocess.Popen] = None
+        self.conversions = 0
+        self.last_used = 0.0
+        # Set by cancel, for the document being converted
+        self.cancelled = False
+
+    def _proxy(self, timeout: float) -> xmlrpc.client.ServerProxy:
+        return xmlrpc.client.ServerProxy(
+            f"http://127.0.0.1:{self.port}",
+            transport=_TimeoutTransport(timeout),
+            allow_none=True
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        """
+        Start the listener and wait until it answers
+
+        Raises:
+        -------
+            RuntimeError: if it did not come up within OFFICE_POOL_START_TIMEOUT
+        """
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+        self.process = subprocess.Popen(
+            [
+                self.unoserver_path,
+                '--interface', '127.0.0.1',
+                '--port', str(self.port),
+                '--uno-port', str(self.uno_port),
+                '--executable', self.soffice_path,
+                '--user-installation', self.profile_dir.absolute().as_uri(),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **new_process_group_kwargs()
+        )
+        self.conversions = 0
+
+        deadline = time.monotonic() + settings.OFFICE_POOL_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if not self.is_running:
+                break
+            if self.ping():
+                self.last_used = time.monotonic()
+                return
+            time.sleep(0.5)
+
+        self.stop()
+        raise RuntimeError(f"LibreOffice listener {self.index} did not start on port {self.port}")
+
+    def stop(self) -> None:
+        """Kill unoserver together with its soffice"""
+        if self.process is not None:
+            if self.process.poll() is None:
+                kill_pid_tree(self.process.pid)
+            self.process.wait()
+            self.process = None
+
+    def restart(self) -> None:
+        self.stop()
+        self.start()
+
+    def cancel(self) -> None:
+        """
+        Kill the listener in the middle of a document, called from another
+        thread than the one in convert. The caller restarts it afterwards
+        """
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.poll() is None:
+            kill_pid_tree(process.pid)
+
+    def ping(self) -> bool:
+        """Health check, the listener answers over XML-RPC"""
+        try:
+            self._proxy(HEALTH_CHECK_TIMEOUT).info()
+            return True
+        except xmlrpc.client.Fault:
+            # Older unoserver without info(), it still answered
+            return True
+        except (OSError, xmlrpc.client.Error):
+            return False
+
+    def ensure_healthy(self) -> None:
+        """Restart a crashed listener, ping one that sat idle for a while"""
+        if not self.is_running:
+            print(f"LibreOffice listener {self.index} is down, restarting it")
+            self.restart()
+        elif time.monotonic() - self.last_used > HEALTH_CHECK_INTERVAL and not self.ping():
+            print(f"LibreOffice listener {self.index} does not answer, restarting it")
+            self.restart()
+
+    def convert(self, input_path: str, output_path: str, timeout: float) -> None:
+        """
+        Convert one document to PDF
+
+        Raises:
+        -------
+            TimeoutError: if the document ran past timeout, the listener is restarted
+            ValueError: if the conversion failed
+        """
+        self.cancelled = False
+        self.ensure_healthy()
+
+        try:
+            # convert(inpath, indata, outpath, convert_to, filtername, filter_options, update_index, infiltername)
+            self._proxy(timeout).convert(input_path, None, output_path, "pdf", None, [], True, None)
+        except TimeoutError as e:
+            self.restart()
+            raise TimeoutError(f"LibreOffice conversion timed out after {timeout}s") from e
+        except xmlrpc.client.Fault as e:
+            raise ValueError(f"LibreOffice conversion failed: {e.faultString}") from e
+        except OSError as e:
+            if self.cancelled:
+                raise ValueError("LibreOffice conversion was cancelled") from e
+            # The listener died during the document
+            self.restart()
+            raise ValueError(f"LibreOffice listener failed: {str(e)}") from e
+        finally:
+            self.conversions += 1
+            self.last_used = time.monotonic()
+
+        if self.conversions >= settings.OFFICE_POOL_MAX_CONVERSIONS:
+            # soffice grows with every document, start from a clean process
+            self.restart()
+
+
+class OfficePool:
+    """
+    Fixed set of LibreOffice listeners handing out one idle listener per
+    document
+    """
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._listeners: List[OfficeListener] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._failed = False
+
+    @staticmethod
+    def _executables() -> Optional[tuple]:
+        """(unoserver, soffice) paths, None when one is missing"""
+        unoserver_path = shutil.which("unoserver")
+        soffice_path = shutil.which("soffice") or shutil.which("libreoffice")
+        if unoserver_path is None or soffice_path is None:
+            return None
+        return unoserver_path, soffice_path
+
+    @property
+    def is_running(self) -> bool:
+        return self._idle is not None
+
+    async def start(self) -> bool:
+        """
+        Start the listeners if the pool is enabled and unoserver is installed
+
+        Returns:
+        --------
+            bool: whether the pool can take documents
+        """
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._idle is not None:
+                return True
+            if self._failed or not settings.OFFICE_POOL_ENABLED:
+                return False
+
+            executables = self._executables()
+            if executables is None:
+                self._failed = True
+                return False
+
+            listeners = [OfficeListener(index, *executables) for index in range(self.size)]
+            started = await asyncio.gather(
+                *[asyncio.to_thread(listener.start) for listener in listeners],
+                return_exceptions=True
+            )
+
+            idle: asyncio.Queue = asyncio.Queue()
+            for listener, error in zip(listeners, started):
+                if isinstance(error, Exception):
+                    print(f"Failed to start LibreOffice listener: {str(error)}")
+                    continue
+                self._listeners.append(listener)
+                idle.put_nowait(listener)
+
+            if not self._listeners:
+                self._failed = True
+                return False
+
+            self._idle = idle
+            return True
+
+    async def convert_to_pdf(self, input_path: str, timeout: float = 300) -> dict:
+        """
+        Convert an office document to PDF on the next idle listener
+
+        Parameters:
+        -----------
+            input_path(str): the document
+            timeout(float): timeout in seconds of this document
+
+        Returns:
+        --------
+            dict: same fields as ConversionRepository._convert_office_to_pdf_sync
+
+        Raises:
+        -------
+            RuntimeError: if the pool is not running
+            TimeoutError, ValueError: if the conversion failed
+            TaskCancelled: if the job or request of the document was cancelled
+        """
+        if self._idle is None:
+            raise RuntimeError("The LibreOffice pool is not running")
+
+        input_path_obj = Path(input_path)
+        if not input_path_obj.exists():
+            raise FileNotFoundError(f"File {input_path} not found!")
+
+        # Runs in the API process, not through run_cancellable, so the token is checked here
+        token = current_cancel_token()
+        if token is not None and await asyncio.to_thread(is_cancelled, token):
+            raise TaskCancelled("The task was cancelled before it started")
+
+        output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        output_path = output_file.name
+        output_file.close()
+
+        listener: OfficeListener = await self._idle.get()
+        start_time = time.perf_counter()
+        conversion: Optional[asyncio.Future] = None
+
+        try:
+            conversion = asyncio.ensure_future(
+                asyncio.to_thread(listener.convert, str(input_path_obj.absolute()), output_path, timeout)
+            )
+            try:
+                if token is not None:
+                    await self._cancel_on_token(token, listener, conversion)
+                await conversion
+            except asyncio.CancelledError:
+                # The request went away, do not leave its document running
+                listener.cancel()
+                raise
+
+            if os.path.getsize(output_path) == 0:
+                raise ValueError("Generated PDF file is empty")
+        except BaseException as e:
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+            if listener.cancelled and isinstance(e, Exception):
+                raise TaskCancelled("The task was cancelled") from e
+            raise
+        finally:
+            if listener.cancelled:
+                await self._restart_cancelled(listener, conversion)
+            self._idle.put_nowait(listener)
+
+        end_time = time.perf_counter()
+        output_size = os.path.getsize(output_path)
+
+        return {
+            "OriginalFileName": input_path_obj.stem,
+            "OriginalFileSize": os.path.getsize(input_path),
+            "OriginalFilePath": str(input_path),
+            "OutputFileName": Path(output_path).stem,
+            "OutputFileSize": output_size,
+            "OutputFilePath": output_path,
+            "TaskStatus": output_size > 0,
+            "InputFormat": input_path_obj.suffix.lstrip('.').upper(),
+            "OutputFormat": 'pdf',
+            "TaskTime": end_time - start_time
+        }
+
+    @staticmethod
+    async def _cancel_on_token(token: str, listener: OfficeListener, conversion: asyncio.Future) -> None:
+        """Poll the token every CANCEL_POLL_SECONDS while the document converts"""
+        while True:
+            done, _ = await asyncio.wait({conversion}, timeout=settings.CANCEL_POLL_SECONDS)
+            if done:
+                return
+            if await asyncio.to_thread(is_cancelled, token):
+                listener.cancel()
+                return
+
+    @staticmethod
+    async def _restart_cancelled(listener: OfficeListener, conversion: Optional[asyncio.Future]) -> None:
+        """Bring a listener killed by cancel back before it is handed out again"""
+        if conversion is not None:
+            await asyncio.wait({conversion})
+        try:
+            await asyncio.to_thread(listener.restart)
+        except RuntimeError as e:
+            # ensure_healthy tries again with the next document
+            print(f"Failed to restart LibreOffice listener {listener.index}: {str(e)}")
+
+    def shutdown(self) -> None:
+        """Stop every listener"""
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        self._idle = None
+
+
+office_pool = OfficePool(settings.OFFICE_POOL_SIZE)
+
+
+def get_office_pool() -> OfficePool:
+    """Get the application LibreOffice pool"""
+    return office_pool
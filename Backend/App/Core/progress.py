@@ -0,0 +1,132 @@
+"""
+progress module
+
+Publish the progress of the files of a job while they run. The job worker
+names a Redis channel with report_progress_to, every pool task submitted
+under it runs with that channel set in the worker process and run_ffmpeg
+publishes ffmpeg's -progress reports to it.
+"""
+import json
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+import redis
+
+from Database.connection import get_redis
+from Helpers.media_probe import ffprobe_path_for, probe_media, media_duration
+from Helpers.subprocess_runner import run_ffmpeg_with_progress, run_process
+
+# Channel of the job being submitted, on the API/job worker side
+_progress_channel: ContextVar[Optional[str]] = ContextVar("progress_channel", default=None)
+
+# Channel of the task running in this worker process
+_worker_channel: Optional[str] = None
+
+
+@contextmanager
+def report_progress_to(channel: str) -> Iterator[None]:
+    """Publish the progress of the pool tasks submitted in this block to a channel"""
+    token = _progress_channel.set(channel)
+    try:
+        yield
+    finally:
+        _progress_channel.reset(token)
+
+
+def current_progress_channel() -> Optional[str]:
+    """The channel set by report_progress_to, None outside a job"""
+    return _progress_channel.get()
+
+
+def run_with_progress(channel: str, func, *args):
+    """Run a pool task with its progress published to channel, runs in the worker"""
+    global _worker_channel # pylint: disable=global-statement
+
+    _worker_channel = channel
+    try:
+        return func(*args)
+    finally:
+        _worker_channel = None
+
+
+def publish_event(channel: str, event: str, data: dict) -> None:
+    """Publish one event, a Redis outage only loses the event"""
+    try:
+        get_redis().publish(channel, json.dumps({"event": event, "data": data}, default=str))
+    except redis.RedisError as e:
+        print(f"Failed to publish {event} event: {str(e)}")
+
+
+def _media_duration(ffmpeg_path: str, input_path: str) -> Optional[float]:
+    """Duration of the input in seconds, None when ffprobe can not tell"""
+    ffprobe_path = ffprobe_path_for(ffmpeg_path)
+    if ffprobe_path is None:
+        return None
+
+    try:
+        return media_duration(probe_media(input_path, ffprobe_path))
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def _out_time(block: Dict[str, str]) -> Optional[float]:
+    """Position of the encode in seconds, out_time_ms is in microseconds too"""
+    for key in ("out_time_us", "out_time_ms"):
+        try:
+            return int(block[key]) / 1_000_000
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def run_ffmpeg(cmd, timeout: Optional[float], input_path: str) -> subprocess.CompletedProcess:
+    """
+    Run ffmpeg like run_process, publishing its progress when the task
+    belongs to a job
+
+    Each event has the input path, the progress from 0 to 1 against the
+    ffprobe duration (None when the duration is unknown), the encoded time
+    in seconds and the output size so far.
+
+    Parameters:
+    -----------
+        cmd(List[str]): ffmpeg command and arguments, the output is not stdout
+        timeout(float): maximum time in seconds
+        input_path(str): the file the events are reported for
+
+    Raises:
+    -------
+        subprocess.TimeoutExpired: if the command did not finish in time
+    """
+    channel = _worker_channel
+    if channel is None:
+        return run_process(cmd, timeout=timeout)
+
+    duration = _media_duration(cmd[0], input_path)
+
+    def on_progress(block: Dict[str, str]) -> None:
+        out_time = _out_time(block)
+
+        if block.get("progress") == "end":
+            progress: Optional[float] = 1.0
+        elif duration and out_time is not None:
+            progress = min(max(out_time / duration, 0.0), 1.0)
+        else:
+            progress = None
+
+        try:
+            total_size = int(block.get("total_size", ""))
+        except ValueError:
+            total_size = None
+
+        publish_event(channel, "progress", {
+            "input_path": input_path,
+            "progress": progress,
+            "out_time": out_time,
+            "total_size": total_size,
+            "speed": block.get("speed"),
+        })
+
+    return run_ffmpeg_with_progress(cmd, timeout, on_progress)
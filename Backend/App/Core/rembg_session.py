@@ -0,0 +1,104 @@
+"""
+rembg session module
+
+Keep one rembg session per process, so the ONNX model is loaded once per
+worker instead of once per image, and run several images through it in
+one forward pass.
+"""
+import os
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from config import settings
+
+# Sessions whose predict() is a single u2net style forward pass
+U2NET_SESSIONS = {"U2netSession", "U2netpSession", "U2netHumanSegSession", "SiluetaSession"}
+U2NET_MEAN = (0.485, 0.456, 0.406)
+U2NET_STD = (0.229, 0.224, 0.225)
+U2NET_SIZE = (320, 320)
+
+_session = None
+_session_model: Optional[str] = None
+
+
+def get_rembg_session(model_name: Optional[str] = None):
+    """
+    Get the rembg session of this process, creating it on first use
+
+    Parameters:
+    -----------
+        model_name(str): rembg model, defaults to settings.REMBG_MODEL_NAME
+
+    Returns:
+    --------
+        rembg BaseSession with the model loaded
+    """
+    global _session, _session_model # pylint: disable=global-statement
+    # pylint: disable=import-outside-toplevel
+    import rembg
+
+    model_name = model_name or settings.REMBG_MODEL_NAME
+
+    if _session is None or _session_model != model_name:
+        # rembg builds the ONNX Runtime session options from OMP_NUM_THREADS
+        if settings.REMBG_INTRA_OP_THREADS:
+            os.environ["OMP_NUM_THREADS"] = str(settings.REMBG_INTRA_OP_THREADS)
+
+        _session = rembg.new_session(model_name)
+        _session_model = model_name
+
+    return _session
+
+
+def predict_masks(session, images: List[Image.Image]) -> List[Image.Image]:
+    """
+    Predict the foreground masks of several images
+
+    For u2net style models the images go through the network as one tensor
+    batch when the model has a dynamic batch axis, otherwise one after the
+    other on the same session. Other models fall back to session.predict.
+
+    Parameters:
+    -----------
+        session: rembg session from get_rembg_session
+        images(List[Image.Image]): RGB images
+
+    Returns:
+    --------
+        List[Image.Image]: one "L" mask per image, at the size of the image
+    """
+    if type(session).__name__ not in U2NET_SESSIONS:
+        return [session.predict(image)[0] for image in images]
+
+    feeds = [session.normalize(image, U2NET_MEAN, U2NET_STD, U2NET_SIZE) for image in images]
+    model_input = session.inner_session.get_inputs()[0]
+
+    if isinstance(model_input.shape[0], int):
+        predictions = np.concatenate([session.inner_session.run(None, feed)[0] for feed in feeds])
+    else:
+        batch = np.concatenate([feed[model_input.name] for feed in feeds])
+        predictions = session.inner_session.run(None, {model_input.name: batch})[0]
+
+    masks = []
+    for image, prediction in zip(images, predictions[:, 0, :, :]):
+        low, high = np.min(prediction), np.max(prediction)
+        prediction = (prediction - low) / (high - low) if high > low else np.zeros_like(prediction)
+
+        mask = Image.fromarray((prediction * 255).astype("uint8"), mode="L")
+        masks.append(mask.resize(image.size, Image.Resampling.LANCZOS))
+
+    return masks
+
+
+def cut_out(image: Image.Image, mask: Image.Image) -> Image.Image:
+    """Apply a mask to an image like rembg.remove does"""
+    empty = Image.new("RGBA", image.size, 0)
+    return Image.composite(image.convert("RGBA"), empty, mask)
+
+
+def open_for_removal(input_path: str) -> Image.Image:
+    """Open an image with its EXIF orientation applied, like rembg.remove does"""
+    with Image.open(input_path) as image:
+        return ImageOps.exif_transpose(image).convert("RGB")
@@ -0,0 +1,382 @@
+"""
+result cache module
+
+Content-addressed cache for conversion and compression outputs. The key is
+the hash of the input content plus the operation and its settings, the
+outputs are stored on local disk with size-bounded LRU eviction and the
+index lives in SQLite so every worker process shares it.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from config import settings
+
+# Bump when the encoder settings change so stale outputs are not served
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+# Memoized input digests kept, the most recently hashed ones
+MAX_DIGESTS = 10000
+
+# Fields of the result dict that describe one particular call
+PER_CALL_FIELDS = {
+    "OriginalFileName",
+    "OriginalFileSize",
+    "OriginalFilePath",
+    "OutputFileName",
+    "OutputFileSize",
+    "OutputFilePath",
+    "TaskTime",
+    "CacheHit",
+}
+
+
+class ResultCache:
+    """
+    Disk cache of outputs with a SQLite index
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / "index.sqlite3"
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    metadata TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS digests (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, one per call so it is safe across processes"""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def file_digest(self, input_path: str) -> str:
+        """
+        Get the sha256 of a file, memoized by path, mtime and size
+        """
+        stat = os.stat(input_path)
+        abs_path = os.path.abspath(input_path)
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest FROM digests WHERE path = ? AND mtime = ? AND size = ?",
+                (abs_path, stat.st_mtime, stat.st_size)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        sha256 = hashlib.sha256()
+        with open(input_path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO digests (path, mtime, size, digest) VALUES (?, ?, ?, ?)",
+                (abs_path, stat.st_mtime, stat.st_size, digest)
+            )
+        return digest
+
+    def make_key(self, input_path: str, operation: str, params: dict) -> str:
+        """
+        Build the cache key from the input content, operation and settings
+        """
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "input": self.file_digest(input_path),
+            "operation": operation,
+            "params": params,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _link_or_copy(source: str, destination: str) -> None:
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def get(self, key: str) -> Optional[Tuple[str, dict]]:
+        """
+        Look up a key and hand out a private copy of the cached output
+
+        Returns:
+        --------
+            Tuple[str, dict]: (temp_output_path, metadata) or None on a miss
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path, metadata FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or not os.path.exists(row[0]):
+                if row is not None:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._increment(conn, "misses")
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._increment(conn, "hits")
+
+        cached_path, metadata = row
+        # The caller deletes its output after the response, so never give out the cached file
+        output_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}{Path(cached_path).suffix}")
+        self._link_or_copy(cached_path, output_path)
+
+        return output_path, json.loads(metadata)
+
+    def contains(self, key: str) -> bool:
+        """
+        Check for a key without touching the counters or the LRU order
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+
+        return row is not None and os.path.exists(row[0])
+
+    def put(self, key: str, output_path: str, metadata: dict) -> None:
+        """
+        Store an output under a key and evict the least recently used entries
+        """
+        cached_path = self.cache_dir / f"{key}{Path(output_path).suffix}"
+        staging_path = self.cache_dir / f".{uuid.uuid4().hex}.tmp"
+
+        self._link_or_copy(output_path, str(staging_path))
+        os.replace(staging_path, cached_path)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, path, size, metadata, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, str(cached_path), os.path.getsize(cached_path), json.dumps(metadata, default=str), time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # A replaced digest gets a new rowid, so the lowest rowids were hashed longest ago
+        conn.execute(
+            "DELETE FROM digests WHERE rowid NOT IN "
+            "(SELECT rowid FROM digests ORDER BY rowid DESC LIMIT ?)",
+            (MAX_DIGESTS,)
+        )
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, path, size in conn.execute(
+            "SELECT key, path, size FROM entries ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._increment(conn, "evictions")
+            total -= size
+
+    def stats(self) -> dict:
+        """
+        Get the hit/miss counters and the current size of the cache
+        """
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+
+        return {
+            "enabled": True,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the per-process result cache, None when caching is disabled
+    """
+    global _result_cache # pylint: disable=global-statement
+
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+
+    if _result_cache is None:
+        _result_cache = ResultCache(settings.RESULT_CACHE_DIR, settings.RESULT_CACHE_MAX_BYTES)
+
+    return _result_cache
+
+
+def is_cached(operation: str, input_path: str, params: dict) -> bool:
+    """
+    Whether a cached_result function would be served from the cache
+
+    Parameters:
+    -----------
+        operation(str): name of the operation, as given to cached_result
+        input_path(str): the input file
+        params(dict): the key_args of the operation and their values
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return False
+
+    try:
+        return cache.contains(cache.make_key(input_path, operation, params))
+    except (OSError, sqlite3.Error):
+        return False
+
+
+def store_result(operation: str, input_path: str, params: dict, data: dict) -> None:
+    """
+    Store an output made outside a cached_result function under the key
+    that function uses, so the next call with the same settings is a hit
+
+    Parameters:
+    -----------
+        operation(str): name of the operation, as given to cached_result
+        input_path(str): the input file
+        params(dict): the key_args of the operation and their values
+        data(dict): the result dict, with OutputFilePath
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return
+
+    try:
+        cache.put(
+            cache.make_key(input_path, operation, params),
+            data["OutputFilePath"],
+            {name: value for name, value in data.items() if name not in PER_CALL_FIELDS}
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Failed to store result in cache: {str(e)}")
+
+
+def cached_result(operation: str, key_args: Tuple[str, ...]):
+    """
+    Cache the output of a sync worker function
+
+    The decorated function takes an `input_path` argument and returns the
+    result dict used to record the task. On a hit the stored output is
+    returned without running the function, so no subprocess is launched.
+
+    Parameters:
+    -----------
+        operation(str): name of the operation, part of the key
+        key_args(Tuple[str, ...]): arguments that change the output
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_result_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            input_path = bound.arguments["input_path"]
+
+            start_time = time.perf_counter()
+
+            try:
+                key = cache.make_key(
+                    input_path,
+                    operation,
+                    {name: bound.arguments[name] for name in key_args}
+                )
+                hit = cache.get(key)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Result cache unavailable: {str(e)}")
+                return func(*args, **kwargs)
+
+            if hit is not None:
+                output_path, metadata = hit
+                return {
+                    **metadata,
+                    "OriginalFileName": Path(input_path).stem,
+                    "OriginalFileSize": os.path.getsize(input_path),
+                    "OriginalFilePath": input_path,
+                    "OutputFileName": Path(output_path).stem,
+                    "OutputFileSize": os.path.getsize(output_path),
+                    "OutputFilePath": output_path,
+                    "TaskTime": time.perf_counter() - start_time,
+                    "CacheHit": True,
+                }
+
+            data = func(*args, **kwargs)
+            if data.get("TimedOut"):
+                # Cut short by a deadline, a later run may find a better output
+                return data
+
+            try:
+                cache.put(
+                    key,
+                    data["OutputFilePath"],
+                    {name: value for name, value in data.items() if name not in PER_CALL_FIELDS}
+                )
+            except (OSError, sqlite3.Error) as e:
+                print(f"Failed to store result in cache: {str(e)}")
+
+            data["CacheHit"] = False
+            return data
+
+        return wrapper
+
+    return decorator
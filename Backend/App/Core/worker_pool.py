@@ -0,0 +1,166 @@
+"""
+worker pool module
+
+One application-scoped process pool shared by every repository, so a batch
+request only pays for the conversion work and not for forking interpreters.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, Optional
+
+from Core.ffmpeg_threads import get_shared_counters, init_ffmpeg_threads, set_pool_workers, pool_task_submitted, pool_task_finished
+from Core.progress import current_progress_channel, run_with_progress
+from Core.cancellation import current_cancel_token, run_cancellable
+from config import settings
+
+
+def _init_worker(ffmpeg_counters) -> None:
+    """
+    Import the heavy libraries and load the rembg model once per worker process
+    """
+    # pylint: disable=import-outside-toplevel
+    # pylint: disable=unused-import
+    from PIL import Image
+
+    init_ffmpeg_threads(*ffmpeg_counters)
+
+    if settings.WORKER_POOL_PRELOAD_REMBG:
+        from Core.rembg_session import get_rembg_session
+        get_rembg_session()
+
+
+def _warm_up_task() -> bool:
+    """No-op task used to force every worker to spawn"""
+    return True
+
+
+class WorkerPool:
+    """
+    Long-lived ProcessPoolExecutor with warm-up and graceful drain
+    """
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, multiprocessing.cpu_count() - 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """
+        Get the underlying executor, starting it on first use
+        """
+        if self._executor is None:
+            self.start()
+        return self._executor  # type: ignore
+
+    @property
+    def is_running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """
+        Create the executor if it is not running yet
+        """
+        if self._executor is None:
+            set_pool_workers(self.max_workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(get_shared_counters(),)
+            )
+
+    async def warm_up(self) -> None:
+        """
+        Spawn every worker now instead of on the first request
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self.executor, _warm_up_task)
+            for _ in range(self.max_workers)
+        ])
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting work and let the running tasks drain
+
+        Parameters:
+        -----------
+            wait(bool): block until the submitted tasks are finished
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+
+worker_pool = WorkerPool(settings.WORKER_POOL_SIZE or None)
+
+
+def get_worker_pool() -> WorkerPool:
+    """Get the application worker pool"""
+    return worker_pool
+
+
+def submit_to_pool(func, *args) -> asyncio.Future:
+    """
+    Submit a picklable function to the shared worker pool
+
+    Inside report_progress_to the task publishes its progress to the
+    channel of the job, inside cancellable it stops when the token is
+    cancelled. The task counts as busy for the ffmpeg thread budget from
+    submission until it is done.
+
+    Returns:
+    --------
+        asyncio.Future: awaitable future bound to the running event loop
+    """
+    loop = asyncio.get_running_loop()
+
+    token = current_cancel_token()
+    if token is not None:
+        func, args = run_cancellable, (token, func, *args)
+
+    channel = current_progress_channel()
+    if channel is not None:
+        func, args = run_with_progress, (channel, func, *args)
+
+    pool_task_submitted()
+    try:
+        future = loop.run_in_executor(worker_pool.executor, func, *args)
+    except Exception:
+        pool_task_finished()
+        raise
+
+    future.add_done_callback(lambda _: pool_task_finished())
+    return future
+
+
+def failed_future(error: Exception) -> asyncio.Future:
+    """Future that already failed, for an input turned down before it reached the pool"""
+    future = asyncio.get_running_loop().create_future()
+    future.set_exception(error)
+    return future
+
+
+async def iter_completed(futures: Iterable[asyncio.Future]) -> AsyncIterator[asyncio.Future]:
+    """
+    Yield the given futures as they complete without blocking the event loop
+
+    Unlike asyncio.as_completed this yields the original futures, so they
+    can still be used as dictionary keys by the caller.
+    """
+    pending = set(futures)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            yield future
+
+
+async def run_in_pool(func, *args):
+    """
+    Run a picklable function on the shared worker pool
+
+    Parameters:
+    -----------
+        func: module level function or staticmethod
+        args: positional arguments for the function
+    """
+    return await submit_to_pool(func, *args)
@@ -27,6 +27,9 @@ def get_db():
     finally:
         db.close()
 
+def get_redis() -> redis.Redis:
+    return r
+
 def init_db():
     # pylint: disable=import-outside-toplevel
     # pylint: disable=unused-import
@@ -0,0 +1,25 @@
+"""Result cache handler"""
+
+from fastapi import APIRouter, Depends
+
+from Core.dependencies import get_current_user
+from Core.result_cache import get_result_cache
+from Entities.user import User
+
+router = APIRouter()
+
+@router.get('/cache/stats', response_model=dict)
+def get_cache_stats(
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    """
+    Get the hit/miss counters and the size of the result cache
+
+    A plain def, FastAPI runs it in its thread pool so the SQLite queries
+    do not block the event loop
+    """
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return {"enabled": False}
+
+    return result_cache.stats()
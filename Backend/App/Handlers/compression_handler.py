@@ -3,10 +3,8 @@ Compression handler module with file streaming
 """
 
 import os
-import tempfile
 from pathlib import Path
-import zipfile
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.responses import FileResponse
@@ -16,10 +14,41 @@ from starlette.background import BackgroundTask
 from Database.connection import get_db
 from Core.dependencies import get_current_user
 from Entities.user import User
-from Repositories.compression_repository import CompressionRepository
+from Repositories.compression_repository import CompressionRepository, CompressionEngine, TARGET_SIZE_FORMATS, PDF_QUALITY_SETTINGS
+from Helpers.zip_stream import zip_streaming_response
+from Helpers.media_probe import rejected_media
+from Helpers.encoder_profiles import EffortProfile
+from Helpers.video_codecs import VideoCodec, VideoSpeed, resolve_video_options
 
 router = APIRouter()
 
+# Most files per request of each endpoint
+MAX_IMAGE_FILES = 50
+MAX_VIDEO_FILES = 20
+MAX_AUDIO_FILES = 50
+MAX_PDF_FILES = 50
+
+VIDEO_MEDIA_TYPES = {
+    'mp4': 'video/mp4',
+    'mov': 'video/quicktime',
+    'avi': 'video/x-msvideo',
+    'mkv': 'video/x-matroska',
+    'webm': 'video/webm',
+    'flv': 'video/x-flv',
+    'wmv': 'video/x-ms-wmv'
+}
+
+AUDIO_MEDIA_TYPES = {
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+    'm4a': 'audio/mp4',
+    'aac': 'audio/aac',
+    'opus': 'audio/opus',
+    'wma': 'audio/x-ms-wma'
+}
+
 def cleanup_temp_file(filepath: str):
     """Delete temporary file after response is sent"""
     try:
@@ -40,7 +69,10 @@ async def compress_image(
     input_paths: List[str] = Body(...),
     quality: int = Body(85),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    effort: Optional[EffortProfile] = Body(None),
+    engine: Optional[CompressionEngine] = Body(None),
+    target_bytes: Optional[int] = Body(None, gt=0)
 ) -> FileResponse:
     """
     Compress image and return the compressed file as download
@@ -51,12 +83,17 @@ async def compress_image(
     ----------
     - input_paths(List[str]): the path of the input files
     - reduce_colors(bool): whether to reduce colors for PNG (better compression)
+    - effort(str): optional encoder effort, fast, balanced or max (smallest, slowest)
+    - engine(str): optional, pillow compresses JPEG/PNG/WebP/TIFF in process,
+      imagemagick handles every format, auto picks per file
+    - target_bytes(int): optional, JPEG and WebP only, search the highest
+      quality up to `quality` that fits under this size
     """
 
     if not input_paths:
         raise FileNotFoundError("File not found!")
     
-    if len(input_paths) > 50:
+    if len(input_paths) > MAX_IMAGE_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Too much files"
@@ -65,14 +102,38 @@ async def compress_image(
     input_format = Path(input_paths[0]).suffix.lstrip('.').upper()
     is_single_file = len(input_paths) == 1
 
+    if target_bytes is not None and any(
+        Path(input_path).suffix.lstrip('.').lower() not in TARGET_SIZE_FORMATS for input_path in input_paths
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="target_bytes only supports JPEG and WebP images"
+        )
+
     compression_repo = CompressionRepository(db, current_user.UserID)
 
     try:
-        if is_single_file:
-            output_path, compressed_file_size = await compression_repo.compress_image(input_paths[0], quality, 300)
-            results = [(input_paths[0], output_path, compressed_file_size, True)]
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [compression_repo.compress_images_batch([input_path], quality, 300, effort, engine, target_bytes) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}_compressed.{input_format.lower()}",
+                f"compressed_files_{input_format.lower()}.zip"
+            )
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All compressions failed"
+                )
+            return response
+
+        search = None
+        if target_bytes is not None:
+            search = await compression_repo.compress_image_to_target(input_paths[0], target_bytes, quality, 300, effort)
+            output_path, compressed_file_size = search["OutputFilePath"], search["OutputFileSize"]
         else:
-            results = await compression_repo.compress_images_batch(input_paths, quality, 300)
+            output_path, compressed_file_size = await compression_repo.compress_image(input_paths[0], quality, 300, effort, engine)
+        results = [(input_paths[0], output_path, compressed_file_size, bool(output_path))]
 
         successful_results = [r for r in results if r[3]]  
         failed_results = [r for r in results if not r[3]]  
@@ -86,70 +147,41 @@ async def compress_image(
         total_original_size = sum(os.path.getsize(r[0]) for r in successful_results)
         total_converted_size = sum(r[2] for r in successful_results)
 
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}_compressed.{input_format.lower()}"
-
-            media_types = {
-                'PNG': 'image/png',
-                'JPG': 'image/jpeg',
-                'JPEG': 'image/jpeg',
-                'WEBP': 'image/webp',
-                'GIF': 'image/gif',
-                'BMP': 'image/bmp',
-                'TIFF': 'image/tiff'
-            }
-            
-            media_type = media_types.get(input_format, 'image/png')
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-            
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-            
-            return response
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}_compressed.{input_format.lower()}"
+
+        media_types = {
+            'PNG': 'image/png',
+            'JPG': 'image/jpeg',
+            'JPEG': 'image/jpeg',
+            'WEBP': 'image/webp',
+            'GIF': 'image/gif',
+            'BMP': 'image/bmp',
+            'TIFF': 'image/tiff'
+        }
         
-        else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, compressed_file_size, _ in successful_results:
-                        original_filename = Path(input_path).stem 
-                        converted_filename = f"{original_filename}_compressed.{input_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f"compressed_files_{input_format.lower()}.zip",
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
+        media_type = media_types.get(input_format, 'image/png')
+
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
+        
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+
+        if search is not None:
+            response.headers["X-Compression-Quality"] = str(search["Quality"])
+            response.headers["X-Compression-Iterations"] = str(search["Iterations"])
+            response.headers["X-Target-Reached"] = str(search["TargetReached"]).lower()
+        
+        return response
 
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-                
-                return response
-                
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -163,7 +195,10 @@ async def compress_video(
     input_paths: List[str] = Body(...),
     quality: str = Body("medium"),  # "low", "medium", "high"
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    codec: Optional[VideoCodec] = Body(None),
+    speed: Optional[VideoSpeed] = Body(None),
+    crf: Optional[int] = Body(None, ge=0, le=63)
 ) -> FileResponse:
     """
     Compress video files and return as download
@@ -177,6 +212,10 @@ async def compress_video(
     -----------
         input_paths(List[str]): paths to input video files
         quality(str): compression quality preset
+        codec(str): optional video codec, default (MPEG4/VP9), h264, hevc or
+            av1, falls back to default when the container or ffmpeg lacks it
+        speed(str): optional encoder speed, veryfast, faster, fast, medium or slow
+        crf(int): optional, overrides the CRF the quality preset picks
     """
     if not input_paths:
         raise HTTPException(
@@ -184,7 +223,7 @@ async def compress_video(
             detail="No input files provided"
         )
     
-    if len(input_paths) > 20:
+    if len(input_paths) > MAX_VIDEO_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Too many files (max 20)"
@@ -193,22 +232,43 @@ async def compress_video(
     if quality not in ["low", "medium", "high"]:
         quality = "medium"
 
+    codec, speed = resolve_video_options(codec, speed)
+
     input_format = Path(input_paths[0]).suffix.lstrip('.').lower()
     is_single_file = len(input_paths) == 1
 
     compression_repo = CompressionRepository(db, current_user.UserID)
 
     try:
-        if is_single_file:
-            output_path, compressed_size = await compression_repo.compress_video(
-                input_paths[0], quality, 600
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [compression_repo.compress_videos_batch([input_path], quality, 600, codec, speed, crf) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}_compressed.{input_format}",
+                f"compressed_videos_{quality}.zip",
+                "X-Total-Compressed-Size"
             )
-            results = [(input_paths[0], output_path, compressed_size, True)]
-        else:
-            results = await compression_repo.compress_videos_batch(
-                input_paths, quality, 600
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All video compressions failed"
+                )
+            return response
+
+        # A corrupt or unsupported file is turned down before it takes a worker
+        rejected = await rejected_media(input_paths, compression_repo.ffmpeg_path, "video")
+        if rejected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=rejected[input_paths[0]]
             )
 
+        # Not piped like conversions, the ratio headers need the output size
+        output_path, compressed_size = await compression_repo.compress_video(
+            input_paths[0], quality, 600, codec, speed, crf
+        )
+        results = [(input_paths[0], output_path, compressed_size, True)]
+
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
         
@@ -221,73 +281,27 @@ async def compress_video(
         total_original_size = sum(os.path.getsize(r[0]) for r in successful_results)
         total_compressed_size = sum(r[2] for r in successful_results)
 
-        if is_single_file and successful_results:
-            input_path, output_path, compressed_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}_compressed.{input_format}"
-
-            media_types = {
-                'mp4': 'video/mp4',
-                'mov': 'video/quicktime',
-                'avi': 'video/x-msvideo',
-                'mkv': 'video/x-matroska',
-                'webm': 'video/webm',
-                'flv': 'video/x-flv',
-                'wmv': 'video/x-ms-wmv'
-            }
-            
-            media_type = media_types.get(input_format, 'video/mp4')
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-            
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
-            response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
-            
-            return response
+        input_path, output_path, compressed_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}_compressed.{input_format}"
+
+        media_type = VIDEO_MEDIA_TYPES.get(input_format, 'video/mp4')
+
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
         
-        else:
-            # Multiple files - create ZIP
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, _, _ in successful_results:
-                        original_filename = Path(input_path).stem
-                        compressed_filename = f"{original_filename}_compressed.{input_format}"
-                        zipf.write(output_path, compressed_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f"compressed_videos_{quality}.zip",
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
+        response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
+        
+        return response
 
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
-                response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
-                
-                return response
-                
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -324,7 +338,7 @@ async def compress_audio(
             detail="No input files provided"
         )
     
-    if len(input_paths) > 50:
+    if len(input_paths) > MAX_AUDIO_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Too many files (max 50)"
@@ -341,16 +355,35 @@ async def compress_audio(
     compression_repo = CompressionRepository(db, current_user.UserID)
 
     try:
-        if is_single_file:
-            output_path, compressed_size = await compression_repo.compress_audio(
-                input_paths[0], bitrate, 300
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [compression_repo.compress_audios_batch([input_path], bitrate, 300) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}_compressed.{input_format}",
+                f"compressed_audio_{bitrate}.zip",
+                "X-Total-Compressed-Size"
             )
-            results = [(input_paths[0], output_path, compressed_size, True)]
-        else:
-            results = await compression_repo.compress_audios_batch(
-                input_paths, bitrate, 300
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All audio compressions failed"
+                )
+            return response
+
+        # A corrupt or unsupported file is turned down before it takes a worker
+        rejected = await rejected_media(input_paths, compression_repo.ffmpeg_path, "audio")
+        if rejected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=rejected[input_paths[0]]
             )
 
+        # Not piped like conversions, the ratio headers need the output size
+        output_path, compressed_size = await compression_repo.compress_audio(
+            input_paths[0], bitrate, 300
+        )
+        results = [(input_paths[0], output_path, compressed_size, True)]
+
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
         
@@ -363,80 +396,128 @@ async def compress_audio(
         total_original_size = sum(os.path.getsize(r[0]) for r in successful_results)
         total_compressed_size = sum(r[2] for r in successful_results)
 
-        if is_single_file and successful_results:
-            input_path, output_path, compressed_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}_compressed.{input_format}"
-
-            media_types = {
-                'mp3': 'audio/mpeg',
-                'wav': 'audio/wav',
-                'ogg': 'audio/ogg',
-                'flac': 'audio/flac',
-                'm4a': 'audio/mp4',
-                'aac': 'audio/aac',
-                'opus': 'audio/opus',
-                'wma': 'audio/x-ms-wma'
-            }
-            
-            media_type = media_types.get(input_format, 'audio/mpeg')
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-            
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
-            response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
-            response.headers["X-Bitrate"] = bitrate
-            
-            return response
+        input_path, output_path, compressed_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}_compressed.{input_format}"
+
+        media_type = AUDIO_MEDIA_TYPES.get(input_format, 'audio/mpeg')
+
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
         
-        else:
-            # Multiple files - create ZIP
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, _, _ in successful_results:
-                        original_filename = Path(input_path).stem
-                        compressed_filename = f"{original_filename}_compressed.{input_format}"
-                        zipf.write(output_path, compressed_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f"compressed_audio_{bitrate}.zip",
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
+        response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
+        response.headers["X-Bitrate"] = bitrate
+        
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Audio compression failed: {str(e)}"
+        ) from e
+
+
+@router.post("/compress/pdf")
+async def compress_pdf(
+    input_paths: List[str] = Body(...),
+    quality: str = Body("medium"),  # "low", "medium", "high"
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> FileResponse:
+    """
+    Compress PDF files and return as download
+
+    Quality presets:
+    - "low": images downsampled to 72 dpi, for screen viewing
+    - "medium": images downsampled to 150 dpi, ebook quality
+    - "high": images downsampled to 300 dpi, print quality
+
+    Parameters:
+    -----------
+        input_paths(List[str]): paths to input PDF files
+        quality(str): compression quality preset
+    """
+    if not input_paths:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No input files provided"
+        )
 
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Compressed-Size"] = str(total_compressed_size)
-                response.headers["X-Compression-Ratio"] = f"{(1 - total_compressed_size/total_original_size)*100:.1f}%"
-                response.headers["X-Bitrate"] = bitrate
-                
-                return response
-                
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
+    if len(input_paths) > MAX_PDF_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Too many files (max 50)"
+        )
+
+    not_pdf = [Path(input_path).name for input_path in input_paths if Path(input_path).suffix.lower() != '.pdf']
+    if not_pdf:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only PDF files can be compressed here: {', '.join(not_pdf)}"
+        )
+
+    if quality not in PDF_QUALITY_SETTINGS:
+        quality = "medium"
+
+    is_single_file = len(input_paths) == 1
+
+    compression_repo = CompressionRepository(db, current_user.UserID)
+
+    try:
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [compression_repo.compress_pdfs_batch([input_path], quality, 300) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}_compressed.pdf",
+                f"compressed_pdf_{quality}.zip",
+                "X-Total-Compressed-Size"
+            )
+            if response is None:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
-            
+                    detail="All PDF compressions failed"
+                )
+            return response
+
+        output_path, compressed_size = await compression_repo.compress_pdf(
+            input_paths[0], quality, 300
+        )
+
+        original_size = os.path.getsize(input_paths[0])
+
+        response = FileResponse(
+            path=output_path,
+            media_type='application/pdf',
+            filename=f"{Path(input_paths[0]).stem}_compressed.pdf",
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
+
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = "0"
+        response.headers["X-Total-Original-Size"] = str(original_size)
+        response.headers["X-Total-Compressed-Size"] = str(compressed_size)
+        response.headers["X-Compression-Ratio"] = f"{(1 - compressed_size/original_size)*100:.1f}%" if original_size else "0.0%"
+        response.headers["X-Quality"] = quality
+
+        return response
+
     except HTTPException:
         raise
+    except ValueError as e:
+        # Ghostscript could not compress this PDF, its error is in the message
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Audio compression failed: {str(e)}"
-        ) from e
\ No newline at end of file
+            detail=f"PDF compression failed: {str(e)}"
+        ) from e
@@ -2,23 +2,35 @@
 Conversion handler module with file streaming
 """
 
+import asyncio
 import os
-import tempfile
-import zipfile
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from starlette.background import BackgroundTask
 
 from Database.connection import get_db
 from Core.dependencies import get_current_user
 from Entities.user import User
-from Repositories.conversion_repository import ConversionRepository
+from Repositories.conversion_repository import ConversionRepository, PDF_IMAGE_FORMATS
+from Helpers.zip_stream import zip_streaming_response, discard_when_done
+from Helpers.ffmpeg_pipe import is_pipeable
+from Helpers.media_probe import rejected_media
+from Helpers.encoder_profiles import EffortProfile
+from Helpers.video_codecs import VideoCodec, VideoSpeed, resolve_video_options
+from Core.result_cache import is_cached
+from config import settings
 router = APIRouter()
 
+# Most files per request of each endpoint
+MAX_IMAGE_FILES = 5
+MAX_VIDEO_AUDIO_FILES = 5
+MAX_GIF_FILES = 50
+MAX_PDF_FILES = 50
+
 def cleanup_temp_file(filepath: str):
     """Delete temporary file after response is sent"""
     try:
@@ -38,7 +50,10 @@ async def convert_image_handler(
     input_paths: List[str] = Body(..., alias="input_paths"),
     output_format: str = Body(..., alias="output_format"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    max_width: Optional[int] = Body(None, gt=0),
+    max_height: Optional[int] = Body(None, gt=0),
+    effort: Optional[EffortProfile] = Body(None)
 ) -> FileResponse:
     """
     Convert image(s) - works for single or multiple files
@@ -47,11 +62,15 @@ async def convert_image_handler(
     ----------
     - input_paths(List[str]): list of input file paths (can be 1 or many)
     - output_format(str): desired output format (e.g., "png", "jpg")
+    - max_width, max_height(int): optional, shrink to fit keeping the aspect
+      ratio, large JPEGs are decoded at a reduced scale
+    - effort(str): optional encoder effort, fast, balanced or max (smallest, slowest)
 
     Returns:
     --------
     - Single file: Returns the converted file directly
-    - Multiple files: Returns ZIP file with all converted files
+    - Multiple files: Returns a ZIP streamed as each file finishes, the file
+      counts and size totals are in its last entry, manifest.json
 
     Example Requests:
     ----------------
@@ -80,7 +99,7 @@ async def convert_image_handler(
             detail="Failed when convert images"
         )
 
-    if len(input_paths) > 5:
+    if len(input_paths) > MAX_IMAGE_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Fail because send too much files"
@@ -94,11 +113,27 @@ async def convert_image_handler(
     try:
         conversion_repo = ConversionRepository(db, current_user.UserID)
 
-        if is_single_file:
-            output_path, converted_file_size = await conversion_repo.convert_image(input_paths[0], output_format)
-            results = [(input_paths[0], output_path, converted_file_size, True)]
-        else:
-            results = await conversion_repo.convert_images_batch(input_paths, output_format)
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [
+                    conversion_repo.convert_images_batch([input_path], output_format, max_width, max_height, effort)
+                    for input_path in input_paths
+                ],
+                lambda input_path: f"{Path(input_path).stem}.{output_format.lower()}",
+                f'converted_images_{output_format.lower()}.zip'
+            )
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All the conversions failed"
+                )
+            return response
+
+        output_path, converted_file_size = await conversion_repo.convert_image(
+            input_paths[0], output_format, max_width, max_height, effort
+        )
+        results = [(input_paths[0], output_path, converted_file_size, True)]
 
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
@@ -113,57 +148,24 @@ async def convert_image_handler(
         total_converted_size = sum(r[2] for r in successful_results)
 
 
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}.{output_format.lower()}"
-
-            response = FileResponse(
-                path=output_path,
-                media_type=f"image/{output_format.lower()}",
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-
-            # Add statistics headers
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-
-            return response
-        else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, converted_size, success in successful_results:
-                        original_filename = Path(input_path).stem
-                        converted_filename = f"{original_filename}.{output_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f'converted_images_{output_format.lower()}.zip',
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}.{output_format.lower()}"
 
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        response = FileResponse(
+            path=output_path,
+            media_type=f"image/{output_format.lower()}",
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
 
-                return response
+        # Add statistics headers
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
 
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
+        return response
 
     except HTTPException:
         raise
@@ -178,7 +180,10 @@ async def convert_video_audio(
     input_paths: List[str] = Body(..., alias="input_paths"),
     output_format: str = Body(..., alias="output_format"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    codec: Optional[VideoCodec] = Body(None),
+    speed: Optional[VideoSpeed] = Body(None),
+    crf: Optional[int] = Body(None, ge=0, le=63)
 ) -> FileResponse:
     """
     Convert video/audio file(s) - works for single or multiple files
@@ -187,11 +192,23 @@ async def convert_video_audio(
     ----------
     - input_paths(List[str]): list of input file paths (can be 1 or many)
     - output_format(str): desired output format (e.g., "mp4", "mp3")
+    - codec(str): optional video codec, default (MPEG4/VP8), h264, hevc or
+      av1, falls back to default when the container or ffmpeg lacks it
+    - speed(str): optional encoder speed, veryfast, faster, fast, medium or slow
+    - crf(int): optional constant rate factor of h264/hevc/av1
+
+    When the streams already fit the output container and no codec change
+    or CRF is asked for, they are copied instead of re-encoded. The single
+    file response says which in the X-Conversion-Path header (remux or transcode).
 
     Returns:
     --------
-    - Single file: Returns the converted file directly
-    - Multiple files: Returns ZIP file with all converted files
+    - Single file: Returns the converted file directly, formats ffmpeg can
+      write to a pipe are streamed as they are encoded. Such a response has
+      no Content-Length and no X-Total-Converted-Size header. A repeated
+      request is served from the result cache the first one filled
+    - Multiple files: Returns a ZIP streamed as each file finishes, the file
+      counts and size totals are in its last entry, manifest.json
 
     Example:
     --------
@@ -220,7 +237,7 @@ async def convert_video_audio(
             detail="No input paths provided"
         )
 
-    if len(input_paths) > 5:
+    if len(input_paths) > MAX_VIDEO_AUDIO_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Maximum 50 video/audio files per request"
@@ -228,22 +245,60 @@ async def convert_video_audio(
 
     is_single_file = len(input_paths) == 1
     output_format_upper = output_format.lstrip('.').upper()
+    codec, speed = resolve_video_options(codec, speed)
 
     try:
         conversion_repo = ConversionRepository(db, current_user.UserID)
 
-        if is_single_file:
-            # Single file - use direct method
-            output_path, converted_size = await conversion_repo.convert_video_audio(
-                input_paths[0], output_format, 300
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [conversion_repo.convert_video_audio_batch([input_path], output_format, 300, codec, speed, crf) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}.{output_format.lower()}",
+                f'converted_files_{output_format.lower()}.zip'
             )
-            results = [(input_paths[0], output_path, converted_size, True)]
-        else:
-            # Multiple files - use batch method with multiprocessing
-            results = await conversion_repo.convert_video_audio_batch(
-                input_paths, output_format, 300
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All conversions failed"
+                )
+            return response
+
+        # A corrupt or unsupported file is turned down before it takes a worker
+        rejected = await rejected_media(input_paths, conversion_repo.ffmpeg_path)
+        if rejected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=rejected[input_paths[0]]
+            )
+
+        # Stream copy when the streams already fit the container, probed once per input
+        conversion_path = await conversion_repo.conversion_path(input_paths[0], output_format, codec, crf)
+
+        if settings.FFMPEG_PIPE_OUTPUT and is_pipeable(output_format) and not await asyncio.to_thread(
+            is_cached, "convert_video_audio", input_paths[0],
+            {"output_format": output_format, "codec": codec, "speed": speed, "crf": crf, "remux": conversion_path == "remux"}
+        ):
+            # Pipe ffmpeg's output into the response, the only file written is the result cache copy
+            # X-Total-Converted-Size is only known once the stream ended, it is left out
+            stream = await conversion_repo.stream_video_audio(input_paths[0], output_format, 300, codec, speed, crf)
+            return StreamingResponse(
+                stream,
+                media_type="video/mp4" if output_format.lower() in ['mp4', 'avi', 'mov', 'mkv', 'webm'] else "audio/mpeg",
+                headers={
+                    "Content-Disposition": f'attachment; filename="{Path(input_paths[0]).stem}.{output_format.lower()}"',
+                    "X-Total-Files": "1",
+                    "X-Failed-Files": "0",
+                    "X-Total-Original-Size": str(os.path.getsize(input_paths[0])),
+                    "X-Conversion-Path": conversion_path
+                }
             )
 
+        output_path, converted_size = await conversion_repo.convert_video_audio(
+            input_paths[0], output_format, 300, codec, speed, crf
+        )
+        results = [(input_paths[0], output_path, converted_size, True)]
+
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
 
@@ -259,61 +314,27 @@ async def convert_video_audio(
         total_converted_size = sum(r[2] for r in successful_results)
 
         # SINGLE FILE: Return file directly
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}.{output_format.lower()}"
-
-            # Determine media type
-            media_type = "video/mp4" if output_format.lower() in ['mp4', 'avi', 'mov', 'mkv', 'webm'] else "audio/mpeg"
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-
-            return response
-
-        # MULTIPLE FILES: Create and return ZIP
-        else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, converted_size, success in successful_results:
-                        original_filename = Path(input_path).stem
-                        converted_filename = f"{original_filename}.{output_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f'converted_files_{output_format.lower()}.zip',
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
-
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}.{output_format.lower()}"
+
+        # Determine media type
+        media_type = "video/mp4" if output_format.lower() in ['mp4', 'avi', 'mov', 'mkv', 'webm'] else "audio/mpeg"
+
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
 
-                return response
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        response.headers["X-Conversion-Path"] = conversion_path
 
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
+        return response
 
     except HTTPException:
         raise
@@ -352,7 +373,7 @@ async def convert_gifs(
             detail="No input paths provided"
         )
 
-    if len(input_paths) > 50:
+    if len(input_paths) > MAX_GIF_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Maximum 50 files per request"
@@ -364,18 +385,33 @@ async def convert_gifs(
     try:
         conversion_repo = ConversionRepository(db, current_user.UserID)
 
-        if is_single_file:
-            # Single file - use direct method
-            output_path, converted_size = await conversion_repo.convert_gif(
-                input_paths[0], output_format, 300
+        if not is_single_file:
+            # Stream the ZIP as each file finishes instead of waiting for the whole batch
+            response = await zip_streaming_response(
+                [conversion_repo.convert_gif_batch([input_path], output_format, 300) for input_path in input_paths],
+                lambda input_path: f"{Path(input_path).stem}.{output_format.lower()}",
+                f'converted_files_{output_format.lower()}.zip'
             )
-            results = [(input_paths[0], output_path, converted_size, True)]
-        else:
-            # Multiple files - use batch method with multiprocessing
-            results = await conversion_repo.convert_gif_batch(
-                input_paths, output_format, 300
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All conversions failed"
+                )
+            return response
+
+        # A corrupt or unsupported file is turned down before it takes a worker
+        rejected = await rejected_media(input_paths, conversion_repo.ffmpeg_path, "video")
+        if rejected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=rejected[input_paths[0]]
             )
 
+        output_path, converted_size = await conversion_repo.convert_gif(
+            input_paths[0], output_format, 300
+        )
+        results = [(input_paths[0], output_path, converted_size, True)]
+
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
 
@@ -391,65 +427,30 @@ async def convert_gifs(
         total_converted_size = sum(r[2] for r in successful_results)
 
         # SINGLE FILE: Return file directly
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}.{output_format.lower()}"
-
-            if output_format.lower() == 'gif':
-                media_type = "image/gif"
-            elif output_format.lower() in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
-                media_type = "video/mp4"
-            else:
-                media_type = "image/png"
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-
-            return response
-
-        # MULTIPLE FILES: Create and return ZIP
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}.{output_format.lower()}"
+
+        if output_format.lower() == 'gif':
+            media_type = "image/gif"
+        elif output_format.lower() in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
+            media_type = "video/mp4"
         else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, converted_size, _ in successful_results:
-                        original_filename = Path(input_path).stem
-                        converted_filename = f"{original_filename}.{output_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f'converted_files_{output_format.lower()}.zip',
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
+            media_type = "image/png"
 
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
 
-                return response
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
 
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
+        return response
 
     except HTTPException:
         raise
@@ -465,16 +466,26 @@ async def convert_gifs(
 async def convert_pdf(
     input_paths: List[str] = Body(..., alias="input_paths"),
     output_format: str = Body(..., alias="output_format"),
+    pages: Optional[str] = Body(None, alias="pages"),
+    dpi: int = Body(settings.PDF_RENDER_DPI_DEFAULT, alias="dpi"),
+    effort: Optional[EffortProfile] = Body(None, alias="effort"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> FileResponse:
     """
     Convert to/from PDF and return as downloadable file
 
+    PDF inputs with an image output format (png, jpg, webp, tiff) are
+    rendered page by page, the pages are streamed as a ZIP as they finish.
+    A single selected page is returned as the image itself.
+
     Parameters:
     -----------
     - input_path(str): the input path from the original file
-    - output_format(str): desired output format (e.g., "pdf", "docx")
+    - output_format(str): desired output format (e.g., "pdf", "docx", "png")
+    - pages(str): optional, pages to render such as "1-3,5,10-", every page by default
+    - dpi(int): optional, render resolution of the pages
+    - effort(str): optional, encoder effort profile of WebP pages
     """
 
     if not input_paths:
@@ -483,7 +494,7 @@ async def convert_pdf(
             detail="No input paths provided"
         )
 
-    if len(input_paths) > 50:
+    if len(input_paths) > MAX_PDF_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Maximum 50 files per request"
@@ -495,14 +506,31 @@ async def convert_pdf(
 
     conversion_repo = ConversionRepository(db, current_user.UserID)
 
+    if output_format.lstrip('.').lower() in PDF_IMAGE_FORMATS:
+        return await _convert_pdf_to_images(conversion_repo, input_paths, output_format, pages, dpi, effort)
+
     try:
-        if is_single_file:
-            output_path, file_converted_size = await conversion_repo.convert_pdf_office(
-                input_paths[0], output_format, 300
+        if not is_single_file:
+            # Stream the ZIP as each batch finishes instead of waiting for all of them
+            response = await zip_streaming_response(
+                [
+                    conversion_repo.convert_pdf_office_batch(batch, output_format, 300)
+                    for batch in await conversion_repo.office_batches(input_paths)
+                ],
+                lambda input_path: f"{Path(input_path).stem}.{output_format.lower()}",
+                f'converted_files_{output_format.lower()}.zip'
             )
-            results = [(input_paths[0], output_path, file_converted_size, True)]
-        else:
-            results = await conversion_repo.convert_pdf_office_batch(input_paths, output_format, 300)
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All conversions failed"
+                )
+            return response
+
+        output_path, file_converted_size = await conversion_repo.convert_pdf_office(
+            input_paths[0], output_format, 300
+        )
+        results = [(input_paths[0], output_path, file_converted_size, True)]
 
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
@@ -518,70 +546,35 @@ async def convert_pdf(
         total_converted_size = sum(r[2] for r in successful_results)
 
         # SINGLE FILE: Return file directly
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}.{output_format.lower()}"
-
-            media_types = {
-                'pdf': 'application/pdf',
-                'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                'doc': 'application/msword',
-                'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                'xls': 'application/vnd.ms-excel',
-                'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-                'ppt': 'application/vnd.ms-powerpoint'
-            }
-
-            media_type = media_types.get(output_format.lower(), 'application/octet-stream')
-
-            response = FileResponse(
-                path=output_path,
-                media_type=media_type,
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-
-            return response
-
-        # MULTIPLE FILES: Create and return ZIP
-        else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, converted_size, _ in successful_results:
-                        original_filename = Path(input_path).stem
-                        converted_filename = f"{original_filename}.{output_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f'converted_files_{output_format.lower()}.zip',
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
-
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}.{output_format.lower()}"
+
+        media_types = {
+            'pdf': 'application/pdf',
+            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'doc': 'application/msword',
+            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'xls': 'application/vnd.ms-excel',
+            'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+            'ppt': 'application/vnd.ms-powerpoint'
+        }
+
+        media_type = media_types.get(output_format.lower(), 'application/octet-stream')
+
+        response = FileResponse(
+            path=output_path,
+            media_type=media_type,
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
 
-                return response
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
 
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
+        return response
 
     except HTTPException:
         raise
@@ -590,3 +583,90 @@ async def convert_pdf(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Conversion failed: {str(e)}"
         ) from e
+
+
+async def _convert_pdf_to_images(
+    conversion_repo: ConversionRepository,
+    input_paths: List[str],
+    output_format: str,
+    pages: Optional[str],
+    dpi: int,
+    effort: Optional[str]
+) -> FileResponse:
+    """
+    Render the selected pages of PDF inputs to images, one response for
+    every page of every input
+    """
+    output_format = output_format.lstrip('.').lower()
+
+    if not 36 <= dpi <= settings.PDF_RENDER_MAX_DPI:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"dpi must be between 36 and {settings.PDF_RENDER_MAX_DPI}"
+        )
+
+    not_pdf = [Path(input_path).name for input_path in input_paths if Path(input_path).suffix.lower() != '.pdf']
+    if not_pdf:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only PDF files can be converted to {output_format.upper()}: {', '.join(not_pdf)}"
+        )
+
+    try:
+        page_numbers = await asyncio.gather(
+            *[conversion_repo.pdf_pages(input_path, pages) for input_path in input_paths]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)) from e
+
+    # The pages of every input share one window of pool workers
+    window = asyncio.Semaphore(conversion_repo.worker_pool.max_workers)
+    pending: List[asyncio.Task] = []
+    try:
+        for input_path, numbers in zip(input_paths, page_numbers):
+            pending.extend(conversion_repo.convert_pdf_pages(
+                input_path, numbers, output_format, dpi, effort, window=window
+            ))
+    except FileNotFoundError as e:
+        discard_when_done(pending)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)) from e
+
+    extension = 'jpg' if output_format == 'jpeg' else output_format
+
+    if len(pending) == 1:
+        try:
+            [(page_name, output_path, output_size, success)] = await pending[0]
+        except BaseException:
+            discard_when_done(pending)
+            raise
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to render the page"
+            )
+
+        response = FileResponse(
+            path=output_path,
+            media_type=f"image/{'jpeg' if extension == 'jpg' else extension}",
+            filename=f"{page_name}.{extension}",
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Total-Converted-Size"] = str(output_size)
+        return response
+
+    # Stream the ZIP as each page finishes
+    response = await zip_streaming_response(
+        pending,
+        lambda page_name: f"{page_name}.{extension}",
+        f"{Path(input_paths[0]).stem if len(input_paths) == 1 else 'pdf'}_pages_{extension}.zip"
+    )
+    if response is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="All pages failed to render"
+        )
+
+    return response
@@ -0,0 +1,228 @@
+"""
+Job handler module
+
+Submit long running conversions as background jobs and poll them
+"""
+
+import json
+import os
+from typing import List
+
+import redis
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from Database.connection import get_redis
+from Core.dependencies import get_current_user
+from Entities.user import User
+from Repositories.job_repository import JobRepository
+from Services.job_service import IJobService
+from Schemas.job import JobSubmit, JobStatus
+from Helpers.zip_stream import iter_zip_stream
+
+router = APIRouter()
+
+def cleanup_temp_file(filepath: str):
+    """Delete temporary file after response is sent"""
+    try:
+        if os.path.exists(filepath):
+            os.unlink(filepath)
+    except Exception as e:
+        print(f"Failed to delete temp file {filepath}: {str(e)}")
+
+def cleanup_temp_files(filepaths: List[str]):
+    """Delete all temporary files after reponse is sent"""
+    for filepath in filepaths:
+        cleanup_temp_file(filepath)
+
+
+@router.post('/jobs', response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job: JobSubmit = Body(...),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+) -> JobStatus:
+    """
+    Queue a conversion, compression or background removal job
+
+    Returns at once with the job id, the work runs on the worker tier
+
+    Example Request:
+    ----------------
+    POST /api/jobs
+    {
+        "operation": "convert_video_audio",
+        "input_paths": ["/path/to/video.avi"],
+        "options": {"output_format": "mp4"}
+    }
+    """
+    for input_path in job.input_paths:
+        if not os.path.exists(input_path):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Input file not found: {input_path}"
+            )
+
+    job_service: IJobService = JobRepository(redis_client, current_user.UserID)
+    return await job_service.submit_job(job)
+
+
+@router.get('/jobs/{job_id}', response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+) -> JobStatus:
+    """
+    Get the status and progress of a job
+    """
+    job_service: IJobService = JobRepository(redis_client, current_user.UserID)
+    job_status = await job_service.get_job(job_id)
+
+    if job_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job_status
+
+
+@router.delete('/jobs/{job_id}', response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(
+    job_id: str,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+) -> JobStatus:
+    """
+    Cancel a queued or running job
+
+    The running ffmpeg, soffice and ImageMagick processes of the job are
+    killed and their outputs removed, the job ends with the cancelled
+    status. Follow /jobs/{job_id}/events or poll the job to see it end.
+    """
+    job_service: IJobService = JobRepository(redis_client, current_user.UserID)
+    job_status = await job_service.cancel_job(job_id)
+
+    if job_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    if job_status.status in ("completed", "failed"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job_status.status}"
+        )
+
+    return job_status
+
+
+@router.get('/jobs/{job_id}/events')
+async def get_job_events(
+    job_id: str,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Follow a job as Server-Sent Events
+
+    - status: the job status, sent first and then on every change
+    - progress: per file while ffmpeg runs, with the progress from 0 to 1
+      (null when the duration is unknown), out_time in seconds, total_size
+      in bytes and speed
+    - keepalive: sent when nothing happened for a while
+
+    The stream ends after the status of a finished job
+    """
+    job_service: IJobService = JobRepository(redis_client, current_user.UserID)
+    events = await job_service.stream_events(job_id)
+
+    if events is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    async def body():
+        async for event, data in events:
+            if event == "keepalive":
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get('/jobs/{job_id}/result')
+async def get_job_result(
+    job_id: str,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+) -> FileResponse:
+    """
+    Download the output of a completed job
+
+    - One output: Returns the file directly
+    - Multiple outputs: Returns a streamed ZIP with all the outputs
+
+    The outputs are removed after the download
+    """
+    job_service: IJobService = JobRepository(redis_client, current_user.UserID)
+    job_status = await job_service.get_job(job_id)
+
+    if job_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    if job_status.status in ("queued", "running"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job_status.status}"
+        )
+
+    results = await job_service.consume_result(job_id)
+    if not results:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Job has no result to download"
+        )
+
+    output_paths = [str(result.output_path) for result in results]
+
+    if len(results) == 1:
+        response = FileResponse(
+            path=output_paths[0],
+            filename=results[0].download_name,
+            background=BackgroundTask(cleanup_temp_file, output_paths[0])
+        )
+    else:
+        async def entries():
+            for result in results:
+                yield str(result.output_path), result.download_name
+
+        async def body():
+            try:
+                async for chunk in iter_zip_stream(entries()):
+                    yield chunk
+            finally:
+                cleanup_temp_files(output_paths)
+
+        response = StreamingResponse(
+            body(),
+            media_type='application/zip',
+            headers={"Content-Disposition": f'attachment; filename="{job_status.operation}_{job_id}.zip"'}
+        )
+
+    response.headers["X-Total-Files"] = str(len(results))
+    response.headers["X-Failed-Files"] = str(job_status.failed)
+
+    return response
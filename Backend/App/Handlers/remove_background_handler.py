@@ -1,6 +1,4 @@
 import os 
-import zipfile 
-import tempfile 
 from typing import List
 from pathlib import Path
 
@@ -13,8 +11,13 @@ from Database.connection import get_db
 from Core.dependencies import get_current_user
 from Entities.user import User
 from Repositories.remove_background_repository import RemoveBackgroundRepository
+from Helpers.zip_stream import zip_streaming_response
+from config import settings
 router = APIRouter()
 
+# Most images per request
+MAX_FILES = 5
+
 def cleanup_temp_file(filepath: str):
     """Delete temporary file after response is sent"""
     try:
@@ -44,7 +47,7 @@ async def remove_background_handler(
             detail="Failed when remove background"
         )
     
-    if len(input_paths) > 5:
+    if len(input_paths) > MAX_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Fail because send too much files"
@@ -56,11 +59,26 @@ async def remove_background_handler(
     try:
         remove_background_repo = RemoveBackgroundRepository(db, current_user.UserID)
 
-        if is_single_file:
-            output_path, converted_file_size = await remove_background_repo.remove_background(input_paths[0])
-            results = [(input_paths[0], output_path, converted_file_size, True)]
-        else:
-            results = await remove_background_repo.remove_backgrounds_batch(input_paths)
+        if not is_single_file:
+            # Stream the ZIP as each chunk finishes, a chunk shares one forward pass
+            batch_size = max(1, settings.REMBG_BATCH_SIZE)
+            response = await zip_streaming_response(
+                [
+                    remove_background_repo.remove_backgrounds_batch(input_paths[i:i + batch_size])
+                    for i in range(0, len(input_paths), batch_size)
+                ],
+                lambda input_path: f"{Path(input_path).stem}_removedbg.{input_format.lower()}",
+                f'converted_images_{input_format.lower()}.zip'
+            )
+            if response is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="All the conversions failed"
+                )
+            return response
+
+        output_path, converted_file_size = await remove_background_repo.remove_background(input_paths[0])
+        results = [(input_paths[0], output_path, converted_file_size, True)]
 
         successful_results = [r for r in results if r[3]]
         failed_results = [r for r in results if not r[3]]
@@ -75,57 +93,24 @@ async def remove_background_handler(
 
         output_format = input_format
 
-        if is_single_file and successful_results:
-            input_path, output_path, converted_size, _ = successful_results[0]
-            original_name = Path(input_path).stem
-            download_filename = f"{original_name}_removedbg.{output_format.lower()}"
-            
-            response = FileResponse(
-                path=output_path,
-                media_type=f"image/{output_format.lower()}",
-                filename=download_filename,
-                background=BackgroundTask(cleanup_temp_file, output_path)
-            )
-            
-            # Add statistics headers
-            response.headers["X-Total-Files"] = "1"
-            response.headers["X-Failed-Files"] = str(len(failed_results))
-            response.headers["X-Total-Original-Size"] = str(total_original_size)
-            response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-            
-            return response
-        else:
-            zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip').name
-            temp_files_to_cleanup = [output_path for _, output_path, _, _ in successful_results]
-            temp_files_to_cleanup.append(zip_path)
-            
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for input_path, output_path, converted_size, success in successful_results:
-                        original_filename = Path(input_path).stem
-                        converted_filename = f"{original_filename}_removedbg.{output_format.lower()}"
-                        zipf.write(output_path, converted_filename)
-                
-                response = FileResponse(
-                    path=zip_path,
-                    media_type='application/zip',
-                    filename=f'converted_images_{output_format.lower()}.zip',
-                    background=BackgroundTask(cleanup_temp_files, temp_files_to_cleanup)
-                )
-                
-                response.headers["X-Total-Files"] = str(len(successful_results))
-                response.headers["X-Failed-Files"] = str(len(failed_results))
-                response.headers["X-Total-Original-Size"] = str(total_original_size)
-                response.headers["X-Total-Converted-Size"] = str(total_converted_size)
-                
-                return response
-                
-            except Exception as e:
-                cleanup_temp_files(temp_files_to_cleanup)
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create ZIP file: {str(e)}"
-                ) from e
+        input_path, output_path, converted_size, _ = successful_results[0]
+        original_name = Path(input_path).stem
+        download_filename = f"{original_name}_removedbg.{output_format.lower()}"
+        
+        response = FileResponse(
+            path=output_path,
+            media_type=f"image/{output_format.lower()}",
+            filename=download_filename,
+            background=BackgroundTask(cleanup_temp_file, output_path)
+        )
+        
+        # Add statistics headers
+        response.headers["X-Total-Files"] = "1"
+        response.headers["X-Failed-Files"] = str(len(failed_results))
+        response.headers["X-Total-Original-Size"] = str(total_original_size)
+        response.headers["X-Total-Converted-Size"] = str(total_converted_size)
+        
+        return response
 
     except HTTPException:
         raise
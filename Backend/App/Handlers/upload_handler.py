@@ -0,0 +1,246 @@
+"""
+Upload handler module
+
+Variants of the service endpoints for clients that do not share a
+filesystem with the API. The uploads are streamed to the spool directory
+and the spooled paths go through the same handlers as local paths.
+"""
+
+import os
+from typing import Awaitable, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status, File, Form, Query, Request, UploadFile
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTasks
+
+from Database.connection import get_db
+from Core.dependencies import get_current_user
+from Entities.user import User
+from Repositories.compression_repository import CompressionEngine
+from Handlers import conversion_handler, compression_handler, remove_background_handler
+from Helpers.encoder_profiles import EffortProfile
+from Helpers.video_codecs import VideoCodec, VideoSpeed
+from Helpers.upload_spool import UploadRoute, spool_stream, spool_uploads, discard_spooled
+from config import settings
+
+router = APIRouter(route_class=UploadRoute)
+
+
+def _check_file_count(files: List[UploadFile], max_files: int) -> None:
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No files uploaded"
+        )
+
+    if len(files) > max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum {max_files} files per request"
+        )
+
+
+async def _run_with_spooled(input_paths: List[str], handler_call: Awaitable[Response]) -> Response:
+    """
+    Await a service handler and delete the spooled inputs once its
+    response has been sent
+    """
+    try:
+        response = await handler_call
+    except BaseException:
+        discard_spooled(input_paths)
+        raise
+
+    background = BackgroundTasks()
+    if response.background is not None:
+        background.add_task(response.background)
+    background.add_task(discard_spooled, input_paths)
+    response.background = background
+
+    return response
+
+
+async def _spool(files: List[UploadFile], max_files: int) -> List[str]:
+    """Spool the uploads of an endpoint that takes at most max_files"""
+    _check_file_count(files, max_files)
+    return await spool_uploads(files)
+
+
+@router.post('/uploads', status_code=status.HTTP_201_CREATED)
+async def upload_file(
+    request: Request,
+    filename: str = Query(...),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    """
+    Stream a raw request body to the spool directory
+
+    The body can be sent with chunked transfer encoding, it is written to
+    disk as it arrives. The returned input_path works with every JSON
+    service endpoint and is removed after UPLOAD_SPOOL_TTL_SECONDS, or
+    once the jobs that use it end.
+
+    Example Request:
+    ----------------
+    POST /api/uploads?filename=video.avi
+    Content-Type: application/octet-stream
+    <file bytes>
+    """
+    input_path = await spool_stream(request.stream(), filename)
+
+    return {
+        "input_path": input_path,
+        "size": os.path.getsize(input_path)
+    }
+
+
+@router.post('/upload/convert_to/image')
+async def upload_convert_image(
+    files: List[UploadFile] = File(...),
+    output_format: str = Form(...),
+    max_width: Optional[int] = Form(None, gt=0),
+    max_height: Optional[int] = Form(None, gt=0),
+    effort: Optional[EffortProfile] = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and convert image(s), same response as POST /convert_to/image"""
+    input_paths = await _spool(files, conversion_handler.MAX_IMAGE_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        conversion_handler.convert_image_handler(
+            input_paths, output_format, current_user, db, max_width, max_height, effort
+        )
+    )
+
+
+@router.post('/upload/convert_to/video_audio')
+async def upload_convert_video_audio(
+    files: List[UploadFile] = File(...),
+    output_format: str = Form(...),
+    codec: Optional[VideoCodec] = Form(None),
+    speed: Optional[VideoSpeed] = Form(None),
+    crf: Optional[int] = Form(None, ge=0, le=63),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and convert video/audio file(s), same response as POST /convert_to/video_audio"""
+    input_paths = await _spool(files, conversion_handler.MAX_VIDEO_AUDIO_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        conversion_handler.convert_video_audio(input_paths, output_format, current_user, db, codec, speed, crf)
+    )
+
+
+@router.post('/upload/convert_to/gif')
+async def upload_convert_gif(
+    files: List[UploadFile] = File(...),
+    output_format: str = Form(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and convert GIF file(s), same response as POST /convert_to/gif"""
+    input_paths = await _spool(files, conversion_handler.MAX_GIF_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        conversion_handler.convert_gifs(input_paths, output_format, current_user, db)
+    )
+
+
+@router.post('/upload/convert_to/pdf')
+async def upload_convert_pdf(
+    files: List[UploadFile] = File(...),
+    output_format: str = Form("pdf"),
+    pages: Optional[str] = Form(None),
+    dpi: int = Form(settings.PDF_RENDER_DPI_DEFAULT),
+    effort: Optional[EffortProfile] = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and convert document(s), same response as POST /convert_to/pdf"""
+    input_paths = await _spool(files, conversion_handler.MAX_PDF_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        conversion_handler.convert_pdf(input_paths, output_format, pages, dpi, effort, current_user, db)
+    )
+
+
+@router.post('/upload/compress/image')
+async def upload_compress_image(
+    files: List[UploadFile] = File(...),
+    quality: int = Form(85),
+    effort: Optional[EffortProfile] = Form(None),
+    engine: Optional[CompressionEngine] = Form(None),
+    target_bytes: Optional[int] = Form(None, gt=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and compress image(s), same response as POST /compress/image"""
+    input_paths = await _spool(files, compression_handler.MAX_IMAGE_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        compression_handler.compress_image(input_paths, quality, current_user, db, effort, engine, target_bytes)
+    )
+
+
+@router.post('/upload/compress/video')
+async def upload_compress_video(
+    files: List[UploadFile] = File(...),
+    quality: str = Form("medium"),
+    codec: Optional[VideoCodec] = Form(None),
+    speed: Optional[VideoSpeed] = Form(None),
+    crf: Optional[int] = Form(None, ge=0, le=63),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and compress video(s), same response as POST /compress/video"""
+    input_paths = await _spool(files, compression_handler.MAX_VIDEO_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        compression_handler.compress_video(input_paths, quality, current_user, db, codec, speed, crf)
+    )
+
+
+@router.post('/upload/compress/audio')
+async def upload_compress_audio(
+    files: List[UploadFile] = File(...),
+    bitrate: str = Form("128k"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and compress audio file(s), same response as POST /compress/audio"""
+    input_paths = await _spool(files, compression_handler.MAX_AUDIO_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        compression_handler.compress_audio(input_paths, bitrate, current_user, db)
+    )
+
+
+@router.post('/upload/compress/pdf')
+async def upload_compress_pdf(
+    files: List[UploadFile] = File(...),
+    quality: str = Form("medium"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload and compress PDF(s), same response as POST /compress/pdf"""
+    input_paths = await _spool(files, compression_handler.MAX_PDF_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        compression_handler.compress_pdf(input_paths, quality, current_user, db)
+    )
+
+
+@router.post('/upload/remove_background')
+async def upload_remove_background(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Upload image(s) and remove the background, same response as POST /remove_background"""
+    input_paths = await _spool(files, remove_background_handler.MAX_FILES)
+    return await _run_with_spooled(
+        input_paths,
+        remove_background_handler.remove_background_handler(input_paths, current_user, db)
+    )
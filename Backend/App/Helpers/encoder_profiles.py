@@ -0,0 +1,104 @@
+"""
+encoder profiles module
+
+Named effort profiles that trade encode time for output size, mapped to
+the encoder parameters of Pillow and ImageMagick for each image format.
+"""
+from typing import List, Literal, Optional
+
+from config import settings
+
+EffortProfile = Literal["fast", "balanced", "max"]
+EFFORT_PROFILES = ("fast", "balanced", "max")
+
+# Pillow save() arguments per output format
+PILLOW_SAVE_ARGS = {
+    "png": {
+        "fast": {"compress_level": 1},
+        "balanced": {"compress_level": 6},
+        "max": {"optimize": True},
+    },
+    "jpeg": {
+        "fast": {"optimize": False},
+        "balanced": {"optimize": True, "progressive": True},
+        "max": {"optimize": True, "progressive": True},
+    },
+    "webp": {
+        "fast": {"method": 0},
+        "balanced": {"method": 4},
+        "max": {"method": 6},
+    },
+    "avif": {
+        "fast": {"speed": 8},
+        "balanced": {"speed": 6},
+        "max": {"speed": 0},
+    },
+    "gif": {
+        "fast": {"optimize": False},
+        "balanced": {"optimize": True},
+        "max": {"optimize": True},
+    },
+}
+
+# ImageMagick -define arguments per input format, the output keeps the format
+MAGICK_DEFINES = {
+    "png": {
+        "fast": ["-define", "png:compression-level=1", "-define", "png:compression-filter=0"],
+        "balanced": ["-define", "png:compression-level=6"],
+        "max": [
+            "-define", "png:compression-level=9",  # Maximum compression
+            "-define", "png:compression-filter=5",
+            "-define", "png:compression-strategy=1",
+        ],
+    },
+    "jpeg": {
+        "fast": [],
+        "balanced": ["-interlace", "JPEG"],  # Progressive JPEG
+        "max": ["-interlace", "JPEG"],
+    },
+    "webp": {
+        "fast": ["-define", "webp:method=0"],
+        "balanced": ["-define", "webp:method=4"],
+        "max": ["-define", "webp:method=6"],  # Best compression method
+    },
+    "avif": {
+        "fast": ["-define", "avif:speed=8"],
+        "balanced": ["-define", "avif:speed=6"],
+        "max": ["-define", "avif:speed=0"],  # Best compression (slower)
+    },
+}
+
+
+def _format_key(image_format: str) -> str:
+    image_format = image_format.lstrip('.').lower()
+    return "jpeg" if image_format == "jpg" else image_format
+
+
+def resolve_effort(effort: Optional[str]) -> str:
+    """
+    Get the effort profile of a request, IMAGE_EFFORT_DEFAULT when not set
+
+    Raises:
+    -------
+        ValueError: for an unknown profile
+    """
+    effort = effort or settings.IMAGE_EFFORT_DEFAULT
+    if effort not in EFFORT_PROFILES:
+        raise ValueError(f"Unknown effort profile {effort}, expected one of {', '.join(EFFORT_PROFILES)}")
+    return effort
+
+
+def pillow_save_args(output_format: str, effort: str) -> dict:
+    """Pillow save() arguments for a format, optimize=True for the others"""
+    profiles = PILLOW_SAVE_ARGS.get(_format_key(output_format))
+    if profiles is None:
+        return {"optimize": True}
+    return dict(profiles[effort])
+
+
+def magick_args(input_format: str, effort: str) -> List[str]:
+    """ImageMagick encoder arguments for a format, none for the others"""
+    profiles = MAGICK_DEFINES.get(_format_key(input_format))
+    if profiles is None:
+        return []
+    return list(profiles[effort])
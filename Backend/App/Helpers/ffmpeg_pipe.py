@@ -0,0 +1,173 @@
+"""
+ffmpeg pipe module
+
+Run ffmpeg with its output on pipe:1 and hand the bytes to the response as
+they are encoded, for containers that can be written without seeking. This
+skips the temp file write and the read back for the download.
+"""
+import asyncio
+import subprocess
+import time
+from typing import AsyncIterator, List, Optional
+
+from Helpers.subprocess_runner import new_process_group_kwargs, kill_pid_tree
+
+PIPE_CHUNK_SIZE = 256 * 1024
+# End of ffmpeg's stderr kept for the error message of a failed run
+STDERR_TAIL_BYTES = 2048
+# How long a finished ffmpeg gets to flush its stderr
+STDERR_FLUSH_SECONDS = 1.0
+
+# MP4 family needs fragments, the moov atom can not be written at the end of a pipe
+FRAGMENTED_MOVFLAGS = ['-movflags', 'frag_keyframe+empty_moov+default_base_moof']
+
+# output format -> muxer arguments
+PIPE_MUXERS = {
+    'mp3': ['-f', 'mp3'],
+    'ogg': ['-f', 'ogg'],
+    'opus': ['-f', 'opus'],
+    'flac': ['-f', 'flac'],
+    'aac': ['-f', 'adts'],
+    'webm': ['-f', 'webm'],
+    'mkv': ['-f', 'matroska'],
+    'mp4': ['-f', 'mp4', *FRAGMENTED_MOVFLAGS],
+    'mov': ['-f', 'mov', *FRAGMENTED_MOVFLAGS],
+    'm4a': ['-f', 'ipod', *FRAGMENTED_MOVFLAGS],
+}
+
+
+def is_pipeable(output_format: str) -> bool:
+    """Whether ffmpeg can write this format to a pipe"""
+    return output_format.lstrip('.').lower() in PIPE_MUXERS
+
+
+def pipe_output_args(output_format: str) -> List[str]:
+    """Muxer arguments followed by the pipe output"""
+    return [*PIPE_MUXERS[output_format.lstrip('.').lower()], 'pipe:1']
+
+
+_pipe_slots: Optional[asyncio.Semaphore] = None
+_pipe_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def pipe_slots(size: int) -> asyncio.Semaphore:
+    """
+    Semaphore bounding the piped ffmpeg runs of this process
+
+    Piped runs are children of the API process, not pool tasks, so they
+    take one of `size` slots to stay within the worker pool's bound.
+
+    Parameters:
+    -----------
+        size(int): number of slots, the worker pool size
+    """
+    global _pipe_slots, _pipe_slots_loop # pylint: disable=global-statement
+
+    loop = asyncio.get_running_loop()
+    if _pipe_slots is None or _pipe_slots_loop is not loop:
+        _pipe_slots = asyncio.Semaphore(size)
+        _pipe_slots_loop = loop
+
+    return _pipe_slots
+
+
+class FfmpegPipe:
+    """
+    ffmpeg process writing to stdout, iterate it to get the encoded bytes
+
+    The process is killed with its group on timeout or when the consumer
+    stops iterating, e.g. because the client disconnected.
+    """
+    def __init__(self, cmd: List[str], timeout: float):
+        self.cmd = cmd
+        self.timeout = timeout
+        self.bytes_sent = 0
+        self.elapsed = 0.0
+        self.success = False
+
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._stderr_tail = bytearray()
+        self._first_chunk = b""
+        self._start = 0.0
+
+    def _remaining(self) -> float:
+        return max(0.0, self._start + self.timeout - time.perf_counter())
+
+    async def start(self) -> None:
+        """
+        Launch ffmpeg and wait for its first bytes, so a failing input is
+        reported before any response is sent
+
+        Raises:
+        -------
+            ValueError: if ffmpeg exited without output
+            TimeoutError: if nothing came out in time
+        """
+        self._start = time.perf_counter()
+        self._process = await asyncio.create_subprocess_exec(
+            self.cmd[0], '-nostats', *self.cmd[1:],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **new_process_group_kwargs()
+        )
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+        self._first_chunk = await self._read()
+        if not self._first_chunk:
+            returncode = await self._wait()
+            raise ValueError(f"FFmpeg produced no output (exit code {returncode}): {await self.stderr_tail()}")
+
+    async def _drain_stderr(self) -> None:
+        """Read stderr as it comes so ffmpeg never blocks on it, keeping only its end"""
+        while True:
+            chunk = await self._process.stderr.read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                return
+            self._stderr_tail += chunk
+            del self._stderr_tail[:-STDERR_TAIL_BYTES]
+
+    async def stderr_tail(self) -> str:
+        """Last lines ffmpeg wrote to stderr, once it flushed them"""
+        if self._stderr_task is not None:
+            await asyncio.wait({self._stderr_task}, timeout=STDERR_FLUSH_SECONDS)
+        return self._stderr_tail.decode(errors='replace').strip()
+
+    async def _read(self) -> bytes:
+        try:
+            return await asyncio.wait_for(self._process.stdout.read(PIPE_CHUNK_SIZE), self._remaining())
+        except asyncio.TimeoutError as e:
+            self.kill()
+            raise TimeoutError(f"FFmpeg conversion timed out after {self.timeout}s") from e
+
+    async def _wait(self) -> int:
+        try:
+            return await asyncio.wait_for(self._process.wait(), self._remaining())
+        except asyncio.TimeoutError as e:
+            self.kill()
+            raise TimeoutError(f"FFmpeg conversion timed out after {self.timeout}s") from e
+
+    def kill(self) -> None:
+        """Kill ffmpeg if it is still running"""
+        if self._process is not None and self._process.returncode is None:
+            kill_pid_tree(self._process.pid)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            chunk = self._first_chunk
+            while chunk:
+                self.bytes_sent += len(chunk)
+                yield chunk
+                chunk = await self._read()
+
+            returncode = await self._wait()
+            if returncode != 0:
+                raise ValueError(f"FFmpeg failed with exit code {returncode}: {await self.stderr_tail()}")
+
+            self.success = True
+        finally:
+            self.kill()
+            if self._stderr_task is not None:
+                self._stderr_task.cancel()
+            self.elapsed = time.perf_counter() - self._start
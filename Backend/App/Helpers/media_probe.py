@@ -0,0 +1,286 @@
+"""
+media probe module
+
+Read the streams of a media file with ffprobe, cached per input so a file
+is probed once however many requests it goes through. Every process keeps
+its own cache in memory, backed by an index on disk shared by the API and
+the worker processes, so the probe the API ran before submitting a file is
+not repeated in the worker that encodes it.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
+
+from Helpers.subprocess_runner import run_process
+from config import settings
+
+PROBE_TIMEOUT = 30
+PROBE_CACHE_SIZE = 1024
+
+# Streams an input needs: a video, an audio or any of the two
+MediaKind = Literal["video", "audio", "media"]
+
+# output format -> (video codecs, audio codecs) the container takes as they
+# are, None for the formats that only keep the audio
+REMUX_CODECS = {
+    'mp4': ({'h264', 'hevc', 'mpeg4', 'av1'}, {'aac', 'mp3', 'alac', 'opus', 'flac'}),
+    'mov': ({'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg'}, {'aac', 'mp3', 'alac', 'pcm_s16le'}),
+    'mkv': (
+        {'h264', 'hevc', 'mpeg4', 'av1', 'vp8', 'vp9', 'mpeg2video', 'theora'},
+        {'aac', 'mp3', 'ac3', 'eac3', 'opus', 'vorbis', 'flac', 'pcm_s16le'}
+    ),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'vorbis', 'opus'}),
+    'mp3': (None, {'mp3'}),
+    'aac': (None, {'aac'}),
+    'm4a': (None, {'aac', 'alac'}),
+    'ogg': (None, {'vorbis', 'opus', 'flac'}),
+    'flac': (None, {'flac'}),
+    'wav': (None, {'pcm_s16le'}),
+}
+
+
+def ffprobe_path_for(ffmpeg_path: str) -> Optional[str]:
+    """ffprobe next to the ffmpeg executable, or the one on PATH"""
+    ffmpeg = Path(ffmpeg_path)
+    sibling = ffmpeg.with_name(ffmpeg.name.replace('ffmpeg', 'ffprobe'))
+    if sibling != ffmpeg and sibling.exists():
+        return str(sibling)
+    return shutil.which("ffprobe")
+
+
+def _run_ffprobe(input_path: str, ffprobe_path: str) -> dict:
+    """
+    ffprobe's output as an index entry, {"probe": ...} or {"error": ...}
+    when the file is not readable media
+
+    Runs in its own process group like the encoders, so a timeout or a
+    cancelled task kills it.
+
+    Raises:
+    -------
+        subprocess.TimeoutExpired: if ffprobe did not answer in time, not stored
+        ValueError: if ffprobe was killed by a signal, not stored
+    """
+    result = run_process(
+        [
+            ffprobe_path, '-v', 'error',
+            '-print_format', 'json',
+            '-show_format', '-show_streams',
+            input_path
+        ],
+        timeout=PROBE_TIMEOUT
+    )
+
+    if result.returncode < 0:
+        raise ValueError(f"ffprobe was stopped before it read {input_path}")
+
+    if result.returncode != 0:
+        error_msg = result.stderr.decode(errors='replace').strip() or f"exit code {result.returncode}"
+        return {"error": f"ffprobe failed on {input_path}: {error_msg}"}
+
+    try:
+        return {"probe": json.loads(result.stdout or b"{}")}
+    except ValueError:
+        return {"error": f"ffprobe returned unreadable output for {input_path}"}
+
+
+def _index_path(input_path: str, mtime_ns: int, size: int) -> Path:
+    key = hashlib.sha256(f"{os.path.abspath(input_path)}\0{mtime_ns}\0{size}".encode()).hexdigest()
+    return Path(settings.MEDIA_PROBE_INDEX_DIR) / f"{key}.json"
+
+
+def _read_index(index_path: Path) -> Optional[dict]:
+    try:
+        with open(index_path, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_index(index_path: Path, entry: dict) -> None:
+    """Store an entry, written to a temp name first so readers never see half of it"""
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(entry, fp)
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        print(f"Failed to store the probe of {index_path.stem}: {str(e)}")
+
+
+@functools.lru_cache(maxsize=PROBE_CACHE_SIZE)
+def _probe(input_path: str, mtime_ns: int, size: int, ffprobe_path: str) -> dict:
+    """Read the probe from the index or run ffprobe, mtime_ns and size are only part of the cache key"""
+    index_path = _index_path(input_path, mtime_ns, size)
+
+    entry = _read_index(index_path)
+    if entry is None:
+        entry = _run_ffprobe(input_path, ffprobe_path)
+        _write_index(index_path, entry)
+
+    if "error" in entry:
+        raise ValueError(entry["error"])
+
+    return entry.get("probe", {})
+
+
+def sweep_probe_index() -> None:
+    """Delete the index entries older than MEDIA_PROBE_INDEX_TTL_SECONDS"""
+    index_root = Path(settings.MEDIA_PROBE_INDEX_DIR)
+    if not index_root.exists():
+        return
+
+    expire_before = time.time() - settings.MEDIA_PROBE_INDEX_TTL_SECONDS
+    for entry_path in index_root.iterdir():
+        try:
+            if entry_path.stat().st_mtime < expire_before:
+                entry_path.unlink()
+        except OSError as e:
+            print(f"Failed to sweep {entry_path}: {str(e)}")
+
+
+def probe_media(input_path: str, ffprobe_path: str) -> dict:
+    """
+    ffprobe's format and streams of a file
+
+    The result is cached by path, modification time and size, a file that
+    changed on disk is probed again. A file ffprobe can not read is
+    remembered too.
+
+    Raises:
+    -------
+        ValueError: if ffprobe can not read the file
+        subprocess.TimeoutExpired: if ffprobe did not answer in PROBE_TIMEOUT
+    """
+    stat = os.stat(input_path)
+    return _probe(input_path, stat.st_mtime_ns, stat.st_size, ffprobe_path)
+
+
+def media_streams(probe: dict, codec_type: str) -> List[dict]:
+    """
+    ffprobe's streams of one type ("video", "audio", "subtitle"), cover art
+    is not counted as video
+    """
+    return [
+        stream for stream in probe.get("streams", [])
+        if stream.get("codec_type") == codec_type
+        and not (codec_type == "video" and stream.get("disposition", {}).get("attached_pic"))
+    ]
+
+
+def main_codecs(probe: dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Codec of the first video and the first audio stream, the streams ffmpeg
+    maps by default
+    """
+    video_streams = media_streams(probe, "video")
+    audio_streams = media_streams(probe, "audio")
+
+    return (
+        video_streams[0].get("codec_name") if video_streams else None,
+        audio_streams[0].get("codec_name") if audio_streams else None
+    )
+
+
+def can_remux(probe: dict, output_format: str) -> bool:
+    """Whether the main streams fit in the output container without re-encoding"""
+    if output_format not in REMUX_CODECS:
+        return False
+
+    video_codecs, audio_codecs = REMUX_CODECS[output_format]
+    video_codec, audio_codec = main_codecs(probe)
+
+    if video_codecs is None:
+        # Audio only output, the video streams are dropped
+        return audio_codec in audio_codecs
+
+    if video_codec is None and audio_codec is None:
+        return False
+    if video_codec is not None and video_codec not in video_codecs:
+        return False
+    if audio_codec is not None and audio_codec not in audio_codecs:
+        return False
+
+    return True
+
+
+def media_duration(probe: dict) -> Optional[float]:
+    """Duration of the file in seconds, None when the container does not say"""
+    try:
+        return float(probe.get("format", {})["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def check_media(input_path: str, ffprobe_path: str, kind: MediaKind = "media") -> dict:
+    """
+    Probe an input and make sure it has the streams an operation needs
+
+    Parameters:
+    -----------
+        input_path(str): the input
+        ffprobe_path(str): ffprobe executable
+        kind(str): "video" needs a video stream, "audio" an audio stream,
+            "media" either of them
+
+    Returns:
+    --------
+        dict: the probe
+
+    Raises:
+    -------
+        ValueError: if the file is corrupt, not media or lacks the streams
+    """
+    try:
+        probe = probe_media(input_path, ffprobe_path)
+    except OSError as e:
+        raise ValueError(f"Can not read {Path(input_path).name}: {str(e)}") from e
+    except ValueError as e:
+        raise ValueError(f"{Path(input_path).name} is corrupt or not a supported media file") from e
+
+    has_video = bool(media_streams(probe, "video"))
+    has_audio = bool(media_streams(probe, "audio"))
+
+    if kind == "video" and not has_video:
+        raise ValueError(f"{Path(input_path).name} has no video stream")
+    if kind == "audio" and not has_audio:
+        raise ValueError(f"{Path(input_path).name} has no audio stream")
+    if not (has_video or has_audio):
+        raise ValueError(f"{Path(input_path).name} has no audio or video stream")
+
+    return probe
+
+
+async def rejected_media(input_paths: List[str], ffmpeg_path: str, kind: MediaKind = "media") -> Dict[str, str]:
+    """
+    Inputs check_media turns down, probed in threads before any of them
+    takes a worker. Nothing is rejected when ffprobe is missing or times out,
+    ffmpeg then reports the problem itself.
+
+    Returns:
+    --------
+        Dict[str, str]: input path -> reason
+    """
+    ffprobe_path = ffprobe_path_for(ffmpeg_path)
+    if ffprobe_path is None:
+        return {}
+
+    async def rejection(input_path: str) -> Optional[str]:
+        try:
+            await asyncio.to_thread(check_media, input_path, ffprobe_path, kind)
+        except ValueError as e:
+            return str(e)
+        except subprocess.TimeoutExpired:
+            pass
+        return None
+
+    reasons = await asyncio.gather(*[rejection(input_path) for input_path in input_paths])
+    return {input_path: reason for input_path, reason in zip(input_paths, reasons) if reason is not None}
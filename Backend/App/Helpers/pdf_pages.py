@@ -0,0 +1,104 @@
+"""
+pdf pages module
+
+Page count and page range selection of PDF inputs, rendered page by page
+with poppler's pdftoppm so a process only ever holds the raster of one
+page.
+"""
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+from Helpers.subprocess_runner import run_process
+
+PDFINFO_TIMEOUT = 30
+
+# Output formats pdftoppm writes itself, the others are re-encoded with Pillow
+PDFTOPPM_FORMATS = {'png': '-png', 'jpg': '-jpeg', 'jpeg': '-jpeg', 'tif': '-tiff', 'tiff': '-tiff'}
+
+_RANGE_PART = re.compile(r"^(\d*)\s*(-?)\s*(\d*)$")
+
+
+def pdftoppm_path_for(bin_dir: Path) -> Optional[str]:
+    """pdftoppm on PATH, or the one shipped in the application bin folder"""
+    system_pdftoppm = shutil.which("pdftoppm")
+    if system_pdftoppm:
+        return system_pdftoppm
+
+    bundled = bin_dir / ('pdftoppm.exe' if os.name == 'nt' else 'pdftoppm')
+    return str(bundled.absolute()) if bundled.exists() else None
+
+
+def pdfinfo_path_for(pdftoppm_path: str) -> Optional[str]:
+    """pdfinfo next to the pdftoppm executable, or the one on PATH"""
+    pdftoppm = Path(pdftoppm_path)
+    sibling = pdftoppm.with_name(pdftoppm.name.replace('pdftoppm', 'pdfinfo'))
+    if sibling != pdftoppm and sibling.exists():
+        return str(sibling)
+    return shutil.which("pdfinfo")
+
+
+def pdf_page_count(input_path: str, pdfinfo_path: str) -> int:
+    """
+    Number of pages of a PDF
+
+    Raises:
+    -------
+        ValueError: if pdfinfo can not read the file
+        subprocess.TimeoutExpired: if pdfinfo did not answer in PDFINFO_TIMEOUT
+    """
+    # Through run_process, a cancelled task or a timeout kills pdfinfo with its group
+    result = run_process([pdfinfo_path, input_path], timeout=PDFINFO_TIMEOUT)
+    if result.returncode != 0:
+        raise ValueError(f"Not a readable PDF: {result.stderr.decode(errors='replace').strip()}")
+
+    match = re.search(rb"^Pages:\s+(\d+)", result.stdout, re.MULTILINE)
+    if match is None:
+        raise ValueError("pdfinfo did not report a page count")
+
+    return int(match.group(1))
+
+
+def parse_page_range(pages: Optional[str], page_count: int) -> List[int]:
+    """
+    Page numbers selected by a range such as "1-3,5,10-", in order and
+    without repeats
+
+    Parameters:
+    -----------
+        pages(str): comma separated pages and ranges, 1 based, an open
+            end runs to the first or last page. None or empty is every page
+        page_count(int): number of pages of the document
+
+    Raises:
+    -------
+        ValueError: if the range is malformed or selects no page of the document
+    """
+    if not pages or not pages.strip():
+        return list(range(1, page_count + 1))
+
+    selected: List[int] = []
+    seen = set()
+    for part in pages.split(','):
+        match = _RANGE_PART.match(part.strip())
+        if match is None or not (match.group(1) or match.group(3)) or (match.group(3) and not match.group(2)):
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+
+        first_text, dash, last_text = match.groups()
+        first = int(first_text) if first_text else 1
+        last = (int(last_text) if last_text else page_count) if dash else first
+
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+
+        for page in range(first, min(last, page_count) + 1):
+            if page not in seen:
+                seen.add(page)
+                selected.append(page)
+
+    if not selected:
+        raise ValueError(f"The page range {pages!r} is outside the {page_count} pages of the document")
+
+    return selected
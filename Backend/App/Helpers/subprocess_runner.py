@@ -0,0 +1,261 @@
+"""
+subprocess runner module
+
+Launch external tools (ffmpeg, soffice, magick) directly with a real
+timeout. Every child gets its own process group so that a timeout kills
+the whole tree, including helpers such as soffice.bin.
+"""
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+# How often run_process_with_stall_timeout checks the progress
+STALL_POLL_SECONDS = 0.5
+
+# Process groups started by this process that are still running
+_running_pids: Set[int] = set()
+_running_lock = threading.Lock()
+
+
+def new_process_group_kwargs() -> dict:
+    """Popen arguments that start the child in its own process group"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_pid_tree(pid: int) -> None:
+    """
+    Kill the process group started with new_process_group_kwargs
+
+    Parameters:
+    -----------
+        pid(int): pid of the group leader
+    """
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(pid)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False
+        )
+        return
+
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """
+    Kill a child process together with everything it spawned
+
+    Parameters:
+    -----------
+        process(subprocess.Popen): process started by run_process
+    """
+    if process.poll() is not None:
+        return
+
+    kill_pid_tree(process.pid)
+
+
+@contextmanager
+def _track(process: subprocess.Popen) -> Iterator[None]:
+    """Keep a child in the running set while it runs"""
+    with _running_lock:
+        _running_pids.add(process.pid)
+    try:
+        yield
+    finally:
+        with _running_lock:
+            _running_pids.discard(process.pid)
+
+
+def kill_running_processes() -> int:
+    """
+    Kill every process tree started by run_process or
+    run_ffmpeg_with_progress in this process that is still running
+
+    Returns:
+    --------
+        int: the number of trees killed
+    """
+    with _running_lock:
+        pids = list(_running_pids)
+
+    for pid in pids:
+        kill_pid_tree(pid)
+
+    return len(pids)
+
+
+def run_process(cmd: List[str], timeout: Optional[float] = None, text: bool = False) -> subprocess.CompletedProcess:
+    """
+    Run a command and wait for it, killing the process tree on timeout
+
+    Parameters:
+    -----------
+        cmd(List[str]): command and arguments
+        timeout(float): maximum time in seconds, None to wait forever
+        text(bool): decode stdout/stderr as text
+
+    Returns:
+    --------
+        subprocess.CompletedProcess: return code and captured output
+
+    Raises:
+    -------
+        subprocess.TimeoutExpired: if the command did not finish in time
+    """
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=text,
+        **new_process_group_kwargs()
+    ) as process, _track(process):
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process)
+            process.communicate()
+            raise
+
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+def run_ffmpeg_with_progress(
+    cmd: List[str],
+    timeout: Optional[float],
+    on_progress: Callable[[Dict[str, str]], None]
+) -> subprocess.CompletedProcess:
+    """
+    Run ffmpeg with -progress on stdout and hand over every progress block
+
+    ffmpeg writes a block of key=value lines (out_time_us, total_size,
+    speed...) about twice a second and ends each one with progress=continue,
+    or progress=end for the last. The command must not write its output to
+    stdout.
+
+    Parameters:
+    -----------
+        cmd(List[str]): ffmpeg command and arguments
+        timeout(float): maximum time in seconds, None to wait forever
+        on_progress(Callable): called with each block as a dict
+
+    Returns:
+    --------
+        subprocess.CompletedProcess: return code and captured stderr, as bytes
+
+    Raises:
+    -------
+        subprocess.TimeoutExpired: if the command did not finish in time
+    """
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    stderr_chunks: List[str] = []
+    timed_out = threading.Event()
+
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace',
+        **new_process_group_kwargs()
+    ) as process, _track(process):
+        def kill_on_timeout() -> None:
+            timed_out.set()
+            kill_process_tree(process)
+
+        # stderr is drained on its own thread so a chatty ffmpeg never blocks
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        stderr_reader.start()
+
+        timer = threading.Timer(timeout, kill_on_timeout) if timeout is not None else None
+        if timer is not None:
+            timer.start()
+
+        try:
+            block: Dict[str, str] = {}
+            for line in process.stdout:
+                key, separator, value = line.strip().partition('=')
+                if not separator:
+                    continue
+
+                block[key] = value
+                if key == 'progress':
+                    try:
+                        on_progress(block)
+                    except Exception as e:
+                        print(f"Progress callback failed: {str(e)}")
+                    block = {}
+
+            process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            kill_process_tree(process)
+            stderr_reader.join()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    return subprocess.CompletedProcess(cmd, process.returncode, b"", "".join(stderr_chunks).encode())
+
+
+def run_process_with_stall_timeout(
+    cmd: List[str],
+    timeout: float,
+    progress: Callable[[], int]
+) -> subprocess.CompletedProcess:
+    """
+    Run a command working through several items, killing it when no item
+    finished for timeout seconds
+
+    Parameters:
+    -----------
+        cmd(List[str]): command and arguments
+        timeout(float): longest time in seconds one item may take
+        progress(Callable[[], int]): number of items finished so far
+
+    Returns:
+    --------
+        subprocess.CompletedProcess: return code and captured output, as bytes
+
+    Raises:
+    -------
+        subprocess.TimeoutExpired: if an item took longer than timeout
+    """
+    # Files instead of pipes, nobody reads them while the command runs
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        with subprocess.Popen(
+            cmd,
+            stdout=stdout,
+            stderr=stderr,
+            **new_process_group_kwargs()
+        ) as process, _track(process):
+            finished = progress()
+            deadline = time.monotonic() + timeout
+
+            while process.poll() is None:
+                time.sleep(STALL_POLL_SECONDS)
+
+                now_finished = progress()
+                if now_finished != finished:
+                    finished = now_finished
+                    deadline = time.monotonic() + timeout
+                elif time.monotonic() > deadline:
+                    kill_process_tree(process)
+                    process.wait()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+
+        stdout.seek(0)
+        stderr.seek(0)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout.read(), stderr.read())
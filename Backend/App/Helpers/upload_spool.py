@@ -0,0 +1,249 @@
+"""
+upload spool module
+
+Stream uploaded files to a spool directory in fixed size chunks, so large
+uploads never sit in memory, and hand the spooled paths to the repositories.
+"""
+import asyncio
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Coroutine, Iterable, List
+
+from fastapi import HTTPException, Request, Response, UploadFile, status
+from fastapi.routing import APIRoute
+from starlette.types import Message, Receive
+
+from config import settings
+
+# Marker of a job that still reads the upload, named after the job id
+HOLD_PREFIX = ".job-"
+
+
+def _safe_filename(filename: str) -> str:
+    """Keep the name of the upload, without any directory part"""
+    name = Path(filename or "").name
+    name = re.sub(r'[^\w.\- ]', '_', name).strip(' .')
+    return name or "upload"
+
+
+def _new_spool_path(filename: str) -> Path:
+    """
+    One directory per upload so the original file name is kept, the
+    handlers use it to name the downloads
+    """
+    upload_dir = Path(settings.UPLOAD_SPOOL_DIR) / uuid.uuid4().hex
+    upload_dir.mkdir(parents=True)
+    return upload_dir / _safe_filename(filename)
+
+
+def too_large() -> HTTPException:
+    """Error for an upload over UPLOAD_MAX_BYTES"""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is larger than {settings.UPLOAD_MAX_BYTES} bytes"
+    )
+
+
+def _limit_body(receive: Receive) -> Receive:
+    """Raise once more than UPLOAD_MAX_BYTES of request body came in"""
+    received = 0
+
+    async def limited_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > settings.UPLOAD_MAX_BYTES:
+                raise too_large()
+        return message
+
+    return limited_receive
+
+
+class UploadRoute(APIRoute):
+    """
+    Route that refuses request bodies over UPLOAD_MAX_BYTES
+
+    The Content-Length header is checked before anything is read and the
+    body is counted while it streams in, so a multipart upload is never
+    parsed past the limit, chunked uploads included.
+    """
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def limited_route_handler(request: Request) -> Response:
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES:
+                raise too_large()
+
+            return await route_handler(Request(request.scope, _limit_body(request.receive)))
+
+        return limited_route_handler
+
+
+async def spool_stream(chunks: AsyncIterator[bytes], filename: str) -> str:
+    """
+    Write a stream of bytes to the spool directory
+
+    The bytes are written in UPLOAD_CHUNK_SIZE blocks and the size limit is
+    checked while streaming, the partial file is removed on any error.
+
+    Parameters:
+    -----------
+        chunks(AsyncIterator[bytes]): the body, e.g. request.stream()
+        filename(str): the name of the uploaded file
+
+    Returns:
+    --------
+        str: the spooled path
+    """
+    spool_path = _new_spool_path(filename)
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+    buffer = bytearray()
+    size = 0
+
+    try:
+        with open(spool_path, 'wb') as fp:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise too_large()
+
+                buffer += chunk
+                while len(buffer) >= chunk_size:
+                    block = bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+                    await asyncio.to_thread(fp.write, block)
+
+            if buffer:
+                await asyncio.to_thread(fp.write, bytes(buffer))
+    except BaseException:
+        discard_spooled([str(spool_path)])
+        raise
+
+    if size == 0:
+        discard_spooled([str(spool_path)])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The uploaded file was empty"
+        )
+
+    return str(spool_path)
+
+
+async def _iter_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def spool_uploads(uploads: List[UploadFile]) -> List[str]:
+    """
+    Spool multipart uploads, all of them or none
+
+    Returns:
+    --------
+        List[str]: the spooled paths in the order of the uploads
+    """
+    spool_paths: List[str] = []
+
+    try:
+        for upload in uploads:
+            spool_paths.append(await spool_stream(_iter_upload(upload), upload.filename))
+    except BaseException:
+        discard_spooled(spool_paths)
+        raise
+
+    return spool_paths
+
+
+def _upload_dirs(spool_paths: Iterable[str]) -> List[Path]:
+    """Upload directories of the paths that are in the spool directory"""
+    spool_root = Path(settings.UPLOAD_SPOOL_DIR).resolve()
+    upload_dirs = []
+
+    for spool_path in spool_paths:
+        upload_dir = Path(spool_path).resolve().parent
+        if upload_dir.parent == spool_root:
+            upload_dirs.append(upload_dir)
+
+    return upload_dirs
+
+
+def discard_spooled(spool_paths: Iterable[str]) -> None:
+    """Delete spooled files together with their upload directory"""
+    for upload_dir in _upload_dirs(spool_paths):
+        try:
+            shutil.rmtree(upload_dir)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Failed to delete spooled upload {upload_dir}: {str(e)}")
+
+
+def hold_spooled(spool_paths: Iterable[str], job_id: str) -> None:
+    """
+    Keep the uploads of a queued job from the sweep until release_spooled,
+    or until the job itself expires after JOB_TTL_SECONDS
+    """
+    for upload_dir in _upload_dirs(spool_paths):
+        try:
+            (upload_dir / f"{HOLD_PREFIX}{job_id}").touch()
+        except OSError as e:
+            print(f"Failed to hold {upload_dir}: {str(e)}")
+
+
+def release_spooled(spool_paths: Iterable[str], job_id: str) -> None:
+    """
+    Drop the hold of a finished job, the uploads expire
+    UPLOAD_SPOOL_TTL_SECONDS later
+    """
+    for upload_dir in _upload_dirs(spool_paths):
+        try:
+            (upload_dir / f"{HOLD_PREFIX}{job_id}").unlink(missing_ok=True)
+            os.utime(upload_dir)
+        except OSError as e:
+            print(f"Failed to release {upload_dir}: {str(e)}")
+
+
+def _is_held(upload_dir: Path) -> bool:
+    """Whether a job that has not expired yet still reads the upload"""
+    expire_before = time.time() - settings.JOB_TTL_SECONDS
+    return any(
+        marker.stat().st_mtime >= expire_before
+        for marker in upload_dir.glob(f"{HOLD_PREFIX}*")
+    )
+
+
+def sweep_spool() -> None:
+    """Delete the uploads older than UPLOAD_SPOOL_TTL_SECONDS that no job holds"""
+    spool_root = Path(settings.UPLOAD_SPOOL_DIR)
+    if not spool_root.exists():
+        return
+
+    expire_before = time.time() - settings.UPLOAD_SPOOL_TTL_SECONDS
+    for upload_dir in spool_root.iterdir():
+        try:
+            if upload_dir.is_dir() and upload_dir.stat().st_mtime < expire_before and not _is_held(upload_dir):
+                shutil.rmtree(upload_dir)
+        except OSError as e:
+            print(f"Failed to sweep {upload_dir}: {str(e)}")
+
+
+async def run_spool_sweeper(stop_event: asyncio.Event) -> None:
+    """
+    Sweep the spool directory in a thread every
+    UPLOAD_SPOOL_SWEEP_INTERVAL_SECONDS until stop_event is set
+    """
+    while not stop_event.is_set():
+        await asyncio.to_thread(sweep_spool)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.UPLOAD_SPOOL_SWEEP_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
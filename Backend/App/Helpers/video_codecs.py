@@ -0,0 +1,145 @@
+"""
+video codecs module
+
+Codec and speed preset matrix for video outputs. The default codecs are the
+LGPL ones the bundled ffmpeg ships with (MPEG4, VP8/VP9), H.264, HEVC and
+AV1 are used when the request asks for them and the ffmpeg build has the
+encoder.
+"""
+import functools
+import subprocess
+from typing import FrozenSet, List, Literal, Optional, Tuple
+
+from config import settings
+
+VideoCodec = Literal["default", "h264", "hevc", "av1"]
+VideoSpeed = Literal["veryfast", "faster", "fast", "medium", "slow"]
+
+VIDEO_CODECS = ("default", "h264", "hevc", "av1")
+VIDEO_SPEEDS = ("veryfast", "faster", "fast", "medium", "slow")
+
+# codec -> encoder, containers it can be muxed into, CRF range and the CRF
+# used for each compression quality (conversions use medium)
+CODEC_MATRIX = {
+    "h264": {
+        "encoder": "libx264",
+        "containers": {'mp4', 'mov', 'mkv', 'flv'},
+        "max_crf": 51,
+        "crf": {"low": 28, "medium": 23, "high": 20},
+    },
+    "hevc": {
+        "encoder": "libx265",
+        "containers": {'mp4', 'mov', 'mkv'},
+        "max_crf": 51,
+        "crf": {"low": 32, "medium": 28, "high": 24},
+    },
+    "av1": {
+        "encoder": "libsvtav1",
+        "containers": {'mp4', 'mkv', 'webm'},
+        "max_crf": 63,
+        "crf": {"low": 42, "medium": 35, "high": 30},
+    },
+}
+
+# SVT-AV1 takes numbered presets, 0 is the slowest
+SVT_AV1_PRESETS = {"veryfast": 10, "faster": 9, "fast": 8, "medium": 6, "slow": 4}
+
+
+@functools.lru_cache(maxsize=None)
+def available_encoders(ffmpeg_path: str) -> FrozenSet[str]:
+    """Encoders of an ffmpeg build, listed once per process"""
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, '-hide_banner', '-encoders'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=30,
+            check=False
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Failed to list the ffmpeg encoders: {str(e)}")
+        return frozenset()
+
+    # " V....D libx264   libx264 H.264 / AVC ..."
+    encoders = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in 'VAS':
+            encoders.add(parts[1])
+
+    return frozenset(encoders)
+
+
+def resolve_video_options(codec: Optional[str], speed: Optional[str]) -> Tuple[str, str]:
+    """
+    Fill in VIDEO_CODEC_DEFAULT and VIDEO_SPEED_DEFAULT
+
+    Raises:
+    -------
+        ValueError: for an unknown codec or speed
+    """
+    codec = codec or settings.VIDEO_CODEC_DEFAULT
+    speed = speed or settings.VIDEO_SPEED_DEFAULT
+
+    if codec not in VIDEO_CODECS:
+        raise ValueError(f"Unknown video codec {codec}, expected one of {', '.join(VIDEO_CODECS)}")
+    if speed not in VIDEO_SPEEDS:
+        raise ValueError(f"Unknown speed preset {speed}, expected one of {', '.join(VIDEO_SPEEDS)}")
+
+    return codec, speed
+
+
+def usable_codec(codec: str, output_format: str, ffmpeg_path: str) -> str:
+    """
+    The codec to encode with, default when the container can not hold it or
+    ffmpeg was built without its encoder
+    """
+    if codec == "default":
+        return codec
+
+    entry = CODEC_MATRIX[codec]
+    if output_format not in entry["containers"]:
+        return "default"
+
+    if entry["encoder"] not in available_encoders(ffmpeg_path):
+        print(f"{entry['encoder']} is not available in {ffmpeg_path}, using the default codec")
+        return "default"
+
+    return codec
+
+
+def video_encoder_args(
+    codec: str,
+    output_format: str,
+    speed: str,
+    crf: Optional[int] = None,
+    quality: str = "medium"
+) -> List[str]:
+    """
+    Video encoder arguments of a codec from the matrix
+
+    Parameters:
+    -----------
+        codec(str): h264, hevc or av1, as returned by usable_codec
+        output_format(str): the output container
+        speed(str): veryfast, faster, fast, medium or slow
+        crf(int): optional, clamped to the range of the codec
+        quality(str): low, medium or high, picks the CRF when crf is None
+    """
+    entry = CODEC_MATRIX[codec]
+    crf = entry["crf"][quality] if crf is None else min(max(crf, 0), entry["max_crf"])
+    preset = str(SVT_AV1_PRESETS[speed]) if codec == "av1" else speed
+
+    args = [
+        '-c:v', entry["encoder"],
+        '-preset', preset,
+        '-crf', str(crf),
+        '-pix_fmt', 'yuv420p',
+    ]
+
+    # Apple players only take HEVC in MP4/MOV with the hvc1 tag
+    if codec == "hevc" and output_format in ['mp4', 'mov']:
+        args.extend(['-tag:v', 'hvc1'])
+
+    return args
@@ -0,0 +1,241 @@
+"""
+zip stream module
+
+Write ZIP archives straight into the response while the outputs are still
+being produced, instead of building the whole archive on disk first.
+"""
+import asyncio
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from Core.worker_pool import iter_completed
+
+CHUNK_SIZE = 1024 * 1024
+
+# Last entry of a streamed archive, the totals the headers can not carry
+MANIFEST_NAME = "manifest.json"
+
+# Outputs that are already compressed, deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.webp', '.avif', '.heic', '.heif', '.gif',
+    '.mp4', '.m4v', '.mov', '.mkv', '.webm', '.avi', '.flv', '.wmv',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus', '.flac', '.wma',
+    '.pdf', '.docx', '.xlsx', '.pptx', '.zip', '.gz', '.7z',
+}
+
+BatchResult = List[Tuple[str, str, int, bool]]
+
+
+class _StreamSink:
+    """
+    Write-only sink for zipfile, it has tell() but no seek() so zipfile
+    writes data descriptors instead of seeking back to patch the headers
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._buffered += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._buffered = 0
+        return data
+
+
+def compress_type_for(arcname: str) -> int:
+    """
+    Pick STORED for already compressed formats and DEFLATED for the rest
+    """
+    if Path(arcname).suffix.lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+async def iter_zip_stream(
+    entries: AsyncIterator[Tuple[str, str]],
+    manifest: Optional[Callable[[], dict]] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive chunk by chunk
+
+    Parameters:
+    -----------
+        entries(AsyncIterator[Tuple[str, str]]): (file_path, arcname) pairs,
+            every entry is written as soon as it is yielded
+        manifest(Callable[[], dict]): optional, called once the entries are
+            written, its result is added as MANIFEST_NAME
+    """
+    sink = _StreamSink()
+
+    with zipfile.ZipFile(sink, 'w') as archive:
+        async for file_path, arcname in entries:
+            zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+            zinfo.compress_type = compress_type_for(arcname)
+
+            with open(file_path, 'rb') as source, archive.open(zinfo, 'w') as destination:
+                while True:
+                    chunk = await asyncio.to_thread(source.read, CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await asyncio.to_thread(destination.write, chunk)
+
+                    if sink.buffered >= CHUNK_SIZE:
+                        yield sink.drain()
+
+            yield sink.drain()
+
+        if manifest is not None:
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest(), indent=2), compress_type=zipfile.ZIP_DEFLATED)
+
+    # The central directory is written when the archive is closed
+    yield sink.drain()
+
+
+def _discard_outputs(task: asyncio.Future) -> None:
+    """Delete the outputs of a finished batch"""
+    if task.cancelled() or task.exception() is not None:
+        return
+
+    for _, output_path, _, success in task.result():
+        if success and output_path and os.path.exists(output_path):
+            try:
+                os.unlink(output_path)
+            except OSError as e:
+                print(f"Failed to delete temp file {output_path}: {str(e)}")
+
+
+def discard_when_done(tasks: Iterable[asyncio.Future]) -> None:
+    """Delete the outputs of batches once they finish, nobody will download them"""
+    for task in tasks:
+        if task.done():
+            _discard_outputs(task)
+        else:
+            task.add_done_callback(_discard_outputs)
+
+
+def _tally(summary: Dict[str, int], size_header: str, task: asyncio.Future) -> None:
+    """Add a finished batch to the totals of the manifest"""
+    if task.exception() is not None:
+        summary["X-Failed-Files"] += 1
+        return
+
+    for input_path, _, size, success in task.result():
+        if not success:
+            summary["X-Failed-Files"] += 1
+            continue
+
+        summary["X-Total-Files"] += 1
+        summary[size_header] += size or 0
+        # PDF pages are named after the page, not a file
+        if os.path.isfile(input_path):
+            summary["X-Total-Original-Size"] += os.path.getsize(input_path)
+
+
+def _successful_outputs(task: asyncio.Future) -> List[Tuple[str, str]]:
+    """(input_path, output_path) of the successful files of a finished batch"""
+    if task.exception() is not None:
+        print(f"Batch failed: {str(task.exception())}")
+        return []
+
+    return [
+        (input_path, output_path)
+        for input_path, output_path, _, success in task.result()
+        if success
+    ]
+
+
+async def zip_streaming_response(
+    pending: Iterable[Awaitable[BatchResult]],
+    download_name: Callable[[str], str],
+    filename: str,
+    size_header: str = "X-Total-Converted-Size"
+) -> Optional[StreamingResponse]:
+    """
+    Stream the outputs of per-file batches as one ZIP in completion order
+
+    Waits for the first successful output so a request where every file
+    failed still gets an error status, then returns a response that adds
+    the other outputs as their batches finish. The outputs are deleted once
+    the response is done, even if the client disconnects half way, and
+    CancelOnDisconnectMiddleware then stops the batches still running.
+
+    The headers go out before the batches finish, so X-Total-Files,
+    X-Failed-Files and the size totals of a non-streamed response are not
+    headers here. They are the keys of MANIFEST_NAME, the last entry of the
+    archive.
+
+    Parameters:
+    -----------
+        pending(Iterable[Awaitable[BatchResult]]): one batch call per file
+        download_name(Callable[[str], str]): name in the archive for an input path
+        filename(str): name of the downloaded archive
+        size_header(str): key of the output size total in the manifest,
+            X-Total-Converted-Size or X-Total-Compressed-Size
+
+    Returns:
+    --------
+        StreamingResponse or None when every file failed
+    """
+    tasks = [asyncio.ensure_future(batch) for batch in pending]
+    completed = iter_completed(tasks)
+    summary = {"X-Total-Files": 0, "X-Failed-Files": 0, "X-Total-Original-Size": 0, size_header: 0}
+
+    first_outputs: List[Tuple[str, str]] = []
+    try:
+        async for task in completed:
+            _tally(summary, size_header, task)
+            first_outputs = _successful_outputs(task)
+            if first_outputs:
+                break
+    except BaseException:
+        # The request went away before the response was returned
+        discard_when_done(tasks)
+        raise
+
+    if not first_outputs:
+        discard_when_done(tasks)
+        return None
+
+    async def entries() -> AsyncIterator[Tuple[str, str]]:
+        for input_path, output_path in first_outputs:
+            yield output_path, download_name(input_path)
+
+        async for task in completed:
+            _tally(summary, size_header, task)
+            for input_path, output_path in _successful_outputs(task):
+                yield output_path, download_name(input_path)
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in iter_zip_stream(entries(), lambda: summary):
+                yield chunk
+        finally:
+            discard_when_done(tasks)
+
+    return StreamingResponse(
+        body(),
+        media_type='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
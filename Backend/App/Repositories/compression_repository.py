@@ -2,27 +2,94 @@
 Improved compression repository module with temporary file handling
 """
 
+import asyncio
+import io
+import math
 import tempfile
 import os
-import asyncio
 import subprocess
 from pathlib import Path
-from typing import Tuple, List
-from concurrent.futures import ProcessPoolExecutor, as_completed
-import multiprocessing
+from typing import Dict, Literal, Optional, Tuple, List
 import time 
 import shutil 
 
 from sqlalchemy.orm import Session
+from PIL import Image, features
 
 from Services.compression_service import ICompressionSerivce
 from Schemas.task import TaskCompression
 from Entities.tasks import Tasks
+from Helpers.subprocess_runner import run_process
+from Helpers.encoder_profiles import magick_args, pillow_save_args, resolve_effort
+from Helpers.video_codecs import resolve_video_options, usable_codec, video_encoder_args
+from Helpers.media_probe import ffprobe_path_for, probe_media, main_codecs, media_duration, rejected_media
+from Core.result_cache import cached_result, is_cached, store_result
+from Core.progress import run_ffmpeg, current_progress_channel, publish_event
+from Core.worker_pool import get_worker_pool, run_in_pool, submit_to_pool, iter_completed, failed_future
+from Core.ffmpeg_threads import acquire_threads, release_threads, decoder_thread_args, encoder_thread_args
+from config import settings
 
 MAGICK_EXECUTABLE_NAME = 'magick.exe'
 FFMPEG_EXECUTABLE_NAME = 'ffmpeg.exe'
+GHOSTSCRIPT_EXECUTABLE_NAME = 'gswin64c.exe'
 SERVICETYPEID = 2
 
+# Audio encoders are single threaded, audio jobs do not take a share of the budget
+AUDIO_THREADS = 1
+
+CompressionEngine = Literal["auto", "pillow", "imagemagick"]
+COMPRESSION_ENGINES = ("auto", "pillow", "imagemagick")
+
+# Formats the in-process Pillow engine handles, the rest go to ImageMagick
+PILLOW_COMPRESSION_FORMATS = {'jpg', 'jpeg', 'png', 'webp', 'tif', 'tiff'}
+
+# Target size mode: formats where quality drives the size, the quality range
+# searched and how far under the target the search may stop
+TARGET_SIZE_FORMATS = {'jpg', 'jpeg', 'webp'}
+TARGET_SIZE_MIN_QUALITY = 5
+TARGET_SIZE_TOLERANCE = 0.05
+
+# Video quality presets
+VIDEO_QUALITY_SETTINGS = {
+    "low": {
+        "video_quality": "8",     # For MPEG4 q:v (lower quality)
+        "vp9_crf": "40",          # For VP9 (higher = lower quality)
+        "audio_bitrate": "96k"
+    },
+    "medium": {
+        "video_quality": "5",
+        "vp9_crf": "32",
+        "audio_bitrate": "128k"
+    },
+    "high": {
+        "video_quality": "2",
+        "vp9_crf": "24",
+        "audio_bitrate": "192k"
+    }
+}
+
+# PDF quality presets, Ghostscript's base distiller settings and the
+# resolution the embedded images are downsampled to
+PDF_QUALITY_SETTINGS = {
+    "low": {
+        "pdf_settings": "/screen",
+        "image_dpi": 72
+    },
+    "medium": {
+        "pdf_settings": "/ebook",
+        "image_dpi": 150
+    },
+    "high": {
+        "pdf_settings": "/printer",
+        "image_dpi": 300
+    }
+}
+
+# Blank the document information dictionary written by pdfwrite
+PDF_STRIP_METADATA = (
+    "[ /Title () /Author () /Subject () /Keywords () /Creator () /Producer () /DOCINFO pdfmark"
+)
+
 class CompressionRepository(ICompressionSerivce):
     """
     Compression class with temporary file handling
@@ -31,12 +98,15 @@ class CompressionRepository(ICompressionSerivce):
     def __init__(self, db: Session, UserID: int):
         """Initialize with path to magickpath"""
         self.magick_path = self._get_magick_path
-        self.max_workers = max(1, multiprocessing.cpu_count()  - 1)
+        self.worker_pool = get_worker_pool()
         self.ffmpeg_path = self._get_ffmpeg_path
 
         self.db = db
         self.user_id = UserID
 
+        # Quality, Iterations and TargetReached of the target size searches, by input path
+        self.target_searches: Dict[str, dict] = {}
+
     @property
     def _get_magick_path(self) -> str:
         """
@@ -81,6 +151,17 @@ class CompressionRepository(ICompressionSerivce):
         if not Path(input_path).exists():
             raise FileNotFoundError(f"{input_path} not found")
 
+    @staticmethod
+    def _strip_metadata(image: Image.Image) -> Image.Image:
+        """
+        The pixels of an image without its metadata, same as -strip: no
+        EXIF, ICC profile, XMP, IPTC or TIFF tags. Palette transparency is
+        part of the image and is kept
+        """
+        stripped = image.copy()
+        stripped.info = {key: image.info[key] for key in ("transparency",) if key in image.info}
+        return stripped
+
     @staticmethod
     def _create_temp_output_file(suffix: str) -> str:
         """
@@ -101,8 +182,7 @@ class CompressionRepository(ICompressionSerivce):
     @staticmethod
     async def _run_in_executor(func, *args):
         """Helper to run sync function for single file processing"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, func, *args)
+        return await run_in_pool(func, *args)
     
     def _record_task(self, task: TaskCompression ):
         """Record the task"""
@@ -116,7 +196,15 @@ class CompressionRepository(ICompressionSerivce):
 
     #================ IMAGE ================
 
-    async def compress_image(self, input_path: str, quality: int = 50, timeout: int = 300) -> Tuple[str, int]:
+    async def compress_image(
+        self,
+        input_path: str,
+        quality: int = 50,
+        timeout: int = 300,
+        effort: Optional[str] = None,
+        engine: Optional[str] = None,
+        target_bytes: Optional[int] = None
+    ) -> Tuple[str, int]:
         """
         Compress image file keeping the same format (PNG stays PNG, JPEG stays JPEG)
         Returns path to temporary output file and its size
@@ -124,8 +212,13 @@ class CompressionRepository(ICompressionSerivce):
         Parameters:
         ------------
             input_path(str): the path of the original file
-            quality(int): compression quality (1-100)
+            quality(int): compression quality (1-100), the highest quality
+                tried when target_bytes is set
             timeout(int): timeout in seconds
+            effort(str): encoder effort profile, IMAGE_EFFORT_DEFAULT when None
+            engine(str): auto, pillow or imagemagick, IMAGE_COMPRESSION_ENGINE when None
+            target_bytes(int): optional, search the quality that fits this size,
+                see compress_image_to_target
 
         Returns:
         --------
@@ -136,13 +229,15 @@ class CompressionRepository(ICompressionSerivce):
             ValueError: if compression failed
         """
 
+        if target_bytes is not None:
+            data = await self.compress_image_to_target(input_path, target_bytes, quality, timeout, effort)
+            return (data["OutputFilePath"], data["OutputFileSize"])
+
+        effort = resolve_effort(effort)
+
         try:
             data = await self._run_in_executor(
-                self._compress_with_imagemagick_sync,
-                input_path,
-                self.magick_path,
-                quality,
-                timeout
+                *self._image_compress_call(input_path, quality, timeout, effort, engine)
             )
 
             task = TaskCompression(
@@ -176,13 +271,113 @@ class CompressionRepository(ICompressionSerivce):
             self._record_task(task)
 
         return (str(task.OutputFilePath), int(task.OutputFileSize))
-        
+
+    async def compress_image_to_target(
+        self,
+        input_path: str,
+        target_bytes: int,
+        max_quality: int = 95,
+        timeout: int = 300,
+        effort: Optional[str] = None
+    ) -> dict:
+        """
+        Compress a JPEG or WebP image to fit under a size
+
+        Binary searches the quality with in-memory encodes of one decoded
+        image and stops once an output is within TARGET_SIZE_TOLERANCE under
+        the target. When even the lowest quality is too big that output is
+        returned with TargetReached False. The search is also kept in
+        target_searches for the batch and job paths.
+
+        Parameters:
+        -----------
+            input_path(str): the path of the original file
+            target_bytes(int): the largest accepted output size
+            max_quality(int): the highest quality tried
+            timeout(int): time budget of the search in seconds, the best
+                output found by then is returned
+            effort(str): encoder effort profile, IMAGE_EFFORT_DEFAULT when None
+
+        Returns:
+        --------
+            dict: OutputFilePath, OutputFileSize, Quality, Iterations and
+                TargetReached, OutputFilePath is empty when it failed
+        """
+        effort = resolve_effort(effort)
+
+        try:
+            data = await self._run_in_executor(
+                self._compress_to_target_sync,
+                input_path,
+                target_bytes,
+                max_quality,
+                effort,
+                timeout
+            )
+
+            task = TaskCompression(
+                UserID=self.user_id,
+                ServiceTypeID=SERVICETYPEID,
+                OriginalFileName=data["OriginalFileName"],
+                OriginalFileSize=data["OriginalFileSize"],
+                OriginalFilePath=data["OriginalFilePath"],
+                OutputFileName=data["OutputFileName"],
+                OutputFileSize=data["OutputFileSize"],
+                OutputFilePath=data["OutputFilePath"],
+                CompressionLevel=data["CompressionLevel"],
+                TaskStatus=True,
+                TaskTime=data["TaskTime"]
+            )
+
+            self._record_task(task)
+
+        except Exception as e:
+            print(f"Fail to compress {input_path}: {str(e)}")
+            task = TaskCompression(
+                UserID=self.user_id,
+                ServiceTypeID=SERVICETYPEID,
+                OriginalFileName=Path(input_path).stem,
+                OriginalFileSize=os.path.getsize(input_path),
+                OriginalFilePath=input_path,
+                TaskStatus=False,
+                TaskTime=0
+            )
+
+            self._record_task(task)
+
+            return {
+                "OutputFilePath": "",
+                "OutputFileSize": 0,
+                "Quality": None,
+                "Iterations": 0,
+                "TargetReached": False
+            }
+
+        self._keep_target_search(input_path, data)
+
+        return {
+            "OutputFilePath": data["OutputFilePath"],
+            "OutputFileSize": data["OutputFileSize"],
+            **self.target_searches[input_path]
+        }
+
+    def _keep_target_search(self, input_path: str, data: dict) -> None:
+        """Keep the outcome of a target size search for the callers of the batch"""
+        if "Iterations" in data:
+            self.target_searches[input_path] = {
+                "Quality": data["Quality"],
+                "Iterations": data["Iterations"],
+                "TargetReached": data["TargetReached"]
+            }
 
     async def compress_images_batch(
         self,
         input_paths: List[str],
         quality: int = 50,
-        timeout: int = 300
+        timeout: int = 300,
+        effort: Optional[str] = None,
+        engine: Optional[str] = None,
+        target_bytes: Optional[int] = None
     ) -> List[Tuple[str, str, int, bool]]:
         """
         Compress multiple images in parallel
@@ -192,6 +387,10 @@ class CompressionRepository(ICompressionSerivce):
             input_paths(List[str]): list of input file paths
             quality(int): compression quality
             timeout(int): timeout per file
+            effort(str): encoder effort profile, IMAGE_EFFORT_DEFAULT when None
+            engine(str): auto, pillow or imagemagick, IMAGE_COMPRESSION_ENGINE when None
+            target_bytes(int): optional, search the quality that fits this size,
+                the outcome of each search is kept in target_searches
 
         Returns:
         --------
@@ -199,66 +398,110 @@ class CompressionRepository(ICompressionSerivce):
         """
         if not input_paths:
             return []
-        
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._compress_with_imagemagick_sync,
-                    input_path,
-                    self.magick_path,
-                    quality,
-                    timeout
-                ): input_path for input_path in input_paths
-            }
 
-            results = []
+        effort = resolve_effort(effort)
+
+        future_to_path = {
+            submit_to_pool(
+                *self._image_compress_call(input_path, quality, timeout, effort, engine, target_bytes)
+            ): input_path for input_path in input_paths
+        }
+
+        results = []
 
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result(timeout=timeout + 10)
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
                     
-                    task = TaskCompression(
-                        UserID=self.user_id, 
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        CompressionLevel=data["CompressionLevel"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
-
-                    self._record_task(task)
-
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to compress {input_path}: {str(e)}")
-                    task = TaskCompression(
-                        UserID=self.user_id, 
-                        ServiceTypeID=SERVICETYPEID, 
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
-
-                    self._record_task(task)
-                    results.append((input_path, "", 0, False))
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    CompressionLevel=data["CompressionLevel"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
+
+                self._record_task(task)
+                self._keep_target_search(input_path, data)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to compress {input_path}: {str(e)}")
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID, 
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
 
 
         return results
     
+    def _image_compress_call(
+        self,
+        input_path: str,
+        quality: int,
+        timeout: int,
+        effort: str,
+        engine: Optional[str] = None,
+        target_bytes: Optional[int] = None
+    ) -> tuple:
+        """
+        Pick the sync compression function for an image and its arguments
+
+        Pillow runs in the worker process and skips the magick startup,
+        ImageMagick stays the fallback for the formats Pillow does not handle.
+        The target size search always runs in Pillow.
+
+        Raises:
+        -------
+            ValueError: for an unknown engine
+        """
+        if target_bytes is not None:
+            return (self._compress_to_target_sync, input_path, target_bytes, quality, effort, timeout)
+
+        engine = engine or settings.IMAGE_COMPRESSION_ENGINE
+        if engine not in COMPRESSION_ENGINES:
+            raise ValueError(f"Unknown compression engine {engine}, expected one of {', '.join(COMPRESSION_ENGINES)}")
+
+        input_format = Path(input_path).suffix.lstrip('.').lower()
+        if engine != "imagemagick" and input_format in PILLOW_COMPRESSION_FORMATS:
+            compress = self._compress_with_pillow_sync
+        else:
+            compress = self._compress_with_imagemagick_sync
+
+        return (compress, input_path, self.magick_path, quality, timeout, effort)
+
+    @staticmethod
+    def _compression_level(quality: int) -> str:
+        """Compression level recorded for a quality"""
+        if quality > 75:
+            return "low"
+        if quality > 50:
+            return "medium"
+        return "high"
+
     @staticmethod
+    @cached_result("compress_image", key_args=("quality", "effort"))
     def _compress_with_imagemagick_sync(
         input_path: str,
         magick_path: str,
         quality: int,
-        timeout: int = 300
+        timeout: int = 300,
+        effort: str = "max"
     ) -> dict:
         """
         Compress image using ImageMagick (Universal - ALL formats)
@@ -277,6 +520,7 @@ class CompressionRepository(ICompressionSerivce):
             magick_path(str): path to ImageMagick executable
             quality(int): quality level (1-100)
             timeout(int): timeout in seconds
+            effort(str): encoder effort profile, fast, balanced or max
 
         Returns:
         --------
@@ -296,8 +540,8 @@ class CompressionRepository(ICompressionSerivce):
                 '-sampling-factor', '4:2:0',  # Reduce chroma channel resolution
                 '-strip',  # Remove metadata
                 '-quality', str(quality),
-                '-interlace', 'JPEG',  # Progressive JPEG
-                '-colorspace', 'sRGB'
+                '-colorspace', 'sRGB',
+                *magick_args(input_format, effort)
             ])
 
         elif input_format == 'png':
@@ -305,9 +549,7 @@ class CompressionRepository(ICompressionSerivce):
             cmd.extend([
                 '-strip',  # Remove metadata
                 '-quality', str(quality),
-                '-define', 'png:compression-level=9',  # Maximum compression
-                '-define', 'png:compression-filter=5',
-                '-define', 'png:compression-strategy=1'
+                *magick_args(input_format, effort)
             ])
 
             # For aggressive compression, reduce colors
@@ -328,7 +570,7 @@ class CompressionRepository(ICompressionSerivce):
             cmd.extend([
                 '-strip',
                 '-quality', str(quality),
-                '-define', 'webp:method=6',  # Best compression method
+                *magick_args(input_format, effort),
                 '-define', 'webp:lossless=false'
             ])
 
@@ -360,7 +602,7 @@ class CompressionRepository(ICompressionSerivce):
             cmd.extend([
                 '-strip',
                 '-quality', str(quality),
-                '-define', 'avif:speed=0'  # Best compression (slower)
+                *magick_args(input_format, effort)
             ])
 
         else:
@@ -374,23 +616,12 @@ class CompressionRepository(ICompressionSerivce):
         output_path = CompressionRepository._create_temp_output_file(f'.{input_format}')
         cmd.append(output_path)
 
-        if quality > 75:
-            compression_level = "low"
-        elif quality > 50:
-            compression_level = "medium"
-        else:
-            compression_level = "high"
+        compression_level = CompressionRepository._compression_level(quality)
 
         start_time = time.perf_counter()
 
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
-                check=False
-            )
+            result = run_process(cmd, timeout=timeout)
 
             if result.returncode != 0:
                 error_msg = result.stderr.decode() if result.stderr else "Unknown error"
@@ -433,16 +664,252 @@ class CompressionRepository(ICompressionSerivce):
             "TaskTime": end_time - start_time
         }
 
+    @staticmethod
+    @cached_result("compress_image_pillow", key_args=("quality", "effort"))
+    def _compress_with_pillow_sync(
+        input_path: str,
+        magick_path: str,
+        quality: int,
+        timeout: int = 300,
+        effort: str = "max"
+    ) -> dict:
+        """
+        Compress JPEG, PNG, WebP and TIFF in process with Pillow
+
+        Same output as the ImageMagick arguments: metadata stripped (a
+        fresh image without EXIF, ICC, XMP or TIFF tags), 4:2:0 JPEG,
+        progressive at the balanced and max efforts, and a 256 color
+        palette for PNG below quality 85, quantized with libimagequant when
+        Pillow is built with it. Animated and multi page files are handed
+        to ImageMagick.
+
+        Parameters:
+        -----------
+            input_path(str): input file path
+            magick_path(str): path to ImageMagick executable, for the fallback
+            quality(int): quality level (1-100)
+            timeout(int): timeout in seconds of the ImageMagick fallback
+            effort(str): encoder effort profile, fast, balanced or max
+
+        Returns:
+        --------
+            dict: same fields as _compress_with_imagemagick_sync
+        """
+        if not Path(input_path).exists():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        input_format = Path(input_path).suffix.lstrip('.').lower()
+
+        start_time = time.perf_counter()
+
+        try:
+            image = Image.open(input_path)
+        except Exception as e:
+            raise ValueError(f"Failed to open input file: {str(e)}") from e
+
+        with image:
+            if getattr(image, "n_frames", 1) > 1:
+                return CompressionRepository._compress_with_imagemagick_sync.__wrapped__(
+                    input_path, magick_path, quality, timeout, effort
+                )
+
+            save_args = pillow_save_args(input_format, effort)
+
+            if input_format in ['jpg', 'jpeg']:
+                compressed = image if image.mode in ("RGB", "L") else image.convert("RGB")
+                save_args.update(format="JPEG", quality=quality, subsampling="4:2:0")
+
+            elif input_format == 'png':
+                compressed = image
+                if quality < 85 and image.mode != "P":
+                    # Same as -colors 256
+                    compressed = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+                    if features.check_feature("libimagequant"):
+                        method = Image.Quantize.LIBIMAGEQUANT
+                    elif compressed.mode == "RGBA":
+                        method = Image.Quantize.FASTOCTREE
+                    else:
+                        method = Image.Quantize.MEDIANCUT
+                    compressed = compressed.quantize(256, method=method)
+                save_args.update(format="PNG")
+
+            elif input_format == 'webp':
+                compressed = image if image.mode in ("RGB", "RGBA") else image.convert("RGBA")
+                save_args.update(format="WEBP", quality=quality, lossless=False)
+
+            else:
+                compressed = image
+                save_args = {"format": "TIFF", "compression": "tiff_lzw"}
+
+            compressed = CompressionRepository._strip_metadata(compressed)
+            save_args.update(exif=b"", icc_profile=None)
+
+            output_path = CompressionRepository._create_temp_output_file(f'.{input_format}')
+
+            try:
+                compressed.save(output_path, **save_args)
+
+                file_size = os.path.getsize(output_path)
+                if file_size == 0:
+                    raise ValueError("The created file was empty")
+            except Exception as e:
+                if Path(output_path).exists():
+                    os.unlink(output_path)
+                raise ValueError(f"Compression failed: {str(e)}") from e
+
+        end_time = time.perf_counter()
+
+        return {
+            "OriginalFileName": Path(input_path).stem,
+            "OriginalFileSize": os.path.getsize(input_path),
+            "OriginalFilePath": input_path,
+            "OutputFileName": Path(output_path).stem,
+            "OutputFileSize": file_size,
+            "OutputFilePath": output_path,
+            "TaskStatus": True,
+            "CompressionLevel": CompressionRepository._compression_level(quality),
+            "TaskTime": end_time - start_time
+        }
+
+    @staticmethod
+    @cached_result("compress_image_target", key_args=("target_bytes", "max_quality", "effort"))
+    def _compress_to_target_sync(
+        input_path: str,
+        target_bytes: int,
+        max_quality: int = 95,
+        effort: str = "max",
+        timeout: Optional[float] = None
+    ) -> dict:
+        """
+        Search the highest quality that fits under target_bytes
+
+        The image is decoded once and every probe is encoded into memory,
+        only the chosen output is written to disk. Past the deadline no
+        further probe starts and the best output so far is written, such a
+        result is not cached.
+
+        Parameters:
+        -----------
+            input_path(str): input file path, JPEG or WebP
+            target_bytes(int): the largest accepted output size
+            max_quality(int): the highest quality tried
+            effort(str): encoder effort profile, fast, balanced or max
+            timeout(float): optional time budget of the search in seconds
+
+        Returns:
+        --------
+            dict: the task fields plus Quality, Iterations, TargetReached and
+                TimedOut
+        """
+        if not Path(input_path).exists():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        input_format = Path(input_path).suffix.lstrip('.').lower()
+        if input_format not in TARGET_SIZE_FORMATS:
+            raise ValueError(f"Target size compression supports JPEG and WebP, not {input_format.upper()}")
+
+        start_time = time.perf_counter()
+        deadline = start_time + timeout if timeout is not None else None
+
+        try:
+            with Image.open(input_path) as image:
+                if input_format == 'webp':
+                    decoded = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+                else:
+                    decoded = image.convert("RGB") if image.mode not in ("RGB", "L") else image
+                decoded = CompressionRepository._strip_metadata(decoded)
+        except Exception as e:
+            raise ValueError(f"Failed to open input file: {str(e)}") from e
+
+        save_args = pillow_save_args(input_format, effort)
+        save_args.update(exif=b"", icc_profile=None)
+        if input_format == 'webp':
+            save_args.update(format="WEBP", lossless=False)
+        else:
+            save_args.update(format="JPEG", subsampling="4:2:0")
+
+        def encode(quality: int) -> bytes:
+            buffer = io.BytesIO()
+            decoded.save(buffer, quality=quality, **save_args)
+            return buffer.getvalue()
+
+        low, high = TARGET_SIZE_MIN_QUALITY, max(TARGET_SIZE_MIN_QUALITY, min(max_quality, 100))
+        lower_bound = target_bytes * (1 - TARGET_SIZE_TOLERANCE)
+        best: Optional[Tuple[int, bytes]] = None
+        smallest: Optional[Tuple[int, bytes]] = None
+        iterations = 0
+        timed_out = False
+
+        while low <= high:
+            if iterations and deadline is not None and time.perf_counter() >= deadline:
+                timed_out = True
+                break
+
+            quality = (low + high) // 2
+            encoded = encode(quality)
+            iterations += 1
+
+            if smallest is None or len(encoded) < len(smallest[1]):
+                smallest = (quality, encoded)
+
+            if len(encoded) <= target_bytes:
+                best = (quality, encoded)
+                if len(encoded) >= lower_bound:
+                    break
+                low = quality + 1
+            else:
+                high = quality - 1
+
+        target_reached = best is not None
+        if best is None:
+            # Lowest quality tried is still too big, hand back the smallest output
+            best = smallest
+
+        quality, encoded = best
+
+        output_path = CompressionRepository._create_temp_output_file(f'.{input_format}')
+        try:
+            with open(output_path, 'wb') as fp:
+                fp.write(encoded)
+        except Exception as e:
+            if Path(output_path).exists():
+                os.unlink(output_path)
+            raise ValueError(f"Compression failed: {str(e)}") from e
+
+        end_time = time.perf_counter()
+
+        return {
+            "OriginalFileName": Path(input_path).stem,
+            "OriginalFileSize": os.path.getsize(input_path),
+            "OriginalFilePath": input_path,
+            "OutputFileName": Path(output_path).stem,
+            "OutputFileSize": len(encoded),
+            "OutputFilePath": output_path,
+            "TaskStatus": True,
+            "CompressionLevel": CompressionRepository._compression_level(quality),
+            "TaskTime": end_time - start_time,
+            "Quality": quality,
+            "Iterations": iterations,
+            "TargetReached": target_reached,
+            "TimedOut": timed_out
+        }
+
     #================ Video ================
     async def compress_video(
         self,
         input_path: str,
         quality: str = "low",
-        timeout: int = 600
+        timeout: int = 600,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
     ) -> Tuple[str, int]:
         """
         Compress video file while maintaining format
 
+        Long inputs are encoded as segments in parallel, see
+        video_segment_count.
+
         Quality presets:
         - "low": Aggressive compression (smallest file, lower quality)
         - "medium": Balanced compression (good quality/size ratio)
@@ -453,6 +920,9 @@ class CompressionRepository(ICompressionSerivce):
             input_path(str): path to input video file
             quality(str): compression quality preset
             timeout(int): timeout in seconds
+            codec(str): video codec, default, h264, hevc or av1, VIDEO_CODEC_DEFAULT when None
+            speed(str): encoder speed preset, veryfast to slow, VIDEO_SPEED_DEFAULT when None
+            crf(int): optional, overrides the CRF the quality preset picks
 
         Returns:
         --------
@@ -463,14 +933,28 @@ class CompressionRepository(ICompressionSerivce):
             ValueError: if compression failed
         """
 
+        codec, speed = resolve_video_options(codec, speed)
+
         try:
-            data = await self._run_in_executor(
-                self._compress_video_sync,
-                input_path,
-                self.ffmpeg_path,
-                quality,
-                timeout
-            )
+            segments = await self.video_segment_count(input_path)
+            if segments > 1 and not await asyncio.to_thread(
+                is_cached, "compress_video", input_path,
+                {"quality": quality, "codec": codec, "speed": speed, "crf": crf}
+            ):
+                data = await self._compress_video_segmented(
+                    input_path, quality, timeout, codec, speed, crf, segments
+                )
+            else:
+                data = await self._run_in_executor(
+                    self._compress_video_sync,
+                    input_path,
+                    self.ffmpeg_path,
+                    quality,
+                    timeout,
+                    codec,
+                    speed,
+                    crf
+                )
 
             task = TaskCompression(
                 UserID=self.user_id, 
@@ -503,6 +987,155 @@ class CompressionRepository(ICompressionSerivce):
 
         return (str(task.OutputFilePath), int(task.OutputFileSize))
 
+    async def video_segment_count(self, input_path: str) -> int:
+        """
+        Number of segments a single video is encoded in
+
+        An input of VIDEO_SEGMENT_MIN_DURATION seconds or more is split so
+        every worker of the pool gets a segment of at least
+        VIDEO_SEGMENT_MIN_LENGTH seconds. 1 means one ffmpeg encodes the
+        whole file, also when ffprobe is missing or can not read it.
+        """
+        if not settings.VIDEO_SEGMENT_ENABLED:
+            return 1
+
+        ffprobe_path = ffprobe_path_for(self.ffmpeg_path)
+        if ffprobe_path is None:
+            return 1
+
+        try:
+            probe = await asyncio.to_thread(probe_media, input_path, ffprobe_path)
+        except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+            print(f"Failed to probe {input_path}: {str(e)}")
+            return 1
+
+        duration = media_duration(probe)
+        if duration is None or duration < settings.VIDEO_SEGMENT_MIN_DURATION:
+            return 1
+
+        video_codec, _ = main_codecs(probe)
+        if video_codec is None:
+            return 1
+
+        max_segments = int(duration // max(1, settings.VIDEO_SEGMENT_MIN_LENGTH))
+        return max(1, min(self.worker_pool.max_workers, max_segments))
+
+    async def _compress_video_segmented(
+        self,
+        input_path: str,
+        quality: str,
+        timeout: int,
+        codec: str,
+        speed: str,
+        crf: Optional[int],
+        segments: int
+    ) -> dict:
+        """
+        Compress a long video as segments encoded in parallel
+
+        The video stream is copied into segments cut at keyframes, every
+        segment is encoded on its own worker while the audio is encoded once
+        on another, then the concat demuxer joins them without re-encoding.
+        Inside a job a progress event follows every encoded segment, the
+        progress being the share of the duration encoded so far. The output
+        is stored in the result cache like _compress_video_sync.
+
+        Parameters:
+        -----------
+            input_path(str): input file path
+            quality(str): quality preset ("low", "medium", "high")
+            timeout(int): timeout in seconds of every ffmpeg step
+            codec, speed, crf: resolved video codec options
+            segments(int): number of segments, from video_segment_count
+
+        Returns:
+        --------
+            dict: same fields as _compress_video_sync plus Segments
+        """
+        self._verify_input_path(input_path)
+        input_format = Path(input_path).suffix.lstrip('.').lower()
+        cache_params = {"quality": quality, "codec": codec, "speed": speed, "crf": crf}
+
+        quality = quality if quality in VIDEO_QUALITY_SETTINGS else "medium"
+        usable = await asyncio.to_thread(usable_codec, codec, input_format, self.ffmpeg_path)
+
+        probe = await asyncio.to_thread(probe_media, input_path, ffprobe_path_for(self.ffmpeg_path))
+        _, audio_codec = main_codecs(probe)
+        segment_time = math.ceil(media_duration(probe) / segments)
+
+        work_dir = tempfile.mkdtemp(prefix="converto_segments_")
+        output_path = self._create_temp_output_file(f'.{input_format}')
+        futures = []
+
+        start_time = time.perf_counter()
+
+        try:
+            if audio_codec is not None:
+                audio_future = submit_to_pool(
+                    self._encode_audio_track_sync,
+                    input_path, self.ffmpeg_path, work_dir, input_format, quality, timeout
+                )
+                futures.append(audio_future)
+
+            split_future = submit_to_pool(
+                self._split_video_sync, input_path, self.ffmpeg_path, work_dir, segment_time, timeout
+            )
+            futures.append(split_future)
+            segment_durations = await split_future
+
+            segment_futures = {
+                submit_to_pool(
+                    self._encode_segment_sync,
+                    segment_path, self.ffmpeg_path, input_format, quality, usable, speed, crf, timeout
+                ): duration
+                for segment_path, duration in segment_durations
+            }
+            futures.extend(segment_futures)
+
+            total_duration = sum(segment_futures.values())
+            encoded_duration = 0.0
+            async for future in iter_completed(segment_futures):
+                future.result()
+                encoded_duration += segment_futures[future]
+                await self._publish_segment_progress(input_path, encoded_duration, total_duration)
+
+            encoded_paths = [future.result() for future in segment_futures]
+            audio_path = await audio_future if audio_codec is not None else None
+
+            await run_in_pool(
+                self._concat_segments_sync,
+                encoded_paths, audio_path, self.ffmpeg_path, work_dir, output_path, timeout
+            )
+
+        except Exception as e:
+            if Path(output_path).exists():
+                os.unlink(output_path)
+            raise ValueError(f"Segmented video compression failed: {str(e)}") from e
+
+        finally:
+            # Let the other segments finish before their directory goes away
+            await asyncio.gather(*futures, return_exceptions=True)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        end_time = time.perf_counter()
+
+        data = {
+            "OriginalFileName": Path(input_path).stem,
+            "OriginalFileSize": os.path.getsize(input_path),
+            "OriginalFilePath": input_path,
+            "OutputFileName": Path(output_path).stem,
+            "OutputFileSize": os.path.getsize(output_path),
+            "OutputFilePath": output_path,
+            "TaskStatus": True,
+            "CompressionLevel": quality,
+            "TaskTime": end_time - start_time,
+            "Segments": len(encoded_paths)
+        }
+
+        await asyncio.to_thread(store_result, "compress_video", input_path, cache_params, data)
+
+        return data
+
     async def compress_audio(
         self,
         input_path: str,
@@ -572,7 +1205,10 @@ class CompressionRepository(ICompressionSerivce):
         self,
         input_paths: List[str],
         quality: str = "low",
-        timeout: int = 600
+        timeout: int = 600,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
     ) -> List[Tuple[str, str, int, bool]]:
         """
         Compress multiple videos in parallel
@@ -582,6 +1218,7 @@ class CompressionRepository(ICompressionSerivce):
             input_paths(List[str]): list of input video paths
             quality(str): compression quality preset
             timeout(int): timeout per file
+            codec, speed, crf: optional video codec options, see compress_video
 
         Returns:
         --------
@@ -590,55 +1227,62 @@ class CompressionRepository(ICompressionSerivce):
         if not input_paths:
             return []
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._compress_video_sync,
-                    input_path,
-                    self.ffmpeg_path,
-                    quality,
-                    timeout
-                ): input_path for input_path in input_paths
-            }
+        codec, speed = resolve_video_options(codec, speed)
+
+        # Corrupt inputs and files without video fail here instead of taking a worker
+        rejected = await rejected_media(input_paths, self.ffmpeg_path, "video")
+
+        future_to_path = {
+            (failed_future(ValueError(rejected[input_path])) if input_path in rejected else submit_to_pool(
+                self._compress_video_sync,
+                input_path,
+                self.ffmpeg_path,
+                quality,
+                timeout,
+                codec,
+                speed,
+                crf
+            )): input_path for input_path in input_paths
+        }
 
-            results = []
+        results = []
 
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result(timeout=timeout + 10)
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
                     
-                    task = TaskCompression(
-                        UserID=self.user_id, 
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        CompressionLevel=data["CompressionLevel"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
-
-                    self._record_task(task)
-
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to compress {input_path}: {str(e)}")
-                    task = TaskCompression(
-                        UserID=self.user_id, 
-                        ServiceTypeID=SERVICETYPEID, 
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
-
-                    self._record_task(task)
-                    results.append((input_path, "", 0, False))
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    CompressionLevel=data["CompressionLevel"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
+
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to compress {input_path}: {str(e)}")
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID, 
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
 
         return results
 
@@ -664,39 +1308,173 @@ class CompressionRepository(ICompressionSerivce):
         if not input_paths:
             return []
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._compress_audio_sync,
-                    input_path,
-                    self.ffmpeg_path,
-                    bitrate,
-                    timeout
-                ): input_path for input_path in input_paths
-            }
+        rejected = await rejected_media(input_paths, self.ffmpeg_path, "audio")
+
+        future_to_path = {
+            (failed_future(ValueError(rejected[input_path])) if input_path in rejected else submit_to_pool(
+                self._compress_audio_sync,
+                input_path,
+                self.ffmpeg_path,
+                bitrate,
+                timeout
+            )): input_path for input_path in input_paths
+        }
+
+        results = []
+
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
+
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    CompressionLevel=data["CompressionLevel"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
+
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to compress audio {input_path}: {str(e)}")
+                task = TaskCompression(
+                    UserID=self.user_id, 
+                    ServiceTypeID=SERVICETYPEID, 
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
+
+        return results
+
+    @staticmethod
+    def _video_codec_args(
+        input_format: str,
+        quality: str,
+        codec: str = "default",
+        speed: str = "medium",
+        crf: Optional[int] = None
+    ) -> List[str]:
+        """
+        Codec arguments of a video compression, shared by the whole and the
+        segmented encodes, codec is the one returned by usable_codec
+        """
+        return [
+            *CompressionRepository._video_stream_args(input_format, quality, codec, speed, crf),
+            *CompressionRepository._audio_stream_args(input_format, quality),
+        ]
+
+    @staticmethod
+    def _video_stream_args(
+        input_format: str,
+        quality: str,
+        codec: str = "default",
+        speed: str = "medium",
+        crf: Optional[int] = None
+    ) -> List[str]:
+        """Video encoder arguments of a video compression"""
+        preset = VIDEO_QUALITY_SETTINGS[quality]
+
+        # Choose codec based on format
+        if codec != "default":
+            # H.264/HEVC/AV1 from the codec matrix, CRF picked by the quality preset
+            return video_encoder_args(codec, input_format, speed, crf, quality)
+
+        if input_format == 'webm':
+            # WebM: Use VP9 (LGPL)
+            args = [
+                '-c:v', 'libvpx-vp9',
+                '-crf', preset['vp9_crf'],
+                '-b:v', '0',              # Use CRF mode
+                '-row-mt', '1',           # Multithreading
+                '-cpu-used', '2',         # Speed/quality tradeoff (0=slowest/best, 5=fastest)
+            ]
+        else:
+            # MP4/MOV/MKV/AVI: Use MPEG4 (LGPL)
+            args = [
+                '-c:v', 'mpeg4',
+                '-q:v', preset['video_quality'],
+                '-g', '300',              # Keyframe interval
+            ]
+
+        args.extend(['-pix_fmt', 'yuv420p'])  # Pixel format
 
-            results = []
+        return args
+
+    @staticmethod
+    def _audio_stream_args(input_format: str, quality: str) -> List[str]:
+        """Audio encoder arguments of a video compression"""
+        if input_format == 'webm':
+            # Vorbis (LGPL)
+            args = ['-c:a', 'libvorbis', '-q:a', '4']  # Vorbis quality (0-10)
+        else:
+            # AAC (LGPL)
+            args = ['-c:a', 'aac', '-b:a', VIDEO_QUALITY_SETTINGS[quality]['audio_bitrate']]
+
+        args.extend(['-ar', '44100'])  # Sample rate
+
+        return args
+
+    @staticmethod
+    def _audio_codec_args(input_format: str, bitrate: str) -> List[str]:
+        """
+        Codec arguments of an audio compression
+        """
+        if input_format == 'mp3':
+            args = ['-c:a', 'libmp3lame', '-b:a', bitrate, '-q:a', '2']
+        elif input_format == 'ogg':
+            args = ['-c:a', 'libvorbis', '-q:a', '4']  # Quality level (0-10)
+        elif input_format == 'opus':
+            args = ['-c:a', 'libopus', '-b:a', bitrate, '-vbr', 'on', '-compression_level', '10']
+        elif input_format == 'wav':
+            # WAV: PCM (LGPL, lossless)
+            args = ['-c:a', 'pcm_s16le', '-ar', '44100']
+        elif input_format == 'flac':
+            args = ['-c:a', 'flac', '-compression_level', '8']
+        else:
+            # m4a, aac, wma and the rest: AAC
+            args = ['-c:a', 'aac', '-b:a', bitrate]
 
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    output_path, file_size = future.result(timeout=timeout + 10)
-                    results.append((input_path, output_path, file_size, True))
-                except Exception as e:
-                    print(f"Failed to compress audio {input_path}: {str(e)}")
-                    results.append((input_path, "", 0, False))
+        if input_format not in ['wav', 'flac']:  # Don't change sample rate for lossless
+            args.extend(['-ar', '44100', '-ac', '2'])
 
-            return results
+        return args
 
     @staticmethod
+    def _audio_compression_level(bitrate: str) -> str:
+        if bitrate == "64k":
+            return "low"
+        if bitrate == "128k":
+            return "medium"
+        return "high"
+
+    @staticmethod
+    @cached_result("compress_video", key_args=("quality", "codec", "speed", "crf"))
     def _compress_video_sync(
         input_path: str,
         ffmpeg_path: str,
         quality: str = "low",
-        timeout: int = 600
+        timeout: int = 600,
+        codec: str = "default",
+        speed: str = "medium",
+        crf: Optional[int] = None
     ) -> dict:
         """
-        Compress video using LGPL-compatible codecs only
+        Compress video using LGPL-compatible codecs by default
 
         Available LGPL codecs in your FFmpeg:
         - VP9 (libvpx-vp9) for WebM
@@ -704,6 +1482,9 @@ class CompressionRepository(ICompressionSerivce):
         - AAC (aac) for audio
         - Vorbis (libvorbis) for audio
 
+        H.264, HEVC and AV1 are used when asked for and the FFmpeg build has
+        the encoder, otherwise the default codec is used.
+
         Compression ratios by quality:
         - low: 60-80% size reduction
         - medium: 40-60% size reduction
@@ -715,6 +1496,9 @@ class CompressionRepository(ICompressionSerivce):
             ffmpeg_path(str): path to FFmpeg executable
             quality(str): quality preset ("low", "medium", "high")
             timeout(int): timeout in seconds
+            codec(str): default, h264, hevc or av1
+            speed(str): encoder speed preset of h264/hevc/av1
+            crf(int): optional, overrides the CRF of the quality preset
 
         Returns:
         --------
@@ -725,73 +1509,23 @@ class CompressionRepository(ICompressionSerivce):
 
         input_format = Path(input_path).suffix.lstrip('.').lower()
 
-        # Quality settings
-        quality_settings = {
-            "low": {
-                "video_quality": "8",     # For MPEG4 q:v (lower quality)
-                "vp9_crf": "40",          # For VP9 (higher = lower quality)
-                "audio_bitrate": "96k"
-            },
-            "medium": {
-                "video_quality": "5",
-                "vp9_crf": "32",
-                "audio_bitrate": "128k"
-            },
-            "high": {
-                "video_quality": "2",
-                "vp9_crf": "24",
-                "audio_bitrate": "192k"
-            }
-        }
-
-        if quality not in quality_settings:
-            quality = "medium"
-
-        settings = quality_settings[quality]
+        quality = quality if quality in VIDEO_QUALITY_SETTINGS else "medium"
+        codec = usable_codec(codec, input_format, ffmpeg_path)
 
         # Create temp output file
         output_path = CompressionRepository._create_temp_output_file(f'.{input_format}')
 
+        threads = acquire_threads()
+
         # Build FFmpeg command
         cmd = [
             ffmpeg_path,
+            *decoder_thread_args(threads),
             '-i', input_path,
             '-y',  # Overwrite output
         ]
-
-        # Choose codec based on format
-        if input_format == 'webm':
-            # WebM: Use VP9 (LGPL)
-            cmd.extend([
-                '-c:v', 'libvpx-vp9',
-                '-crf', settings['vp9_crf'],
-                '-b:v', '0',              # Use CRF mode
-                '-row-mt', '1',           # Multithreading
-                '-cpu-used', '2',         # Speed/quality tradeoff (0=slowest/best, 5=fastest)
-            ])
-            # Audio: Vorbis for WebM (LGPL)
-            cmd.extend([
-                '-c:a', 'libvorbis',
-                '-q:a', '4',              # Vorbis quality (0-10)
-            ])
-        else:
-            # MP4/MOV/MKV/AVI: Use MPEG4 (LGPL)
-            cmd.extend([
-                '-c:v', 'mpeg4',
-                '-q:v', settings['video_quality'],
-                '-g', '300',              # Keyframe interval
-            ])
-            # Audio: AAC (LGPL)
-            cmd.extend([
-                '-c:a', 'aac',
-                '-b:a', settings['audio_bitrate'],
-            ])
-
-        # Common settings
-        cmd.extend([
-            '-ar', '44100',               # Sample rate
-            '-pix_fmt', 'yuv420p',        # Pixel format
-        ])
+        cmd.extend(CompressionRepository._video_codec_args(input_format, quality, codec, speed, crf))
+        cmd.extend(encoder_thread_args(threads))
 
         # MP4/MOV specific optimization
         if input_format in ['mp4', 'mov']:
@@ -802,13 +1536,7 @@ class CompressionRepository(ICompressionSerivce):
         start_time = time.perf_counter()
 
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
-                check=False
-            )
+            result = run_ffmpeg(cmd, timeout, input_path)
 
             if result.returncode != 0:
                 error_msg = result.stderr.decode() if result.stderr else "Unknown error"
@@ -835,6 +1563,9 @@ class CompressionRepository(ICompressionSerivce):
                 os.unlink(output_path)
             raise ValueError(f"Video compression failed: {str(e)}") from e
 
+        finally:
+            release_threads()
+
         end_time = time.perf_counter()
 
         return {
@@ -850,6 +1581,177 @@ class CompressionRepository(ICompressionSerivce):
         }
 
     @staticmethod
+    async def _publish_segment_progress(input_path: str, encoded_duration: float, total_duration: float) -> None:
+        """Progress event of a segmented compression, when it runs inside a job"""
+        channel = current_progress_channel()
+        if channel is None:
+            return
+
+        await asyncio.to_thread(publish_event, channel, "progress", {
+            "input_path": input_path,
+            "progress": min(encoded_duration / total_duration, 1.0) if total_duration > 0 else None,
+            "out_time": encoded_duration,
+            "total_size": None,
+            "speed": None,
+        })
+
+    @staticmethod
+    def _run_ffmpeg_step(cmd: List[str], output_path: str, timeout: int, step: str) -> None:
+        """Run one ffmpeg step of a segmented compression and check its output"""
+        try:
+            result = run_process(cmd, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            raise ValueError(f"{step} timed out after {timeout} seconds") from e
+
+        if result.returncode != 0:
+            error_msg = result.stderr.decode(errors='replace') if result.stderr else "Unknown error"
+            raise ValueError(f"{step} failed: {error_msg}")
+
+        if not Path(output_path).exists() or os.path.getsize(output_path) == 0:
+            raise ValueError(f"{step} created no output")
+
+    @staticmethod
+    def _split_video_sync(
+        input_path: str,
+        ffmpeg_path: str,
+        work_dir: str,
+        segment_time: int,
+        timeout: int = 600
+    ) -> List[Tuple[str, float]]:
+        """
+        Copy the video stream into segments of about segment_time seconds
+
+        The segment muxer only cuts on keyframes, so every segment decodes
+        on its own. Matroska takes any codec the input may have.
+
+        Returns:
+        --------
+            List[Tuple[str, float]]: (segment path, duration in seconds) in order
+        """
+        pattern = os.path.join(work_dir, 'source_%04d.mkv')
+        segment_list = os.path.join(work_dir, 'segments.csv')
+        cmd = [
+            ffmpeg_path,
+            '-i', input_path,
+            '-y',
+            '-map', '0:V:0',
+            '-an', '-sn', '-dn',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', str(segment_time),
+            '-segment_list', segment_list,
+            '-segment_list_type', 'csv',
+            '-reset_timestamps', '1',
+            pattern
+        ]
+
+        CompressionRepository._run_ffmpeg_step(cmd, pattern % 0, timeout, "Splitting the video")
+
+        # One "name,start,end" line per segment, in order
+        segments = []
+        with open(segment_list, encoding='utf-8') as fp:
+            for line in fp:
+                name, start, end = line.strip().rsplit(',', 2)
+                segments.append((os.path.join(work_dir, name), max(0.0, float(end) - float(start))))
+
+        return segments
+
+    @staticmethod
+    def _encode_segment_sync(
+        segment_path: str,
+        ffmpeg_path: str,
+        input_format: str,
+        quality: str,
+        codec: str,
+        speed: str,
+        crf: Optional[int],
+        timeout: int = 600
+    ) -> str:
+        """
+        Encode the video of one segment with the codec of the output format
+
+        Returns:
+        --------
+            str: the encoded segment, next to the source one
+        """
+        output_path = segment_path.replace('source_', 'encoded_')
+
+        threads = acquire_threads()
+        try:
+            cmd = [ffmpeg_path, *decoder_thread_args(threads), '-i', segment_path, '-y', '-an']
+            cmd.extend(CompressionRepository._video_stream_args(input_format, quality, codec, speed, crf))
+            cmd.extend(encoder_thread_args(threads))
+            cmd.append(output_path)
+
+            CompressionRepository._run_ffmpeg_step(cmd, output_path, timeout, "Encoding a segment")
+        finally:
+            release_threads()
+
+        return output_path
+
+    @staticmethod
+    def _encode_audio_track_sync(
+        input_path: str,
+        ffmpeg_path: str,
+        work_dir: str,
+        input_format: str,
+        quality: str,
+        timeout: int = 600
+    ) -> str:
+        """
+        Encode the first audio stream of the input once for all the segments
+
+        Returns:
+        --------
+            str: the audio track, in Matroska audio
+        """
+        output_path = os.path.join(work_dir, 'audio.mka')
+
+        cmd = [ffmpeg_path, *decoder_thread_args(AUDIO_THREADS), '-i', input_path, '-y', '-vn', '-map', '0:a:0']
+        cmd.extend(CompressionRepository._audio_stream_args(input_format, quality))
+        cmd.extend(encoder_thread_args(AUDIO_THREADS))
+        cmd.append(output_path)
+
+        CompressionRepository._run_ffmpeg_step(cmd, output_path, timeout, "Encoding the audio")
+
+        return output_path
+
+    @staticmethod
+    def _concat_segments_sync(
+        segment_paths: List[str],
+        audio_path: Optional[str],
+        ffmpeg_path: str,
+        work_dir: str,
+        output_path: str,
+        timeout: int = 600
+    ) -> str:
+        """
+        Join the encoded segments and the audio track with the concat
+        demuxer, the streams are copied as they are
+        """
+        list_path = os.path.join(work_dir, 'segments.txt')
+        with open(list_path, 'w', encoding='utf-8') as fp:
+            for segment_path in segment_paths:
+                escaped = segment_path.replace("'", "'\\''")
+                fp.write(f"file '{escaped}'\n")
+
+        cmd = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audio_path is not None:
+            cmd.extend(['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0'])
+        cmd.extend(['-c', 'copy', '-y'])
+
+        output_format = Path(output_path).suffix.lstrip('.').lower()
+        if output_format in ['mp4', 'mov']:
+            cmd.extend(['-movflags', '+faststart'])
+
+        cmd.append(output_path)
+
+        CompressionRepository._run_ffmpeg_step(cmd, output_path, timeout, "Joining the segments")
+
+        return output_path
+
+    @staticmethod
+    @cached_result("compress_audio", key_args=("bitrate",))
     def _compress_audio_sync(
         input_path: str,
         ffmpeg_path: str,
@@ -894,80 +1796,22 @@ class CompressionRepository(ICompressionSerivce):
         # Build FFmpeg command
         cmd = [
             ffmpeg_path,
+            *decoder_thread_args(AUDIO_THREADS),
             '-i', input_path,
             '-y',
         ]
 
-        if input_format == 'mp3':
-            cmd.extend([
-                '-c:a', 'libmp3lame',
-                '-b:a', bitrate,
-                '-q:a', '2',
-            ])
-        elif input_format in ['m4a', 'aac']:
-            cmd.extend([
-                '-c:a', 'aac',
-                '-b:a', bitrate,
-            ])
-        elif input_format == 'ogg':
-            cmd.extend([
-                '-c:a', 'libvorbis',
-                '-q:a', '4',  # Quality level (0-10)
-            ])
-        elif input_format == 'opus':
-            cmd.extend([
-                '-c:a', 'libopus',
-                '-b:a', bitrate,
-                '-vbr', 'on',
-                '-compression_level', '10',
-            ])
-        elif input_format == 'wav':
-            # WAV: PCM (LGPL, lossless)
-            cmd.extend([
-                '-c:a', 'pcm_s16le',
-                '-ar', '44100',
-            ])
-        elif input_format == 'flac':
-            cmd.extend([
-                '-c:a', 'flac',
-                '-compression_level', '8',
-            ])
-        elif input_format == 'wma':
-            cmd.extend([
-                '-c:a', 'aac',
-                '-b:a', bitrate,
-            ])
-        else:
-            cmd.extend([
-                '-c:a', 'aac',
-                '-b:a', bitrate,
-            ])
-
-        if input_format not in ['wav', 'flac']:  # Don't change sample rate for lossless
-            cmd.extend([
-                '-ar', '44100',
-                '-ac', '2',
-            ])
+        cmd.extend(CompressionRepository._audio_codec_args(input_format, bitrate))
+        cmd.extend(encoder_thread_args(AUDIO_THREADS))
 
         cmd.append(output_path)
 
         start_time = time.perf_counter()
 
-        if bitrate == "64k":
-            compression_level = "low"
-        elif bitrate == "128k":
-            compression_level = "medium"
-        else:
-            compression_level = "high"
+        compression_level = CompressionRepository._audio_compression_level(bitrate)
 
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
-                check=False
-            )
+            result = run_ffmpeg(cmd, timeout, input_path)
 
             if result.returncode != 0:
                 error_msg = result.stderr.decode() if result.stderr else "Unknown error"
@@ -1007,3 +1851,277 @@ class CompressionRepository(ICompressionSerivce):
             "CompressionLevel": compression_level,
             "TaskTime": end_time - start_time
         }
+
+    #================ PDF ================
+
+    @property
+    def _get_ghostscript_path(self) -> str:
+        """Get the path to Ghostscript executable file"""
+
+        for name in ("gs", "gswin64c", "gswin32c"):
+            system_ghostscript = shutil.which(name)
+            if system_ghostscript:
+                return system_ghostscript
+
+        ghostscript_path = Path(__file__).parent.parent.parent.parent / 'bin' / 'Debug' / 'net9.0-windows' / GHOSTSCRIPT_EXECUTABLE_NAME
+
+        if not Path(ghostscript_path).exists():
+            raise FileNotFoundError("Ghostscript executable file not found")
+
+        return str(ghostscript_path.absolute())
+
+    async def compress_pdf(
+        self,
+        input_path: str,
+        quality: str = "medium",
+        timeout: int = 300
+    ) -> Tuple[str, int]:
+        """
+        Compress a PDF, downsampling and recompressing its images
+
+        Parameters:
+        -----------
+            input_path(str): path to input PDF
+            quality(str): compression quality preset, low, medium or high
+            timeout(int): timeout in seconds
+
+        Returns:
+        --------
+            Tuple[str, int]: (output_file_path, file_size_bytes)
+
+        Raises:
+        -------
+            ValueError: if compression failed
+        """
+
+        try:
+            data = await self._run_in_executor(
+                self._compress_pdf_sync,
+                input_path,
+                self._get_ghostscript_path,
+                quality,
+                timeout
+            )
+
+            task = TaskCompression(
+                UserID=self.user_id,
+                ServiceTypeID=SERVICETYPEID,
+                OriginalFileName=data["OriginalFileName"],
+                OriginalFileSize=data["OriginalFileSize"],
+                OriginalFilePath=data["OriginalFilePath"],
+                OutputFileName=data["OutputFileName"],
+                OutputFileSize=data["OutputFileSize"],
+                OutputFilePath=data["OutputFilePath"],
+                CompressionLevel=data["CompressionLevel"],
+                TaskStatus=True,
+                TaskTime=data["TaskTime"]
+            )
+
+            self._record_task(task)
+
+        except Exception as e:
+            print(f"Fail to compress {input_path}: {str(e)}")
+            task = TaskCompression(
+                UserID=self.user_id,
+                ServiceTypeID=SERVICETYPEID,
+                OriginalFileName=Path(input_path).stem,
+                OriginalFileSize=os.path.getsize(input_path),
+                OriginalFilePath=input_path,
+                TaskStatus=False,
+                TaskTime=0
+            )
+
+            self._record_task(task)
+
+            raise ValueError(str(e)) from e
+
+        return (str(task.OutputFilePath), task.OutputFileSize)
+
+    async def compress_pdfs_batch(
+        self,
+        input_paths: List[str],
+        quality: str = "medium",
+        timeout: int = 300
+    ) -> List[Tuple[str, str, int, bool]]:
+        """
+        Compress multiple PDFs in parallel
+
+        Parameters:
+        -----------
+            input_paths(List[str]): list of input PDF paths
+            quality(str): compression quality preset, low, medium or high
+            timeout(int): timeout per file
+
+        Returns:
+        --------
+            List[Tuple[str, str, int, bool]]: (input_path, output_path, size, success)
+        """
+        if not input_paths:
+            return []
+
+        ghostscript_path = self._get_ghostscript_path
+
+        future_to_path = {
+            submit_to_pool(
+                self._compress_pdf_sync,
+                input_path,
+                ghostscript_path,
+                quality,
+                timeout
+            ): input_path for input_path in input_paths
+        }
+
+        results = []
+
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
+
+                task = TaskCompression(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    CompressionLevel=data["CompressionLevel"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
+
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to compress PDF {input_path}: {str(e)}")
+                task = TaskCompression(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
+
+        return results
+
+    @staticmethod
+    def _pdf_args(quality: str) -> List[str]:
+        """
+        Ghostscript pdfwrite arguments of a quality preset
+
+        Color and gray images above the preset resolution are downsampled
+        (bicubic) and re-encoded, fonts are embedded as subsets only and
+        objects are packed into compressed object streams.
+        """
+        preset = PDF_QUALITY_SETTINGS.get(quality, PDF_QUALITY_SETTINGS["medium"])
+        image_dpi = str(preset["image_dpi"])
+
+        return [
+            '-sDEVICE=pdfwrite',
+            '-dCompatibilityLevel=1.5',
+            f'-dPDFSETTINGS={preset["pdf_settings"]}',
+            '-dDetectDuplicateImages=true',
+            '-dDownsampleColorImages=true',
+            '-dColorImageDownsampleType=/Bicubic',
+            f'-dColorImageResolution={image_dpi}',
+            '-dDownsampleGrayImages=true',
+            '-dGrayImageDownsampleType=/Bicubic',
+            f'-dGrayImageResolution={image_dpi}',
+            '-dDownsampleMonoImages=true',
+            f'-dMonoImageResolution={max(300, preset["image_dpi"])}',
+            '-dEmbedAllFonts=true',
+            '-dSubsetFonts=true',
+            '-dCompressFonts=true',
+        ]
+
+    @staticmethod
+    @cached_result("compress_pdf", key_args=("quality",))
+    def _compress_pdf_sync(
+        input_path: str,
+        ghostscript_path: str,
+        quality: str = "medium",
+        timeout: int = 300
+    ) -> dict:
+        """
+        Compress a PDF with Ghostscript, runs in the worker pool
+
+        The document information (title, author, producer...) is blanked.
+        A PDF that is already tight can come out larger, the original is
+        kept then.
+
+        Parameters:
+        -----------
+            input_path(str): input file path
+            ghostscript_path(str): path to Ghostscript executable
+            quality(str): compression quality preset, low, medium or high
+            timeout(int): timeout in seconds
+
+        Returns:
+        --------
+            dict: the task fields with the output path and size
+        """
+        if not Path(input_path).exists():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        output_path = CompressionRepository._create_temp_output_file('.pdf')
+
+        cmd = [
+            ghostscript_path,
+            '-dNOPAUSE',
+            '-dBATCH',
+            '-dSAFER',
+            '-dQUIET',
+            *CompressionRepository._pdf_args(quality),
+            '-o', output_path,
+            input_path,
+            '-c', PDF_STRIP_METADATA
+        ]
+
+        start_time = time.perf_counter()
+
+        try:
+            result = run_process(cmd, timeout=timeout)
+
+            if result.returncode != 0:
+                error_msg = result.stderr.decode(errors='replace') if result.stderr else "Unknown error"
+                raise ValueError(f"Ghostscript PDF compression failed: {error_msg.strip()[-2000:]}")
+
+            file_size = os.path.getsize(output_path)
+
+            if file_size == 0:
+                raise ValueError("The created file was empty")
+
+            if file_size >= os.path.getsize(input_path):
+                shutil.copyfile(input_path, output_path)
+
+        except subprocess.TimeoutExpired as e:
+            if Path(output_path).exists():
+                os.unlink(output_path)
+            raise ValueError(f"PDF compression timed out after {timeout} seconds") from e
+
+        except Exception as e:
+            if Path(output_path).exists():
+                os.unlink(output_path)
+            raise ValueError(f"PDF compression failed: {str(e)}") from e
+
+        end_time = time.perf_counter()
+
+        return {
+            "OriginalFileName": Path(input_path).stem,
+            "OriginalFileSize": os.path.getsize(input_path),
+            "OriginalFilePath": input_path,
+            "OutputFileName": Path(output_path).stem,
+            "OutputFileSize": os.path.getsize(output_path),
+            "OutputFilePath": output_path,
+            "TaskStatus": True,
+            "CompressionLevel": quality if quality in PDF_QUALITY_SETTINGS else "medium",
+            "TaskTime": end_time - start_time
+        }
@@ -1,16 +1,15 @@
 """
 conversion_repository module
 """
-import io
+import asyncio
+import math
+import multiprocessing.util
 import time
 import os
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import subprocess
-from typing import List, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import tempfile
-import asyncio
 import shutil
 
 from sqlalchemy.orm import Session
@@ -19,11 +18,65 @@ from PIL import Image
 from Services.conversion_service import IConversionService
 from Schemas.task import TaskConversion
 from Entities.tasks import Tasks
+from Helpers.subprocess_runner import run_process, run_process_with_stall_timeout
+from Helpers.ffmpeg_pipe import FfmpegPipe, pipe_output_args, pipe_slots
+from Helpers.encoder_profiles import pillow_save_args, resolve_effort
+from Helpers.video_codecs import resolve_video_options, usable_codec, video_encoder_args
+from Helpers.media_probe import ffprobe_path_for, probe_media, main_codecs, can_remux, rejected_media
+from Helpers.pdf_pages import PDFTOPPM_FORMATS, pdftoppm_path_for, pdfinfo_path_for, pdf_page_count, parse_page_range
+from Core.result_cache import cached_result, get_result_cache, store_result
+from Core.progress import run_ffmpeg
+from Core.worker_pool import get_worker_pool, run_in_pool, submit_to_pool, iter_completed, failed_future
+from Core.office_pool import get_office_pool
+from Core.ffmpeg_threads import acquire_threads, release_threads, decoder_thread_args, encoder_thread_args
+from config import settings
 
 FFMPEG_EXECUTABLE_NAME = 'ffmpeg.exe'
 SOFFICE_EXECUTABLE_NAME = 'soffice.exe'
 SERVICETYPEID = 1
 
+VIDEO_OUTPUT_FORMATS = ['mp4', 'mov', 'avi', 'mkv', 'webm']
+
+# Image formats the pages of a PDF can be rendered to
+PDF_IMAGE_FORMATS = ['png', 'jpg', 'jpeg', 'webp', 'tiff']
+
+# Audio encoders are single threaded, audio jobs do not take a share of the budget
+AUDIO_THREADS = 1
+
+# LibreOffice application of each office format, documents of one
+# application share a soffice run in the batched fallback
+OFFICE_FAMILIES = {
+    'doc': 'writer', 'docx': 'writer', 'odt': 'writer', 'rtf': 'writer', 'txt': 'writer',
+    'xls': 'calc', 'xlsx': 'calc', 'ods': 'calc', 'csv': 'calc',
+    'ppt': 'impress', 'pptx': 'impress', 'odp': 'impress',
+}
+
+# Keep the draft/reduce step at least 2x the target size before resampling,
+# this is the quality/speed point Pillow recommends
+DOWNSCALE_REDUCING_GAP = 2.0
+
+# soffice profile of the batched office runs of this process, (pid, path)
+_soffice_profile: Optional[Tuple[int, Path]] = None
+
+
+def _soffice_profile_dir() -> Path:
+    """
+    soffice profile of this worker process, kept between its runs and
+    removed when the worker exits, so a pool restart does not leave the
+    profiles of the old workers behind
+    """
+    global _soffice_profile # pylint: disable=global-statement
+
+    # A forked worker inherits the value of its parent
+    if _soffice_profile is None or _soffice_profile[0] != os.getpid():
+        profile_dir = Path(tempfile.gettempdir()) / "converto_soffice_profiles" / f"worker_{os.getpid()}"
+        multiprocessing.util.Finalize(
+            None, shutil.rmtree, args=(str(profile_dir),), kwargs={"ignore_errors": True}, exitpriority=0
+        )
+        _soffice_profile = (os.getpid(), profile_dir)
+
+    return _soffice_profile[1]
+
 class ConversionRepository(IConversionService):
     """
     Conversion repository class
@@ -33,7 +86,7 @@ class ConversionRepository(IConversionService):
         Initialize with ffmpeg path
         """
         self.ffmpeg_path = self._get_ffmpeg_path
-        self.max_workers = max(1, multiprocessing.cpu_count() - 1)
+        self.worker_pool = get_worker_pool()
         self.soffice_path = self._get_soffice_path
 
         self.db = db
@@ -79,27 +132,39 @@ class ConversionRepository(IConversionService):
         return str(soffice_path)
 
     @staticmethod
-    def _execute_subprocess(cmd: List) -> int:
+    def _execute_subprocess(cmd: List, timeout: int, input_path: Optional[str] = None) -> int:
         """
         Execute the ffmpeg with config statistic
 
         Parameter:
         ----------
             cmd(list): FFmpeg/soffice command as input
+            timeout(int): timeout in seconds, the process tree is killed on expiry
+            input_path(str): optional, the input of an ffmpeg command, its
+                progress is published when the task belongs to a job
         Returns:
         --------
             int: Return code from the ffmpeg
+
+        Raises:
+        -------
+            TimeoutError: if the command did not finish in time
         """
 
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=False
-            )
+            if input_path is not None:
+                result = run_ffmpeg(cmd, timeout, input_path)
+            else:
+                result = run_process(cmd, timeout=timeout)
+
+            if result.returncode != 0 and result.stderr:
+                # Last lines of ffmpeg's log carry the actual error
+                stderr = result.stderr.decode(errors='replace') if isinstance(result.stderr, bytes) else result.stderr
+                print(f"{Path(cmd[0]).name} exited with {result.returncode}: {stderr.strip()[-2000:]}")
 
             return result.returncode
+        except subprocess.TimeoutExpired as e:
+            raise TimeoutError(f"FFmpeg conversion timed out after {timeout}s") from e
         except Exception as e:
             print(f"FFmpeg execution error: {str(e)}")
             return 1
@@ -107,8 +172,7 @@ class ConversionRepository(IConversionService):
     @staticmethod
     async def _run_in_executor(func, *args):
         """Helper to run sync function in executor for single file processing"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, func, *args)
+        return await run_in_pool(func, *args)
 
     @staticmethod
     def _verify_path(input_path: str) -> None:
@@ -145,7 +209,14 @@ class ConversionRepository(IConversionService):
 
     #================ IMAGE ================
 
-    async def convert_image(self, input_path: str, output_format: str) -> Tuple[str, int]:
+    async def convert_image(
+        self,
+        input_path: str,
+        output_format: str,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        effort: Optional[str] = None
+    ) -> Tuple[str, int]:
         """
         Convert image from various types using Pillow
         Returns path to temporary output file and its size
@@ -154,6 +225,9 @@ class ConversionRepository(IConversionService):
         ------------
             input_path(str): the path of the original file
             output_format(str): desired output format (e.g., 'png', 'jpg')
+            max_width(int): optional, shrink to fit this width
+            max_height(int): optional, shrink to fit this height
+            effort(str): encoder effort profile, IMAGE_EFFORT_DEFAULT when None
 
         Returns:
         --------
@@ -165,12 +239,16 @@ class ConversionRepository(IConversionService):
         """
 
         self._verify_path(input_path)
+        effort = resolve_effort(effort)
 
         try:
             data = await self._run_in_executor(
                 self._convert_image_sync,
                 input_path,
-                output_format
+                output_format,
+                max_width,
+                max_height,
+                effort
             )
 
             task = TaskConversion(
@@ -209,7 +287,14 @@ class ConversionRepository(IConversionService):
         return (str(task.OutputFilePath), int(task.OutputFileSize))
 
 
-    async def convert_images_batch(self, input_paths: List[str], output_format: str) -> List[Tuple[str, str, int, bool]]:
+    async def convert_images_batch(
+        self,
+        input_paths: List[str],
+        output_format: str,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        effort: Optional[str] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Convert multiple images in parallel using multiprocessing
 
@@ -217,6 +302,9 @@ class ConversionRepository(IConversionService):
         ------------
             input_paths(List[str]): list of input file paths
             output_format(str): desired output format (e.g., 'png', 'jpg')
+            max_width(int): optional, shrink to fit this width
+            max_height(int): optional, shrink to fit this height
+            effort(str): encoder effort profile, IMAGE_EFFORT_DEFAULT when None
 
         Returns:
         --------
@@ -239,64 +327,74 @@ class ConversionRepository(IConversionService):
         if not input_paths:
             return []
 
-        # Use ProcessPoolExecutor for parallel processing
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all conversion tasks
-            future_to_path = {
-                executor.submit(
-                    self._convert_image_sync,
-                    input_path,
-                    output_format
-                ): input_path
-                for input_path in input_paths
-            }
+        effort = resolve_effort(effort)
 
-            results = []
-            # Collect results as they complete
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result()
-
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        InputFormat=data["InputFormat"],
-                        OutputFormat=data["OutputFormat"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
+        # Submit all conversion tasks to the shared worker pool
+        future_to_path = {
+            submit_to_pool(
+                self._convert_image_sync,
+                input_path,
+                output_format,
+                max_width,
+                max_height,
+                effort
+            ): input_path
+            for input_path in input_paths
+        }
 
-                    self._record_task(task)
+        results = []
+        # Collect results as they complete without blocking the event loop
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
+
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    InputFormat=data["InputFormat"],
+                    OutputFormat=data["OutputFormat"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
 
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to convert {input_path}: {str(e)}")
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        InputFormat=Path(input_path).suffix.lstrip('.').upper(),
-                        OutputFormat=output_format.upper(),
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to convert {input_path}: {str(e)}")
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    InputFormat=Path(input_path).suffix.lstrip('.').upper(),
+                    OutputFormat=output_format.upper(),
+                    TaskStatus=False,
+                    TaskTime=0
+                )
 
-                    self._record_task(task)
-                    results.append((input_path, "", 0, False))
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
 
         return results
 
     @staticmethod
-    def _convert_image_sync(input_path: str, output_format: str) -> dict:
+    @cached_result("convert_image", key_args=("output_format", "max_width", "max_height", "effort"))
+    def _convert_image_sync(
+        input_path: str,
+        output_format: str,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        effort: str = "max"
+    ) -> dict:
         """
         Synchronous image conversion function for multiprocessing
         This is called by each worker process
@@ -305,6 +403,9 @@ class ConversionRepository(IConversionService):
         -----------
             input_path(str): input file path
             output_format(str): desired output format (e.g., 'png', 'jpg')
+            max_width(int): optional, shrink to fit this width keeping the aspect ratio
+            max_height(int): optional, shrink to fit this height keeping the aspect ratio
+            effort(str): encoder effort profile, fast, balanced or max
 
         Returns:
         --------
@@ -314,40 +415,50 @@ class ConversionRepository(IConversionService):
         if not Path(input_path).exists():
             raise FileNotFoundError(f"File not found: {input_path}")
 
-        try:
-            with open(input_path, "rb") as fp:
-                file_content = fp.read()
-        except Exception as e:
-            raise ValueError(f"Failed to read input file: {str(e)}") from e
-
         output_format = output_format.lstrip('.').lower()
 
         start_time = time.perf_counter()
 
+        # Open lazily from the path, the pixels are only decoded when needed
         try:
-            image = Image.open(io.BytesIO(file_content))
+            image = Image.open(input_path)
         except Exception as e:
             raise ValueError(f"Failed to open input file: {str(e)}") from e
 
-        # Handle transparency for JPEG
-        if output_format in ['jpg', 'jpeg'] and image.mode in ("RGBA", "LA"):
-            background = Image.new("RGB", image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[-1])
-            image = background
-        elif image.mode not in ["RGB", "RGBA"] and output_format not in ['png']:
-            image = image.convert("RGB")
-
-        # Create temp output file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{output_format}')
-        output_path = temp_file.name
-        temp_file.close()
+        with image:
+            if max_width or max_height:
+                # thumbnail() only shrinks, it asks the JPEG decoder for a
+                # reduced scale (draft) and uses reduce() before resampling
+                image.thumbnail(
+                    (max_width or image.width, max_height or image.height),
+                    reducing_gap=DOWNSCALE_REDUCING_GAP
+                )
 
-        try:
-            image.save(output_path, format=output_format.upper(), optimize=True)
-        except Exception as e:
-            if os.path.exists(output_path):
-                os.unlink(output_path)
-            raise ValueError(f"Failed to convert to {output_format.upper()}: {str(e)}") from e
+            # Handle transparency for JPEG
+            if output_format in ['jpg', 'jpeg'] and image.mode in ("RGBA", "LA"):
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.split()[-1])
+                converted = background
+            elif image.mode not in ["RGB", "RGBA"] and output_format not in ['png']:
+                converted = image.convert("RGB")
+            else:
+                converted = image
+
+            # Create temp output file
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{output_format}')
+            output_path = temp_file.name
+            temp_file.close()
+
+            try:
+                converted.save(
+                    output_path,
+                    format=output_format.upper(),
+                    **pillow_save_args(output_format, effort)
+                )
+            except Exception as e:
+                if os.path.exists(output_path):
+                    os.unlink(output_path)
+                raise ValueError(f"Failed to convert to {output_format.upper()}: {str(e)}") from e
 
         end_time = time.perf_counter()
 
@@ -366,7 +477,15 @@ class ConversionRepository(IConversionService):
 
     #================ VIDEO & AUDIO ================
 
-    async def convert_video_audio(self, input_path: str, output_format: str, timeout: int = 300) -> Tuple[str, int]:
+    async def convert_video_audio(
+        self,
+        input_path: str,
+        output_format: str,
+        timeout: int = 300,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> Tuple[str, int]:
         """
         Convert audio and video from various types using ffmpeg
         Returns path to temporary output file and its size
@@ -376,6 +495,9 @@ class ConversionRepository(IConversionService):
             input_path(str): the input file path
             output_format(str): desired output format (e.g., 'mp4', 'mp3')
             timeout(int): maximum time in seconds
+            codec(str): video codec, default, h264, hevc or av1, VIDEO_CODEC_DEFAULT when None
+            speed(str): encoder speed preset, veryfast to slow, VIDEO_SPEED_DEFAULT when None
+            crf(int): optional constant rate factor of h264/hevc/av1
 
         Returns:
         --------
@@ -386,13 +508,21 @@ class ConversionRepository(IConversionService):
             FileNotFoundError: If input file doesn't exist
         """
 
+        codec, speed = resolve_video_options(codec, speed)
+
         try:
+            remux = await self.conversion_path(input_path, output_format, codec, crf) == "remux"
+
             data = await self._run_in_executor(
                 self._convert_video_audio_sync,
                 input_path,
                 output_format,
                 self.ffmpeg_path,
-                timeout
+                timeout,
+                codec,
+                speed,
+                crf,
+                remux
             )
 
             task = TaskConversion(
@@ -430,7 +560,15 @@ class ConversionRepository(IConversionService):
 
         return (str(task.OutputFilePath), int(task.OutputFileSize))
 
-    async def convert_video_audio_batch(self, input_paths: List[str], output_format: str, timeout: int = 300) -> List[Tuple[str, str, int, bool]]:
+    async def convert_video_audio_batch(
+        self,
+        input_paths: List[str],
+        output_format: str,
+        timeout: int = 300,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Convert multiple video/audio files in parallel using multiprocessing
 
@@ -439,6 +577,7 @@ class ConversionRepository(IConversionService):
             input_paths(List[str]): list of input file paths
             output_format(str): desired output format (e.g., 'mp4', 'mp3')
             timeout(int): maximum time in seconds per file
+            codec, speed, crf: optional video codec options, see convert_video_audio
 
         Returns:
         --------
@@ -447,67 +586,320 @@ class ConversionRepository(IConversionService):
         if not input_paths:
             return []
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._convert_video_audio_sync,
-                    input_path,
-                    output_format,
-                    self.ffmpeg_path,
-                    timeout
-                ): input_path
-                for input_path in input_paths
-            }
+        codec, speed = resolve_video_options(codec, speed)
 
-            results = []
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result()
+        # Corrupt and non media inputs fail here instead of taking a worker
+        rejected = await rejected_media(input_paths, self.ffmpeg_path)
 
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        InputFormat=data["InputFormat"],
-                        OutputFormat=data["OutputFormat"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
+        remux_paths = {
+            input_path: await self.conversion_path(input_path, output_format, codec, crf) == "remux"
+            for input_path in input_paths if input_path not in rejected
+        }
 
-                    self._record_task(task)
+        future_to_path = {
+            (failed_future(ValueError(rejected[input_path])) if input_path in rejected else submit_to_pool(
+                self._convert_video_audio_sync,
+                input_path,
+                output_format,
+                self.ffmpeg_path,
+                timeout,
+                codec,
+                speed,
+                crf,
+                remux_paths[input_path]
+            )): input_path
+            for input_path in input_paths
+        }
 
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to compress {input_path}: {str(e)}")
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        InputFormat=Path(input_path).suffix.lstrip('.').upper(),
-                        OutputFormat=output_format.upper(),
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
+        results = []
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
+
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    InputFormat=data["InputFormat"],
+                    OutputFormat=data["OutputFormat"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
 
-                    self._record_task(task)
-                    results.append((input_path, "", 0, False))
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to convert {input_path}: {str(e)}")
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    InputFormat=Path(input_path).suffix.lstrip('.').upper(),
+                    OutputFormat=output_format.upper(),
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
 
         return results
 
 
     @staticmethod
-    def _convert_video_audio_sync(input_path: str, output_format: str, ffmpeg_path: str, timeout: int) -> dict:
+    def _video_audio_codec_args(
+        output_format: str,
+        codec: str = "default",
+        speed: str = "medium",
+        crf: Optional[int] = None
+    ) -> List[str]:
+        """
+        Codec arguments of a video/audio conversion, shared by the file and
+        the pipe outputs, codec is the one returned by usable_codec
+        """
+        if output_format in VIDEO_OUTPUT_FORMATS:
+            if codec != "default":
+                audio_args = ['-c:a', 'libvorbis', '-b:a', '128k'] if output_format == 'webm' else ['-c:a', 'aac', '-b:a', '128k']
+                return [*video_encoder_args(codec, output_format, speed, crf), *audio_args]
+            if output_format == 'webm':
+                return ['-c:v', 'libvpx', '-b:v', '1M', '-c:a', 'libvorbis', '-b:a', '128k']
+            return ['-c:v', 'mpeg4', '-q:v', '5', '-c:a', 'aac', '-b:a', '128k']
+
+        if output_format == 'mp3':
+            return ['-vn', '-c:a', 'libmp3lame', '-b:a', '192k']
+        if output_format == 'wav':
+            return ['-vn', '-c:a', 'pcm_s16le', '-ar', '44100']
+        if output_format in ['aac', 'm4a']:
+            return ['-vn', '-c:a', 'aac', '-b:a', '192k']
+        if output_format == 'ogg':
+            return ['-vn', '-c:a', 'libvorbis', '-q:a', '6']
+        if output_format == 'flac':
+            return ['-vn', '-c:a', 'flac', '-compression_level', '5']
+
+        return []
+
+    async def conversion_path(
+        self,
+        input_path: str,
+        output_format: str,
+        codec: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> str:
+        """
+        Pick how a video/audio conversion runs
+
+        "remux" copies the streams into the new container, when ffprobe says
+        they fit and the request did not ask for another codec or a CRF.
+        "transcode" re-encodes them. The probe is cached per input.
+
+        Returns:
+        --------
+            str: "remux" or "transcode"
+        """
+        output_format = output_format.lstrip('.').lower()
+        codec, _ = resolve_video_options(codec, None)
+
+        if not settings.FFMPEG_REMUX_FAST_PATH or crf is not None:
+            return "transcode"
+
+        ffprobe_path = ffprobe_path_for(self.ffmpeg_path)
+        if ffprobe_path is None:
+            return "transcode"
+
+        try:
+            probe = await asyncio.to_thread(probe_media, input_path, ffprobe_path)
+        except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+            print(f"Failed to probe {input_path}: {str(e)}")
+            return "transcode"
+
+        if not can_remux(probe, output_format):
+            return "transcode"
+
+        # Asked for a codec the video is not in yet
+        video_codec, _ = main_codecs(probe)
+        if codec != "default" and output_format in VIDEO_OUTPUT_FORMATS and video_codec != codec:
+            return "transcode"
+
+        return "remux"
+
+    @staticmethod
+    def _remux_args(output_format: str) -> List[str]:
+        """Stream copy of the main video and audio streams"""
+        if output_format in VIDEO_OUTPUT_FORMATS:
+            return ['-map', '0:V:0?', '-map', '0:a:0?', '-c', 'copy']
+        return ['-vn', '-map', '0:a:0', '-c:a', 'copy']
+
+    async def stream_video_audio(
+        self,
+        input_path: str,
+        output_format: str,
+        timeout: int = 300,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Convert audio and video with the output piped straight to the caller
+
+        Only for formats where is_pipeable(output_format) is True. ffmpeg is
+        started and its first bytes read before this returns, so a failing
+        input is raised here rather than in the middle of a response. The
+        task is recorded once the stream is over, with the number of bytes
+        sent, and the output is written to the result cache as it streams.
+
+        Parameters:
+        ------------
+            input_path(str): the input file path
+            output_format(str): desired output format (e.g., 'mp3', 'webm')
+            timeout(int): maximum time in seconds
+            codec, speed, crf: optional video codec options, see convert_video_audio
+
+        Returns:
+        --------
+            AsyncIterator[bytes]: the encoded output
+
+        Raises:
+            ValueError: If ffmpeg failed before writing any output
+            FileNotFoundError: If input file doesn't exist
+        """
+        self._verify_path(input_path)
+
+        stream = self._stream_video_audio(input_path, output_format, timeout, codec, speed, crf)
+        first_chunk = await stream.__anext__()
+
+        return self._prepend_chunk(first_chunk, stream)
+
+    @staticmethod
+    async def _prepend_chunk(first_chunk: bytes, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _stream_video_audio(
+        self,
+        input_path: str,
+        output_format: str,
+        timeout: int,
+        codec: Optional[str],
+        speed: Optional[str],
+        crf: Optional[int]
+    ) -> AsyncIterator[bytes]:
+        """
+        Generator behind stream_video_audio
+
+        The pipe slot and the thread lease are taken inside the generator,
+        once it was started its finally runs whether the stream is read to
+        the end, closed, or dropped unread and closed by asyncio's async
+        generator finalizer, so neither outlives the request.
+        """
+        codec, speed = resolve_video_options(codec, speed)
+        remux = await self.conversion_path(input_path, output_format, codec, crf) == "remux"
+        cache_params = {"output_format": output_format, "codec": codec, "speed": speed, "crf": crf, "remux": remux}
+        output_format = output_format.lstrip('.').lower()
+
+        pipe: Optional[FfmpegPipe] = None
+        leased = False
+        cache_file = None
+
+        try:
+            async with pipe_slots(self.worker_pool.max_workers):
+                if remux:
+                    # Stream copy is I/O bound, it does not take a share of the thread budget
+                    cmd = [self.ffmpeg_path, '-i', input_path, '-y']
+                    cmd.extend(self._remux_args(output_format))
+                else:
+                    codec = await asyncio.to_thread(usable_codec, codec, output_format, self.ffmpeg_path)
+
+                    leased = output_format in VIDEO_OUTPUT_FORMATS
+                    threads = acquire_threads() if leased else AUDIO_THREADS
+
+                    cmd = [self.ffmpeg_path, *decoder_thread_args(threads), '-i', input_path, '-y']
+                    cmd.extend(self._video_audio_codec_args(output_format, codec, speed, crf))
+                    cmd.extend(encoder_thread_args(threads))
+
+                cmd.extend(pipe_output_args(output_format))
+
+                pipe = FfmpegPipe(cmd, timeout)
+                await pipe.start()
+
+                # Copy of the output for the result cache, the next identical request is a hit
+                if get_result_cache() is not None:
+                    cache_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{output_format}')
+
+                async for chunk in pipe:
+                    if cache_file is not None:
+                        await asyncio.to_thread(cache_file.write, chunk)
+                    yield chunk
+
+            if cache_file is not None:
+                cache_file.close()
+                await asyncio.to_thread(store_result, "convert_video_audio", input_path, cache_params, {
+                    "OutputFilePath": cache_file.name,
+                    "TaskStatus": True,
+                    "InputFormat": Path(input_path).suffix.lstrip('.').upper(),
+                    "OutputFormat": output_format
+                })
+
+        except Exception as e:
+            print(f"Failed to convert {input_path}: {str(e)}")
+            raise
+
+        finally:
+            if leased:
+                release_threads()
+            if cache_file is not None:
+                cache_file.close()
+                os.unlink(cache_file.name)
+            if pipe is not None:
+                self._record_streamed_task(pipe, input_path, output_format)
+
+    def _record_streamed_task(self, pipe: FfmpegPipe, input_path: str, output_format: str) -> None:
+        """Record a piped conversion, it has no output file"""
+        task = TaskConversion(
+            UserID=self.user_id,
+            ServiceTypeID=SERVICETYPEID,
+            OriginalFileName=Path(input_path).stem,
+            OriginalFileSize=os.path.getsize(input_path),
+            OriginalFilePath=input_path,
+            OutputFileName=Path(input_path).stem if pipe.success else None,
+            OutputFileSize=pipe.bytes_sent if pipe.success else None,
+            InputFormat=Path(input_path).suffix.lstrip('.').upper(),
+            OutputFormat=output_format.upper(),
+            TaskStatus=pipe.success,
+            TaskTime=pipe.elapsed
+        )
+
+        self._record_task(task)
+
+    @staticmethod
+    @cached_result("convert_video_audio", key_args=("output_format", "codec", "speed", "crf", "remux"))
+    def _convert_video_audio_sync(
+        input_path: str,
+        output_format: str,
+        ffmpeg_path: str,
+        timeout: int,
+        codec: str = "default",
+        speed: str = "medium",
+        crf: Optional[int] = None,
+        remux: bool = False
+    ) -> dict:
         """
         Synchronous video/audio conversion for multiprocessing
-        Used by both single and batch conversions
+        Used by both single and batch conversions, the codec falls back to
+        the default one when the container or the ffmpeg build lacks it.
+        With remux the streams are copied as they are, see conversion_path.
         """
 
         if not Path(input_path).exists():
@@ -518,37 +910,30 @@ class ConversionRepository(IConversionService):
         output_path = temp_file.name
         temp_file.close()
 
-        try:
-            cmd = [ffmpeg_path, '-i', input_path, '-y']
+        if remux:
+            leased = False
+        else:
+            codec = usable_codec(codec, output_format, ffmpeg_path)
+            leased = output_format in VIDEO_OUTPUT_FORMATS
 
-            if output_format in ['mp4', 'mov', 'avi', 'mkv', 'webm']:
-                if output_format == 'webm':
-                    cmd.extend(['-c:v', 'libvpx', '-b:v', '1M', '-c:a', 'libvorbis', '-b:a', '128k'])
-                else:
-                    cmd.extend(['-c:v', 'mpeg4', '-q:v', '5', '-c:a', 'aac', '-b:a', '128k'])
-
-            elif output_format in ['mp3', 'wav', 'aac', 'ogg', 'flac', 'm4a']:
-                if output_format == 'mp3':
-                    cmd.extend(['-vn', '-c:a', 'libmp3lame', '-b:a', '192k'])
-                elif output_format == 'wav':
-                    cmd.extend(['-vn', '-c:a', 'pcm_s16le', '-ar', '44100'])
-                elif output_format == 'aac':
-                    cmd.extend(['-vn', '-c:a', 'aac', '-b:a', '192k'])
-                elif output_format == 'ogg':
-                    cmd.extend(['-vn', '-c:a', 'libvorbis', '-q:a', '6'])
-                elif output_format == 'flac':
-                    cmd.extend(['-vn', '-c:a', 'flac', '-compression_level', '5'])
-                elif output_format == 'm4a':
-                    cmd.extend(['-vn', '-c:a', 'aac', '-b:a', '192k'])
+        threads = acquire_threads() if leased else AUDIO_THREADS
 
+        try:
+            if remux:
+                cmd = [ffmpeg_path, '-i', input_path, '-y']
+                cmd.extend(ConversionRepository._remux_args(output_format))
+                if output_format in ['mp4', 'mov', 'm4a']:
+                    cmd.extend(['-movflags', '+faststart'])
+            else:
+                cmd = [ffmpeg_path, *decoder_thread_args(threads), '-i', input_path, '-y']
+                cmd.extend(ConversionRepository._video_audio_codec_args(output_format, codec, speed, crf))
+                cmd.extend(encoder_thread_args(threads))
             cmd.append(output_path)
 
             start_time = time.perf_counter()
 
             # Execute FFmpeg with timeout
-            with multiprocessing.Pool(processes=1) as pool:
-                result = pool.apply_async(ConversionRepository._execute_subprocess, (cmd,))
-                return_code = result.get(timeout=timeout)
+            return_code = ConversionRepository._execute_subprocess(cmd, timeout, input_path)
 
             if return_code != 0:
                 raise ValueError("FFmpeg conversion failed")
@@ -579,6 +964,10 @@ class ConversionRepository(IConversionService):
                 os.unlink(output_path)
             raise
 
+        finally:
+            if leased:
+                release_threads()
+
     #================ GIF ================
     async def convert_gif(self, input_path: str, output_format: str, timeout: int) -> Tuple[str, int]:
         """
@@ -656,57 +1045,58 @@ class ConversionRepository(IConversionService):
         if not input_paths:
             return []
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._convert_gif_sync,
-                    input_path,
-                    output_format,
-                    self.ffmpeg_path,
-                    timeout
-                ) : input_path for input_path in input_paths
-            }
-
-            results = []
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result()
+        rejected = await rejected_media(input_paths, self.ffmpeg_path, "video")
 
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        InputFormat=data["InputFormat"],
-                        OutputFormat=data["OutputFormat"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
+        future_to_path = {
+            (failed_future(ValueError(rejected[input_path])) if input_path in rejected else submit_to_pool(
+                self._convert_gif_sync,
+                input_path,
+                output_format,
+                self.ffmpeg_path,
+                timeout
+            )) : input_path for input_path in input_paths
+        }
 
-                    self._record_task(task)
+        results = []
+        async for future in iter_completed(future_to_path):
+            input_path = future_to_path[future]
+            try:
+                data = future.result()
+
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    InputFormat=data["InputFormat"],
+                    OutputFormat=data["OutputFormat"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
 
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to compress {input_path}: {str(e)}")
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        InputFormat=Path(input_path).suffix.lstrip('.').upper(),
-                        OutputFormat=output_format.upper(),
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
+            except Exception as e:
+                print(f"Failed to convert {input_path}: {str(e)}")
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path),
+                    OriginalFilePath=input_path,
+                    InputFormat=Path(input_path).suffix.lstrip('.').upper(),
+                    OutputFormat=output_format.upper(),
+                    TaskStatus=False,
+                    TaskTime=0
+                )
 
-                    self._record_task(task)
-                    results.append((input_path, "", 0, False))
+                self._record_task(task)
+                results.append((input_path, "", 0, False))
 
         return results
 
@@ -727,8 +1117,10 @@ class ConversionRepository(IConversionService):
         output_path = temp_file.name
         temp_file.close()
 
+        threads = acquire_threads()
+
         try:
-            cmd = [ffmpeg_path, '-i', input_path, '-y']
+            cmd = [ffmpeg_path, *decoder_thread_args(threads), '-i', input_path, '-y']
 
             # GIF to Image
             if input_format == "gif" and output_format in ["png", "jpg", "jpeg", "webp", "bmp", "tiff", "ppm", "pgm", "pbm", "tga"]:
@@ -782,14 +1174,13 @@ class ConversionRepository(IConversionService):
             else:
                 raise ValueError(f"Unsupported conversion: {input_format} to {output_format}")
 
+            cmd.extend(encoder_thread_args(threads))
             cmd.append(output_path)
 
             start_time = time.perf_counter()
 
             # Execute FFmpeg with timeout
-            with multiprocessing.Pool(processes=1) as pool:
-                result = pool.apply_async(ConversionRepository._execute_subprocess, (cmd,))
-                return_code = result.get(timeout=timeout)
+            return_code = ConversionRepository._execute_subprocess(cmd, timeout, input_path)
 
             if return_code != 0:
                 raise ValueError("FFmpeg conversion failed")
@@ -821,6 +1212,9 @@ class ConversionRepository(IConversionService):
                 os.unlink(output_path)
             raise
 
+        finally:
+            release_threads()
+
     #================ PDF & OFFICE ================
 
     async def convert_pdf_office(self, input_path: str, output_format: str, timeout: int) -> Tuple[str, int]:
@@ -843,12 +1237,7 @@ class ConversionRepository(IConversionService):
         output_format = output_format.lstrip('.').lower()
 
         try:
-            data = await self._run_in_executor(
-                self._convert_office_to_pdf_sync,
-                input_path,
-                self.soffice_path,
-                timeout
-            )
+            data = await self._office_to_pdf(input_path, timeout)
 
             task = TaskConversion(
                 UserID=self.user_id,
@@ -892,10 +1281,11 @@ class ConversionRepository(IConversionService):
         timeout: int = 300
     ) -> List[Tuple[str, str, int, bool]]:
         """
-        Batch convert multiple files SYNCHRONOUSLY (one at a time)
-        
-        No multiprocessing - processes each file sequentially
-        More reliable for Office conversions
+        Batch convert office documents to PDF
+
+        The documents go to the idle LibreOffice listeners as they free up.
+        Without the listener pool the documents of each group from
+        office_batches share one soffice run on the worker pool.
 
         Parameters:
         -----------
@@ -910,22 +1300,31 @@ class ConversionRepository(IConversionService):
         if not input_paths:
             return []
 
-        results = []
-
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._convert_office_to_pdf_sync,
-                    input_path,
+        if await get_office_pool().start():
+            future_to_paths = {
+                asyncio.ensure_future(self._office_to_pdf(input_path, timeout)): [input_path]
+                for input_path in input_paths
+            }
+        else:
+            future_to_paths = {
+                submit_to_pool(
+                    self._convert_office_batch_sync,
+                    group,
                     self.soffice_path,
                     timeout
-                ) : input_path for input_path in input_paths
+                ): group for group in self._office_groups(input_paths)
             }
-            results = []
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result()
+
+        results = []
+        async for future in iter_completed(future_to_paths):
+            try:
+                data = future.result()
+                outcomes = data if isinstance(data, list) else [data]
+            except Exception as e:
+                outcomes = [{"OriginalFilePath": input_path, "Error": str(e)} for input_path in future_to_paths[future]]
+
+            for data in outcomes:
+                if "Error" not in data:
                     task = TaskConversion(
                         UserID=self.user_id,
                         ServiceTypeID=SERVICETYPEID,
@@ -943,24 +1342,184 @@ class ConversionRepository(IConversionService):
 
                     self._record_task(task)
                     results.append([task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True])
-                except Exception as e:
-                    print(f"Failed to convert {input_path}: {str(e)}")
-                    task = TaskConversion(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=Path(input_path).stem,
-                        OriginalFileSize=os.path.getsize(input_path),
-                        OriginalFilePath=input_path,
-                        InputFormat=Path(input_path).suffix.lstrip('.').upper(),
-                        OutputFormat=output_format.upper(),
-                        TaskStatus=False,
-                        TaskTime=0
-                    )
-                    self._record_task(task)
-                    results.append([task.OriginalFilePath, None, 0, False])
-        
+                    continue
+
+                input_path = data["OriginalFilePath"]
+                print(f"Failed to convert {input_path}: {data['Error']}")
+                task = TaskConversion(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=Path(input_path).stem,
+                    OriginalFileSize=os.path.getsize(input_path) if os.path.exists(input_path) else 0,
+                    OriginalFilePath=input_path,
+                    InputFormat=Path(input_path).suffix.lstrip('.').upper(),
+                    OutputFormat=output_format.upper(),
+                    TaskStatus=False,
+                    TaskTime=0
+                )
+                self._record_task(task)
+                results.append([task.OriginalFilePath, None, 0, False])
+
         return results
 
+    async def office_batches(self, input_paths: List[str]) -> List[List[str]]:
+        """
+        Split office documents into the batches to hand to
+        convert_pdf_office_batch
+
+        With the listener pool every document is its own batch, so the
+        outputs come back one by one. Without it the documents are grouped
+        per LibreOffice application and spread over the workers, each group
+        is one soffice run.
+        """
+        if await get_office_pool().start():
+            return [[input_path] for input_path in input_paths]
+
+        return self._office_groups(input_paths)
+
+    def _office_groups(self, input_paths: List[str]) -> List[List[str]]:
+        """Group documents per LibreOffice application, one group per worker at most"""
+        group_size = max(1, math.ceil(len(input_paths) / self.worker_pool.max_workers))
+
+        families: Dict[str, List[str]] = {}
+        for input_path in input_paths:
+            input_format = Path(input_path).suffix.lstrip('.').lower()
+            families.setdefault(OFFICE_FAMILIES.get(input_format, input_format), []).append(input_path)
+
+        return [
+            paths[i:i + group_size]
+            for paths in families.values()
+            for i in range(0, len(paths), group_size)
+        ]
+
+    async def _office_to_pdf(self, input_path: str, timeout: int) -> dict:
+        """
+        Office to PDF on the LibreOffice pool when it runs, otherwise one
+        soffice per document on the worker pool
+        """
+        office_pool = get_office_pool()
+        if await office_pool.start():
+            return await office_pool.convert_to_pdf(input_path, timeout)
+
+        return await self._run_in_executor(
+            self._convert_office_to_pdf_sync,
+            input_path,
+            self.soffice_path,
+            timeout
+        )
+
+    @staticmethod
+    def _is_complete_pdf(path: Path) -> bool:
+        """A PDF soffice finished writing ends with the %%EOF marker"""
+        try:
+            with open(path, 'rb') as fp:
+                fp.seek(max(0, path.stat().st_size - 1024))
+                return b'%%EOF' in fp.read()
+        except OSError:
+            return False
+
+    @staticmethod
+    def _convert_office_batch_sync(input_paths: List[str], soffice_path: str, timeout: int = 300) -> List[dict]:
+        """
+        Convert several office documents to PDF with one soffice run
+
+        The profile of this worker process is kept between runs and removed
+        when the worker exits. The inputs
+        are linked under numbered names, so two documents with the same
+        name still get their own PDF. soffice converts the documents in
+        order and is killed when no PDF came out for timeout seconds. The
+        first document without a complete PDF is the one that hung, it
+        fails alone and the documents after it get a new run.
+
+        Returns:
+        --------
+            List[dict]: per input the fields of _convert_office_to_pdf_sync,
+                or OriginalFilePath and Error when it failed
+        """
+        profile_dir = _soffice_profile_dir()
+        outcomes: Dict[str, dict] = {}
+
+        with tempfile.TemporaryDirectory() as run_dir:
+            stage_dir = Path(run_dir) / "in"
+            out_dir = Path(run_dir) / "out"
+            stage_dir.mkdir()
+            out_dir.mkdir()
+
+            remaining = []
+            for index, input_path in enumerate(input_paths):
+                if not os.path.exists(input_path):
+                    outcomes[input_path] = {"OriginalFilePath": input_path, "Error": "File not found"}
+                    continue
+
+                staged_path = stage_dir / f"{index:03d}_{Path(input_path).name}"
+                try:
+                    os.symlink(os.path.abspath(input_path), staged_path)
+                except OSError:
+                    shutil.copyfile(input_path, staged_path)
+                remaining.append((input_path, staged_path))
+
+            while remaining:
+                outputs = {input_path: out_dir / f"{staged_path.stem}.pdf" for input_path, staged_path in remaining}
+                cmd = [
+                    soffice_path,
+                    f"-env:UserInstallation={profile_dir.absolute().as_uri()}",
+                    "--headless",
+                    "--norestore",
+                    "--convert-to", "pdf",
+                    "--outdir", str(out_dir),
+                    *[str(staged_path) for _, staged_path in remaining]
+                ]
+
+                start_time = time.perf_counter()
+                try:
+                    result = run_process_with_stall_timeout(
+                        cmd, timeout, lambda: sum(1 for output in outputs.values() if output.exists())
+                    )
+                    interrupted = result.returncode != 0
+                except subprocess.TimeoutExpired:
+                    interrupted = True
+                task_time = (time.perf_counter() - start_time) / len(remaining)
+
+                rerun = []
+                hung = False
+                for input_path, staged_path in remaining:
+                    output = outputs[input_path]
+                    if output.exists() and ConversionRepository._is_complete_pdf(output):
+                        final_output = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+                        final_output.close()
+                        shutil.move(str(output), final_output.name)
+
+                        outcomes[input_path] = {
+                            "OriginalFileName": Path(input_path).stem,
+                            "OriginalFileSize": os.path.getsize(input_path),
+                            "OriginalFilePath": input_path,
+                            "OutputFileName": Path(final_output.name).stem,
+                            "OutputFileSize": os.path.getsize(final_output.name),
+                            "OutputFilePath": final_output.name,
+                            "TaskStatus": True,
+                            "InputFormat": Path(input_path).suffix.lstrip('.').upper(),
+                            "OutputFormat": 'pdf',
+                            "TaskTime": task_time
+                        }
+                    elif interrupted and not hung:
+                        hung = True
+                        outcomes[input_path] = {
+                            "OriginalFilePath": input_path,
+                            "Error": f"Soffice stopped on this document (timeout {timeout}s)"
+                        }
+                    elif interrupted:
+                        # Never reached, soffice stopped on an earlier document
+                        rerun.append((input_path, staged_path))
+                    else:
+                        outcomes[input_path] = {
+                            "OriginalFilePath": input_path,
+                            "Error": "Soffice did not produce a PDF"
+                        }
+
+                remaining = rerun
+
+        return [outcomes[input_path] for input_path in input_paths]
+
     @staticmethod
     def _convert_office_to_pdf_sync(input_path: str, soffice_path: str, timeout: int = 300) -> dict:
         """
@@ -1008,14 +1567,8 @@ class ConversionRepository(IConversionService):
                     str(input_path)
                 ]
 
-                # 4. Thực thi lệnh (Thay thế multiprocessing)
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True, # Bắt log stdout/stderr
-                    text=True,
-                    timeout=timeout,
-                    check=False
-                )
+                # 4. Thực thi lệnh, timeout sẽ kill cả soffice.bin con
+                result = run_process(cmd, timeout=timeout, text=True)
 
                 if result.returncode != 0:
                     # Gộp stderr vào lỗi để debug dễ hơn
@@ -1065,4 +1618,206 @@ class ConversionRepository(IConversionService):
             "TaskTime": end_time - start_time
         }
 
-    
\ No newline at end of file
+    
+
+    #================ PDF PAGES ================
+
+    @property
+    def _get_pdftoppm_path(self) -> str:
+        """
+        Get the pdftoppm path, poppler renders the PDF pages
+        """
+        pdftoppm_path = pdftoppm_path_for(Path(__file__).parent.parent.parent.parent / 'bin' / 'Debug' / 'net9.0-windows')
+
+        if pdftoppm_path is None:
+            raise FileNotFoundError(
+                "pdftoppm executable not found. Please install poppler (poppler-utils)"
+            )
+
+        return pdftoppm_path
+
+    async def pdf_pages(self, input_path: str, pages: Optional[str] = None) -> List[int]:
+        """
+        Page numbers of a PDF selected by a page range
+
+        Parameters:
+        -----------
+            input_path(str): the PDF
+            pages(str): optional range such as "1-3,5,10-", every page when None
+
+        Returns:
+        --------
+            List[int]: 1 based page numbers in the order of the range
+
+        Raises:
+        -------
+            FileNotFoundError: if the PDF or poppler is missing
+            ValueError: if the file is not a readable PDF or the range selects no page
+        """
+        self._verify_path(input_path)
+
+        pdfinfo_path = pdfinfo_path_for(self._get_pdftoppm_path)
+        if pdfinfo_path is None:
+            raise FileNotFoundError("pdfinfo executable not found. Please install poppler (poppler-utils)")
+
+        try:
+            # A pool task like the pages, so a cancelled request kills pdfinfo too
+            page_count = await run_in_pool(pdf_page_count, input_path, pdfinfo_path)
+        except subprocess.TimeoutExpired as e:
+            raise ValueError(f"Failed to read the pages of {Path(input_path).name}") from e
+
+        return parse_page_range(pages, page_count)
+
+    def convert_pdf_pages(
+        self,
+        input_path: str,
+        page_numbers: List[int],
+        output_format: str,
+        dpi: int,
+        effort: Optional[str] = None,
+        timeout: int = 120,
+        window: Optional[asyncio.Semaphore] = None
+    ) -> List[asyncio.Task]:
+        """
+        Render pages of a PDF to images, one worker pool task per page
+
+        Every page is rendered on its own, so a worker only holds the raster
+        of the page it works on and the pages can be streamed as they finish.
+        At most window pages are submitted to the pool at a time, so a long
+        PDF does not queue all of its pages at once. The pages run as tasks
+        whether or not the caller awaits them, and the PDF is recorded as
+        one task once every page ended, rendered, failed or cancelled.
+
+        Parameters:
+        -----------
+            input_path(str): the PDF
+            page_numbers(List[int]): pages from pdf_pages
+            output_format(str): png, jpg, webp or tiff
+            dpi(int): render resolution
+            effort(str): encoder effort profile of WebP, IMAGE_EFFORT_DEFAULT when None
+            timeout(int): timeout per page in seconds
+            window(asyncio.Semaphore): pages in flight, shared by the PDFs of
+                a request, one per pool worker when None
+
+        Returns:
+        --------
+            List[asyncio.Task]: per page a batch result [(page_name, output_path, size, success)],
+                page_name is "<pdf name>_page_<number>"
+        """
+        output_format = output_format.lstrip('.').lower()
+        effort = resolve_effort(effort)
+        pdftoppm_path = self._get_pdftoppm_path
+
+        stem = Path(input_path).stem
+        digits = len(str(max(page_numbers)))
+        if window is None:
+            window = asyncio.Semaphore(self.worker_pool.max_workers)
+
+        start_time = time.perf_counter()
+        remaining = len(page_numbers)
+        output_sizes: List[int] = []
+
+        async def page_result(page: int) -> List[Tuple[str, str, int, bool]]:
+            nonlocal remaining
+            page_name = f"{stem}_page_{page:0{digits}d}"
+
+            try:
+                async with window:
+                    output_path = await submit_to_pool(
+                        self._render_pdf_page_sync,
+                        input_path,
+                        page,
+                        output_format,
+                        dpi,
+                        pdftoppm_path,
+                        effort,
+                        timeout
+                    )
+                output_size = os.path.getsize(output_path)
+                output_sizes.append(output_size)
+                return [(page_name, output_path, output_size, True)]
+            except Exception as e:
+                print(f"Failed to render page {page} of {input_path}: {str(e)}")
+                return [(page_name, None, 0, False)]
+            finally:
+                remaining -= 1
+                if remaining == 0:
+                    self._record_task(TaskConversion(
+                        UserID=self.user_id,
+                        ServiceTypeID=SERVICETYPEID,
+                        OriginalFileName=stem,
+                        OriginalFileSize=os.path.getsize(input_path),
+                        OriginalFilePath=input_path,
+                        OutputFileName=f"{stem}_pages",
+                        OutputFileSize=sum(output_sizes),
+                        InputFormat='PDF',
+                        OutputFormat=output_format.upper(),
+                        TaskStatus=len(output_sizes) == len(page_numbers),
+                        TaskTime=time.perf_counter() - start_time
+                    ))
+
+        return [asyncio.ensure_future(page_result(page)) for page in page_numbers]
+
+    @staticmethod
+    def _render_pdf_page_sync(
+        input_path: str,
+        page: int,
+        output_format: str,
+        dpi: int,
+        pdftoppm_path: str,
+        effort: str = "max",
+        timeout: int = 120
+    ) -> str:
+        """
+        Render one page of a PDF with pdftoppm, runs in the worker pool
+
+        PNG, JPEG and TIFF come straight from pdftoppm, the other formats
+        are re-encoded from its PNG with Pillow.
+
+        Returns:
+        --------
+            str: path of the temp image
+
+        Raises:
+        -------
+            TimeoutError: if the page did not render in time
+            ValueError: if pdftoppm failed
+        """
+        render_format = PDFTOPPM_FORMATS.get(output_format, '-png')
+
+        with tempfile.TemporaryDirectory() as run_dir:
+            prefix = Path(run_dir) / "page"
+            cmd = [
+                pdftoppm_path,
+                '-f', str(page),
+                '-l', str(page),
+                '-r', str(dpi),
+                '-singlefile',
+                render_format
+            ]
+            if render_format == '-jpeg':
+                cmd += ['-jpegopt', 'quality=90,optimize=y']
+            cmd += [input_path, str(prefix)]
+
+            try:
+                result = run_process(cmd, timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                raise TimeoutError(f"Page {page} did not render within {timeout}s") from e
+
+            rendered = next(Path(run_dir).glob("page.*"), None)
+            if result.returncode != 0 or rendered is None or rendered.stat().st_size == 0:
+                stderr = result.stderr.decode(errors='replace') if isinstance(result.stderr, bytes) else result.stderr
+                raise ValueError(f"pdftoppm failed on page {page}: {(stderr or '').strip()[-500:]}")
+
+            output_path = ConversionRepository.create_temp_output_file(f'.{output_format}')
+            try:
+                if output_format in PDFTOPPM_FORMATS:
+                    shutil.move(str(rendered), output_path)
+                else:
+                    with Image.open(rendered) as image:
+                        image.save(output_path, format=output_format.upper(), **pillow_save_args(output_format, effort))
+            except Exception:
+                os.unlink(output_path)
+                raise
+
+        return output_path
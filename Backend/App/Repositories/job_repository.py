@@ -0,0 +1,215 @@
+"""Job repository"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+import redis
+
+from Services.job_service import IJobService
+from Schemas.job import JobSubmit, JobStatus, JobFileResult
+from Core.cancellation import cancel
+from Helpers.upload_spool import hold_spooled
+from config import settings
+
+JOB_KEY_PREFIX = "job:"
+JOB_QUEUE_KEY = "jobs:queue"
+# Output paths of the jobs, scored by the time they expire with their job
+JOB_OUTPUTS_KEY = "jobs:outputs"
+JOB_EVENTS_SUFFIX = ":events"
+
+# Job states after which no event follows
+FINISHED_STATES = ("completed", "failed", "cancelled")
+EVENTS_KEEPALIVE_SECONDS = 15
+
+class JobRepository(IJobService):
+    """
+    Job repository class, the job state lives in Redis
+    """
+    def __init__(self, redis_client: redis.Redis, UserID: int):
+        self.r = redis_client
+        self.user_id = UserID
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"{JOB_KEY_PREFIX}{job_id}"
+
+    @staticmethod
+    def events_channel(job_id: str) -> str:
+        """Pub/sub channel of the status and progress events of a job"""
+        return f"{JOB_KEY_PREFIX}{job_id}{JOB_EVENTS_SUFFIX}"
+
+    async def submit_job(self, job: JobSubmit) -> JobStatus:
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+
+        job_status = JobStatus(
+            job_id=job_id,
+            operation=job.operation,
+            status="queued",
+            total=len(job.input_paths),
+            created_at=now,
+            updated_at=now
+        )
+
+        # Uploaded inputs stay in the spool until the job ends
+        hold_spooled(job.input_paths, job_id)
+
+        key = self._job_key(job_id)
+        pipe = self.r.pipeline()
+        pipe.hset(key, mapping={
+            "user_id": str(self.user_id),
+            "request": job.model_dump_json(),
+            "status": job_status.model_dump_json()
+        })
+        pipe.expire(key, settings.JOB_TTL_SECONDS)
+        pipe.lpush(JOB_QUEUE_KEY, job_id)
+        pipe.execute()
+
+        return job_status
+
+    async def get_job(self, job_id: str) -> Optional[JobStatus]:
+        job = self.load_job(self.r, job_id)
+        if job is None:
+            return None
+
+        user_id, _, job_status = job
+        if user_id != self.user_id:
+            return None
+
+        return job_status
+
+    async def consume_result(self, job_id: str) -> List[JobFileResult]:
+        job_status = await self.get_job(job_id)
+        if job_status is None or job_status.status != "completed":
+            return []
+
+        # Outputs are temp files deleted after download, hand them out once
+        if not self.r.hsetnx(self._job_key(job_id), "downloaded", "1"):
+            return []
+
+        results = [result for result in job_status.results if result.success]
+        if results:
+            self.r.zrem(JOB_OUTPUTS_KEY, *[str(result.output_path) for result in results])
+
+        return results
+
+    async def cancel_job(self, job_id: str) -> Optional[JobStatus]:
+        job_status = await self.get_job(job_id)
+        if job_status is None or job_status.status in FINISHED_STATES:
+            return job_status
+
+        # The worker tier kills the running tools once it sees the mark
+        cancel(job_id, self.r)
+
+        if job_status.status == "queued":
+            # Nothing runs yet, the worker skips it when popped
+            job_status.status = "cancelled"
+            self.save_status(self.r, job_status)
+
+        return job_status
+
+    async def stream_events(self, job_id: str) -> Optional[AsyncIterator[Tuple[str, dict]]]:
+        job_status = await self.get_job(job_id)
+        if job_status is None:
+            return None
+
+        pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading the status so no event falls in between
+        await asyncio.to_thread(pubsub.subscribe, self.events_channel(job_id))
+
+        async def events() -> AsyncIterator[Tuple[str, dict]]:
+            try:
+                current = await self.get_job(job_id) or job_status
+                yield "status", current.model_dump(mode="json")
+                if current.status in FINISHED_STATES:
+                    return
+
+                last_event = time.monotonic()
+                while True:
+                    message = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
+                    if message is None:
+                        if time.monotonic() - last_event >= EVENTS_KEEPALIVE_SECONDS:
+                            last_event = time.monotonic()
+                            yield "keepalive", {}
+                        continue
+
+                    payload = json.loads(message["data"])
+                    last_event = time.monotonic()
+                    yield payload["event"], payload["data"]
+
+                    if payload["event"] == "status" and payload["data"].get("status") in FINISHED_STATES:
+                        return
+            finally:
+                await asyncio.to_thread(pubsub.close)
+
+        return events()
+
+    #================ WORKER SIDE ================
+
+    @staticmethod
+    def load_job(redis_client: redis.Redis, job_id: str) -> Optional[Tuple[int, JobSubmit, JobStatus]]:
+        """
+        Load a job without checking the owner
+
+        Returns:
+        --------
+            Tuple[int, JobSubmit, JobStatus]: (user_id, request, status) or None
+        """
+        data = redis_client.hgetall(JobRepository._job_key(job_id))
+        if not data:
+            return None
+
+        return (
+            int(data["user_id"]),
+            JobSubmit.model_validate_json(data["request"]),
+            JobStatus.model_validate_json(data["status"])
+        )
+
+    @staticmethod
+    def save_status(redis_client: redis.Redis, job_status: JobStatus) -> None:
+        """Update the stored status of a job and publish it to its subscribers"""
+        job_status.updated_at = datetime.now()
+        pipe = redis_client.pipeline()
+        pipe.hset(
+            JobRepository._job_key(job_status.job_id),
+            "status",
+            job_status.model_dump_json()
+        )
+        pipe.publish(
+            JobRepository.events_channel(job_status.job_id),
+            json.dumps({"event": "status", "data": job_status.model_dump(mode="json")})
+        )
+        pipe.execute()
+
+    @staticmethod
+    def track_outputs(redis_client: redis.Redis, output_paths: List[str]) -> None:
+        """Remember job outputs so they are deleted when the job expires undownloaded"""
+        if output_paths:
+            expires_at = time.time() + settings.JOB_TTL_SECONDS
+            redis_client.zadd(JOB_OUTPUTS_KEY, {output_path: expires_at for output_path in output_paths})
+
+    @staticmethod
+    def pop_expired_outputs(redis_client: redis.Redis) -> List[str]:
+        """Output paths of the jobs that expired, removed from the tracked outputs"""
+        now = time.time()
+        pipe = redis_client.pipeline()
+        pipe.zrangebyscore(JOB_OUTPUTS_KEY, "-inf", now)
+        pipe.zremrangebyscore(JOB_OUTPUTS_KEY, "-inf", now)
+        expired, _ = pipe.execute()
+        return expired
+
+    @staticmethod
+    def pop_next_job_id(redis_client: redis.Redis, timeout: int = 1) -> Optional[str]:
+        """
+        Block until a job id is queued or the timeout expires
+        """
+        item = redis_client.brpop([JOB_QUEUE_KEY], timeout=timeout)
+        if item is None:
+            return None
+
+        _, job_id = item
+        return job_id
@@ -4,11 +4,8 @@ Remove background repository
 
 import os
 import time
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Tuple
-import asyncio
 import tempfile
 
 from sqlalchemy.orm import Session
@@ -17,7 +14,10 @@ from PIL import Image
 
 from Services.remove_background_service import IRemoveBackgroundSerivce
 from Entities.tasks import Tasks
+from Core.rembg_session import get_rembg_session, predict_masks, cut_out, open_for_removal
+from Core.worker_pool import get_worker_pool, run_in_pool, submit_to_pool, iter_completed
 from Schemas.task import TaskRemoveBackground
+from config import settings
 
 SERVICETYPEID = 3
 class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
@@ -26,7 +26,7 @@ class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
     """
 
     def __init__(self, db:Session, UserID: int):
-        self.max_workers = max(1, multiprocessing.cpu_count() - 1)
+        self.worker_pool = get_worker_pool()
 
         self.db = db
         self.user_id = UserID
@@ -34,8 +34,7 @@ class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
     @staticmethod
     async def _run_in_executor(func, *args):
         """Helper to run sync function in executor processing"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, func, *args)
+        return await run_in_pool(func, *args)
 
     def _record_task(self, task: TaskRemoveBackground):
         """Record the task"""
@@ -83,42 +82,48 @@ class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
         return (str(task.OutputFilePath), int(task.OutputFileSize))
 
     async def remove_backgrounds_batch(self, input_paths: List[str]) -> List[Tuple[str, str, int, bool]]:
+        """
+        Remove the background of several images
+
+        The images are split in chunks of REMBG_BATCH_SIZE, every chunk runs
+        in one worker process through a single forward pass on its warm
+        rembg session.
+
+        Parameters:
+        -----------
+            input_paths(List[str]): the paths to the original files
+
+        Returns:
+        --------
+            List[Tuple[str, str, int, bool]]: List of (input_path, output_path, file_size, success)
+        """
         if not input_paths:
             return []
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(
-                    self._remove_background_sync,
-                    input_path
-                ) : input_path for input_path in input_paths
-            }
-
-            results = []
+        batch_size = max(1, settings.REMBG_BATCH_SIZE)
+        future_to_paths = {
+            submit_to_pool(
+                self._remove_backgrounds_chunk_sync,
+                input_paths[i:i + batch_size]
+            ) : input_paths[i:i + batch_size] for i in range(0, len(input_paths), batch_size)
+        }
 
-            for future in as_completed(future_to_path):
-                input_path = future_to_path[future]
-                try:
-                    data = future.result()
+        results = []
 
-                    task = TaskRemoveBackground(
-                        UserID=self.user_id,
-                        ServiceTypeID=SERVICETYPEID,
-                        OriginalFileName=data["OriginalFileName"],
-                        OriginalFileSize=data["OriginalFileSize"],
-                        OriginalFilePath=data["OriginalFilePath"],
-                        OutputFileName=data["OutputFileName"],
-                        OutputFileSize=data["OutputFileSize"],
-                        OutputFilePath=data["OutputFilePath"],
-                        TaskStatus=True,
-                        TaskTime=data["TaskTime"]
-                    )
+        async for future in iter_completed(future_to_paths):
+            try:
+                chunk_data = future.result()
+            except Exception as e:
+                chunk_data = [
+                    {"OriginalFilePath": input_path, "Error": str(e)}
+                    for input_path in future_to_paths[future]
+                ]
 
-                    self._record_task(task)
+            for data in chunk_data:
+                input_path = data["OriginalFilePath"]
 
-                    results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
-                except Exception as e:
-                    print(f"Failed to compress {input_path}: {str(e)}")
+                if "Error" in data:
+                    print(f"Failed to remove background {input_path}: {data['Error']}")
                     task = TaskRemoveBackground(
                         UserID=self.user_id,
                         ServiceTypeID=SERVICETYPEID,
@@ -131,9 +136,78 @@ class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
 
                     self._record_task(task)
                     results.append((input_path, "", 0, False))
+                    continue
+
+                task = TaskRemoveBackground(
+                    UserID=self.user_id,
+                    ServiceTypeID=SERVICETYPEID,
+                    OriginalFileName=data["OriginalFileName"],
+                    OriginalFileSize=data["OriginalFileSize"],
+                    OriginalFilePath=data["OriginalFilePath"],
+                    OutputFileName=data["OutputFileName"],
+                    OutputFileSize=data["OutputFileSize"],
+                    OutputFilePath=data["OutputFilePath"],
+                    TaskStatus=True,
+                    TaskTime=data["TaskTime"]
+                )
+
+                self._record_task(task)
+
+                results.append((task.OriginalFilePath, task.OutputFilePath, task.OutputFileSize, True))
 
         return results
 
+    @staticmethod
+    def _remove_backgrounds_chunk_sync(input_paths: List[str]) -> List[dict]:
+        """
+        Remove the background of a chunk of images with one forward pass
+
+        Returns:
+        --------
+            List[dict]: one result dict per input, the failed inputs only
+            carry OriginalFilePath and Error
+        """
+        start_time = time.perf_counter()
+
+        images = []
+        results = {}
+        for input_path in input_paths:
+            try:
+                if os.path.getsize(input_path) == 0:
+                    raise ValueError("The input file was empty")
+                images.append((input_path, open_for_removal(input_path)))
+            except Exception as e:
+                results[input_path] = {"OriginalFilePath": input_path, "Error": str(e)}
+
+        if images:
+            masks = predict_masks(get_rembg_session(), [image for _, image in images])
+            # The forward pass is shared, so is its time
+            share_time = (time.perf_counter() - start_time) / len(images)
+
+            for (input_path, image), mask in zip(images, masks):
+                item_start = time.perf_counter()
+                try:
+                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'{Path(input_path).suffix}')
+                    output_path = temp_file.name
+                    temp_file.close()
+
+                    cut_out(image, mask).save(output_path, format='PNG', optimize=True)
+
+                    results[input_path] = {
+                        "OriginalFileName": Path(input_path).stem,
+                        "OriginalFileSize": os.path.getsize(input_path),
+                        "OriginalFilePath": input_path,
+                        "OutputFileName": Path(output_path).stem,
+                        "OutputFileSize": os.path.getsize(output_path),
+                        "OutputFilePath": output_path,
+                        "TaskStatus": os.path.getsize(output_path) != 0,
+                        "TaskTime": share_time + time.perf_counter() - item_start
+                    }
+                except Exception as e:
+                    results[input_path] = {"OriginalFilePath": input_path, "Error": str(e)}
+
+        return [results[input_path] for input_path in input_paths]
+
     @staticmethod
     def _remove_background_sync(input_path: str) -> dict:
 
@@ -155,7 +229,7 @@ class RemoveBackgroundRepository(IRemoveBackgroundSerivce):
             raise ValueError(f"{input_path} can not be opened") from e
 
         try:
-            removed_image = rembg.remove(input_image)
+            removed_image = rembg.remove(input_image, session=get_rembg_session())
             if removed_image.mode != 'RGBA':
                 removed_image = removed_image.convert('RGBA')
             
@@ -0,0 +1,47 @@
+"""Job schema"""
+from typing import Optional, List, Literal, Dict, Any
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+JobOperation = Literal[
+    "convert_image",
+    "convert_video_audio",
+    "convert_gif",
+    "convert_pdf",
+    "compress_image",
+    "compress_video",
+    "compress_audio",
+    "compress_pdf",
+    "remove_background",
+]
+
+JobState = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+class JobSubmit(BaseModel):
+    operation: JobOperation
+    input_paths: List[str] = Field(..., min_length=1, max_length=50)
+    options: Dict[str, Any] = Field(default_factory=dict)
+
+class JobFileResult(BaseModel):
+    input_path: str
+    output_path: Optional[str] = None
+    output_size: int = 0
+    download_name: Optional[str] = None
+    success: bool
+    # Target size compression only
+    quality: Optional[int] = None
+    iterations: Optional[int] = None
+    target_reached: Optional[bool] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    operation: JobOperation
+    status: JobState
+    total: int
+    completed: int = 0
+    failed: int = 0
+    progress: float = 0.0
+    error: Optional[str] = None
+    results: List[JobFileResult] = Field(default_factory=list)
+    created_at: datetime
+    updated_at: datetime
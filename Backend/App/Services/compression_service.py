@@ -2,14 +2,22 @@
 compression service interface
 """
 from abc import ABC, abstractmethod
-from typing import Tuple, List
+from typing import Optional, Tuple, List
 
 class ICompressionSerivce(ABC):
     """
     A compress interface
     """
     @abstractmethod
-    async def compress_image(self, input_path: str, quality: int = 50, timeout: int = 300) -> Tuple[str, int]:
+    async def compress_image(
+        self,
+        input_path: str,
+        quality: int = 50,
+        timeout: int = 300,
+        effort: Optional[str] = None,
+        engine: Optional[str] = None,
+        target_bytes: Optional[int] = None
+    ) -> Tuple[str, int]:
         """
         Compress image file content to smaller size
 
@@ -17,6 +25,7 @@ class ICompressionSerivce(ABC):
         -----------
         input_path(str): the path of the original file
         output_path(str): the path of the converted file
+        target_bytes(int): optional, search the quality that fits this size
 
         Return:
         -------
@@ -24,7 +33,40 @@ class ICompressionSerivce(ABC):
         """
 
     @abstractmethod
-    async def compress_images_batch(self, input_paths: List[str], quality: int = 50, timeout: int = 600) -> List[Tuple[str, str, int, bool]]:
+    async def compress_image_to_target(
+        self,
+        input_path: str,
+        target_bytes: int,
+        max_quality: int = 95,
+        timeout: int = 300,
+        effort: Optional[str] = None
+    ) -> dict:
+        """
+        Compress a JPEG or WebP image to fit under a size
+
+        Parameters:
+        -----------
+            input_path(str): the path of the original file
+            target_bytes(int): the largest accepted output size
+            max_quality(int): the highest quality tried
+            timeout(int): time budget of the search in seconds
+            effort(str): optional encoder effort profile, fast, balanced or max
+
+        Returns:
+        --------
+            dict: OutputFilePath, OutputFileSize, Quality, Iterations and TargetReached
+        """
+
+    @abstractmethod
+    async def compress_images_batch(
+        self,
+        input_paths: List[str],
+        quality: int = 50,
+        timeout: int = 600,
+        effort: Optional[str] = None,
+        engine: Optional[str] = None,
+        target_bytes: Optional[int] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Compress images batch
         
@@ -33,6 +75,9 @@ class ICompressionSerivce(ABC):
             input_paths(List[str]): a list of input paths
             quality(int): the quality of the image after compressing
             timeout(int): timeout in seconds
+            effort(str): optional encoder effort profile, fast, balanced or max
+            engine(str): optional compression engine, auto, pillow or imagemagick
+            target_bytes(int): optional, search the quality that fits this size
         
         Returns:
         --------
@@ -40,7 +85,15 @@ class ICompressionSerivce(ABC):
         """
 
     @abstractmethod
-    async def compress_video(self, input_path: str, quality: str = "low", timeout: int = 600) -> Tuple[str, int]:
+    async def compress_video(
+        self,
+        input_path: str,
+        quality: str = "low",
+        timeout: int = 600,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> Tuple[str, int]:
         """
         Compress video file while maintaining format
 
@@ -54,6 +107,7 @@ class ICompressionSerivce(ABC):
             input_path(str): path to input video file
             quality(str): compression quality preset
             timeout(int): timeout in seconds
+            codec, speed, crf: optional video codec, speed preset and CRF
 
         Returns:
         --------
@@ -85,7 +139,15 @@ class ICompressionSerivce(ABC):
         """
 
     @abstractmethod
-    async def compress_videos_batch(self, input_paths: List[str], quality: str = 'low', timeout: int = 600) -> List[Tuple[str, str, int, bool]]:
+    async def compress_videos_batch(
+        self,
+        input_paths: List[str],
+        quality: str = 'low',
+        timeout: int = 600,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Compress multiple videos in parallel
 
@@ -94,6 +156,7 @@ class ICompressionSerivce(ABC):
             input_paths(List[str]): list of input video paths
             quality(str): compression quality preset
             timeout(int): timeout per file
+            codec, speed, crf: optional video codec, speed preset and CRF
 
         Returns:
         --------
@@ -118,3 +181,40 @@ class ICompressionSerivce(ABC):
     
 
 
+
+    @abstractmethod
+    async def compress_pdf(self, input_path: str, quality: str = "medium", timeout: int = 300) -> Tuple[str, int]:
+        """
+        Compress a PDF, downsampling and recompressing its images
+
+        Quality presets:
+        - "low": 72 dpi images (smallest file, screen viewing)
+        - "medium": 150 dpi images (ebook)
+        - "high": 300 dpi images (print)
+
+        Parameters:
+        -----------
+            input_path(str): path to input PDF
+            quality(str): compression quality preset
+            timeout(int): timeout in seconds
+
+        Returns:
+        --------
+            Tuple[str, int]: (output_file_path, file_size_bytes)
+        """
+
+    @abstractmethod
+    async def compress_pdfs_batch(self, input_paths: List[str], quality: str = "medium", timeout: int = 300) -> List[Tuple[str, str, int, bool]]:
+        """
+        Compress multiple PDFs in parallel
+
+        Parameters:
+        -----------
+            input_paths(List[str]): list of input PDF paths
+            quality(str): compression quality preset
+            timeout(int): timeout per file
+
+        Returns:
+        --------
+            List[Tuple[str, str, int, bool]]: (input_path, output_path, size, success)
+        """
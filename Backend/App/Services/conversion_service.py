@@ -3,14 +3,21 @@ Conversion service interface
 """
 
 from abc import ABC, abstractmethod
-from typing import Tuple, List
+from typing import List, Optional, Tuple
 
 class IConversionService(ABC):
     """
     Conversion service interface
     """
     @abstractmethod
-    async def convert_image(self, input_path: str, output_format: str) -> Tuple[str, int]:
+    async def convert_image(
+        self,
+        input_path: str,
+        output_format: str,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        effort: Optional[str] = None
+    ) -> Tuple[str, int]:
         """
         Converts image file content to out format
         
@@ -18,10 +25,19 @@ class IConversionService(ABC):
         ----------
         - file_content (bytes): image file content loaded as bytes
         - out_format (str): target output format
+        - max_width, max_height (int): optional, shrink to fit while decoding
+        - effort (str): optional encoder effort profile, fast, balanced or max
         """
 
     @abstractmethod
-    async def convert_images_batch(self, input_paths: List[str], output_format: str) -> List[Tuple[str, str, int, bool]]:
+    async def convert_images_batch(
+        self,
+        input_paths: List[str],
+        output_format: str,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        effort: Optional[str] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Convert multiple images in parallel using multiprocessing
         
@@ -29,6 +45,8 @@ class IConversionService(ABC):
         ------------
             input_paths(List[str]): list of input file paths
             output_format(str): desired output format (e.g., 'png', 'jpg')
+            max_width, max_height(int): optional, shrink to fit while decoding
+            effort(str): optional encoder effort profile, fast, balanced or max
 
         Returns:
         --------
@@ -50,7 +68,15 @@ class IConversionService(ABC):
         """
 
     @abstractmethod
-    async def convert_video_audio(self, input_path: str, output_format: str, timeout: int) -> Tuple[str, int]:
+    async def convert_video_audio(
+        self,
+        input_path: str,
+        output_format: str,
+        timeout: int,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> Tuple[str, int]:
         """
         Converts video, audio file content to out format
 
@@ -59,6 +85,7 @@ class IConversionService(ABC):
             input_path(str): contains the original file path
             output_path(str): contains the final file path
             timeout(int): timeout in second
+            codec, speed, crf: optional video codec, speed preset and CRF
         
         Return:
         -------
@@ -66,7 +93,15 @@ class IConversionService(ABC):
         """
 
     @abstractmethod 
-    async def convert_video_audio_batch(self, input_paths: List[str], output_format: str, timeout: int) -> List[Tuple[str, str, int, bool]]:
+    async def convert_video_audio_batch(
+        self,
+        input_paths: List[str],
+        output_format: str,
+        timeout: int,
+        codec: Optional[str] = None,
+        speed: Optional[str] = None,
+        crf: Optional[int] = None
+    ) -> List[Tuple[str, str, int, bool]]:
         """
         Convert multiple video/audio files in parallel using multiprocessing
         
@@ -75,6 +110,7 @@ class IConversionService(ABC):
             input_paths(List[str]): list of input file paths
             output_format(str): desired output format (e.g., 'mp4', 'mp3')
             timeout(int): maximum time in seconds per file
+            codec, speed, crf: optional video codec, speed preset and CRF
 
         Returns:
         --------
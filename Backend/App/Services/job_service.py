@@ -0,0 +1,86 @@
+"""job service interface"""
+
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional, Tuple
+
+from Schemas.job import JobSubmit, JobStatus, JobFileResult
+
+class IJobService(ABC):
+    """Job service interface"""
+
+    @abstractmethod
+    async def submit_job(self, job: JobSubmit) -> JobStatus:
+        """
+        Store a new job and push it to the queue
+
+        Parameters:
+        -----------
+            job(JobSubmit): the operation, input paths and options
+
+        Returns:
+        --------
+            JobStatus: the queued job
+        """
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> Optional[JobStatus]:
+        """
+        Get the status of a job owned by the current user
+
+        Parameters:
+        -----------
+            job_id(str): the job id
+
+        Returns:
+        --------
+            JobStatus if found else None
+        """
+
+    @abstractmethod
+    async def consume_result(self, job_id: str) -> List[JobFileResult]:
+        """
+        Get the successful outputs of a completed job and mark them downloaded
+
+        Parameters:
+        -----------
+            job_id(str): the job id
+
+        Returns:
+        --------
+            List[JobFileResult]: the successful outputs
+        """
+
+    @abstractmethod
+    async def cancel_job(self, job_id: str) -> Optional[JobStatus]:
+        """
+        Cancel a queued or running job owned by the current user
+
+        A queued job is cancelled at once, a running one once the worker
+        has stopped its files.
+
+        Parameters:
+        -----------
+            job_id(str): the job id
+
+        Returns:
+        --------
+            JobStatus if found else None, unchanged when already finished
+        """
+
+    @abstractmethod
+    async def stream_events(self, job_id: str) -> Optional[AsyncIterator[Tuple[str, dict]]]:
+        """
+        Follow the events of a job owned by the current user
+
+        The current status comes first, then a status event whenever it
+        changes and progress events while the files run. The stream ends
+        once the job is finished.
+
+        Parameters:
+        -----------
+            job_id(str): the job id
+
+        Returns:
+        --------
+            AsyncIterator of (event, data) if found else None
+        """
@@ -1,6 +1,7 @@
 """
 config module
 """
+import tempfile
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr
@@ -41,4 +42,95 @@ class Settings(BaseSettings):
 
     REDIS_PASSWORD: str
 
+    # 0 means cpu_count - 1
+    WORKER_POOL_SIZE: int = 0
+    WORKER_POOL_WARMUP: bool = True
+    WORKER_POOL_PRELOAD_REMBG: bool = False
+    WORKER_POOL_DRAIN_ON_SHUTDOWN: bool = True
+
+    # Background removal
+    REMBG_MODEL_NAME: str = "u2net"
+    # Images per forward pass in batch requests, 1 runs one process per image
+    REMBG_BATCH_SIZE: int = 4
+    # 0 keeps the ONNX Runtime default
+    REMBG_INTRA_OP_THREADS: int = 0
+
+    # Run the job queue consumer inside the API process
+    JOB_WORKER_ENABLED: bool = True
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_TTL_SECONDS: int = 24 * 60 * 60
+    # Outputs that were not downloaded are deleted once their job expired
+    JOB_OUTPUT_SWEEP_INTERVAL_SECONDS: int = 10 * 60
+
+    # Kill the external tools of a cancelled job, or of a request whose
+    # client disconnected, checked every CANCEL_POLL_SECONDS by one thread per worker process
+    CANCEL_ON_DISCONNECT: bool = True
+    CANCEL_POLL_SECONDS: float = 0.5
+
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_DIR: str = str(Path(tempfile.gettempdir()) / "converto_result_cache")
+    RESULT_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Video codec when the request does not pick one: default (MPEG4/VP8/VP9),
+    # h264, hevc or av1, and the encoder speed preset of the last three
+    VIDEO_CODEC_DEFAULT: str = "default"
+    VIDEO_SPEED_DEFAULT: str = "medium"
+
+    # Cores shared by the ffmpeg processes running at once, 0 uses every core
+    FFMPEG_THREAD_BUDGET: int = 0
+
+    # Copy the streams into the new container when they fit, instead of re-encoding
+    FFMPEG_REMUX_FAST_PATH: bool = True
+
+    # Encode one long video as keyframe-aligned segments in parallel on the
+    # worker pool: inputs from VIDEO_SEGMENT_MIN_DURATION seconds on, with
+    # segments of at least VIDEO_SEGMENT_MIN_LENGTH seconds
+    VIDEO_SEGMENT_ENABLED: bool = True
+    VIDEO_SEGMENT_MIN_DURATION: int = 300
+    VIDEO_SEGMENT_MIN_LENGTH: int = 60
+
+    # Pipe single file ffmpeg conversions into the response when the format
+    # allows it. Compressions always write a file, their response reports the
+    # compressed size and ratio
+    FFMPEG_PIPE_OUTPUT: bool = True
+
+    # Encoder effort for image outputs when the request does not pick one:
+    # fast, balanced or max (smallest files, slowest encode)
+    IMAGE_EFFORT_DEFAULT: str = "max"
+
+    # Image compression engine when the request does not pick one: auto
+    # (Pillow for JPEG/PNG/WebP/TIFF, ImageMagick for the rest), pillow or imagemagick
+    IMAGE_COMPRESSION_ENGINE: str = "auto"
+
+    # Long running LibreOffice listeners (unoserver 2.x) for office to PDF,
+    # each restarted after OFFICE_POOL_MAX_CONVERSIONS documents or a crash.
+    # Listener i takes ports OFFICE_POOL_BASE_PORT + 2i and + 2i + 1, a
+    # separate job worker tier needs its own ports and profile folder.
+    # Without unoserver every document starts its own soffice
+    OFFICE_POOL_ENABLED: bool = True
+    OFFICE_POOL_SIZE: int = 2
+    OFFICE_POOL_BASE_PORT: int = 2003
+    OFFICE_POOL_MAX_CONVERSIONS: int = 200
+    OFFICE_POOL_START_TIMEOUT: int = 60
+    OFFICE_POOL_PROFILE_DIR: str = str(Path(tempfile.gettempdir()) / "converto_office_profiles")
+
+    # Resolution of PDF pages rendered to images when the request does not
+    # pick one, and the highest a request may ask for
+    PDF_RENDER_DPI_DEFAULT: int = 150
+    PDF_RENDER_MAX_DPI: int = 600
+
+    # ffprobe results shared by the API and worker processes, keyed by path,
+    # modification time and size
+    MEDIA_PROBE_INDEX_DIR: str = str(Path(tempfile.gettempdir()) / "converto_probe_index")
+    MEDIA_PROBE_INDEX_TTL_SECONDS: int = 7 * 24 * 60 * 60
+
+    # Uploads from clients that do not share the filesystem, UPLOAD_MAX_BYTES
+    # caps the body of one upload request. The spool is swept in the
+    # background, uploads of queued jobs are kept until the job ends
+    UPLOAD_SPOOL_DIR: str = str(Path(tempfile.gettempdir()) / "converto_uploads")
+    UPLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_SPOOL_TTL_SECONDS: int = 60 * 60
+    UPLOAD_SPOOL_SWEEP_INTERVAL_SECONDS: int = 5 * 60
+
 settings = Settings() # type: ignore
@@ -1,6 +1,9 @@
 """
 Entry point for the server
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from Database.connection import get_db, r, init_db
@@ -8,19 +11,61 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 from Handlers import auth_handler, conversion_handler, compression_handler,\
-      remove_background_handler, task_handler, user_handler
+      remove_background_handler, task_handler, user_handler, job_handler, cache_handler, upload_handler
+from Core.worker_pool import get_worker_pool
+from Core.office_pool import get_office_pool
+from Core.job_worker import run_worker
+from Core.cancellation import CancelOnDisconnectMiddleware
+from Helpers.media_probe import sweep_probe_index
+from Helpers.upload_spool import run_spool_sweeper
 
 from config import settings
 
 init_db()
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Start the shared worker pool, the job consumer and the upload sweeper
+    on startup, drain them on shutdown
+    """
+    await asyncio.to_thread(sweep_probe_index)
+
+    worker_pool = get_worker_pool()
+    worker_pool.start()
+    if settings.WORKER_POOL_WARMUP:
+        await worker_pool.warm_up()
+
+    office_pool = get_office_pool()
+    if settings.OFFICE_POOL_ENABLED:
+        await office_pool.start()
+
+    stop_event = asyncio.Event()
+    spool_sweeper = asyncio.create_task(run_spool_sweeper(stop_event))
+    job_worker = None
+    if settings.JOB_WORKER_ENABLED:
+        job_worker = asyncio.create_task(run_worker(stop_event))
+
+    yield
+
+    stop_event.set()
+    if job_worker is not None:
+        await job_worker
+    await spool_sweeper
+
+    worker_pool.shutdown(wait=settings.WORKER_POOL_DRAIN_ON_SHUTDOWN)
+    office_pool.shutdown()
+
 app = FastAPI(
     title=settings.APP_NAME,
     debug=settings.DEBUG,
     description="File Conversion and Compression API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(CancelOnDisconnectMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,8 +78,11 @@ app.include_router(auth_handler.router, prefix="/api/auth", tags=["Authenticatio
 app.include_router(conversion_handler.router, prefix="/api", tags=["Service"] )
 app.include_router(compression_handler.router, prefix="/api", tags=["Service"])
 app.include_router(remove_background_handler.router, prefix="/api", tags=["Service"])
+app.include_router(upload_handler.router, prefix="/api", tags=["Service"])
 app.include_router(task_handler.router, prefix='/api', tags=["Data"])
 app.include_router(user_handler.router, prefix='/api', tags=["Data"])
+app.include_router(job_handler.router, prefix='/api', tags=["Jobs"])
+app.include_router(cache_handler.router, prefix='/api', tags=["Data"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,315 @@
+"""Test job queue file"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+import Database.connection
+import Core.job_worker
+import Helpers.subprocess_runner
+from Core.cancellation import CancelOnDisconnectMiddleware, TaskCancelled, cancel, cancellable, current_cancel_token, run_cancellable
+from Core.office_pool import OfficePool
+from Database.connection import get_redis
+from Helpers.subprocess_runner import run_process
+from Helpers.zip_stream import zip_streaming_response
+from Repositories.job_repository import JobRepository
+from config import settings
+from Schemas.job import JobStatus, JobSubmit
+from main import app
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(scope="function")
+def fake_redis(monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+
+    monkeypatch.setattr(Database.connection, "r", fake)
+    monkeypatch.setattr(Core.job_worker, "SessionLocal", TestingSessionLocal)
+    app.dependency_overrides[get_redis] = lambda: fake
+
+    yield fake
+
+    app.dependency_overrides.pop(get_redis, None)
+
+
+def _wait_for_job(client, base_url, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = client.get(f"{base_url}/api/jobs/{job_id}")
+        assert response.status_code == 200, response.text
+
+        job = response.json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.2)
+
+    raise AssertionError(f"Job {job_id} did not finish in {timeout}s")
+
+
+### submit, poll and download a job ###
+def test_convert_job(fake_redis, authorized_client, base_url, get_test_image):
+    data = {
+        "operation": "convert_image",
+        "input_paths": [get_test_image],
+        "options": {"output_format": "png"}
+    }
+
+    response = authorized_client.post(f"{base_url}/api/jobs", json=data)
+    assert response.status_code == 202, response.text
+
+    job_id = response.json()["job_id"]
+    job = _wait_for_job(authorized_client, base_url, job_id)
+
+    assert job["status"] == "completed", job
+    assert job["progress"] == 1.0
+    assert job["completed"] == 1
+
+    response = authorized_client.get(f"{base_url}/api/jobs/{job_id}/result")
+    assert response.status_code == 200, response.text
+    assert response.content[:8] == b"\x89PNG\r\n\x1a\n"
+
+    response = authorized_client.get(f"{base_url}/api/jobs/{job_id}/result")
+    assert response.status_code == 410
+
+### a target size job reports its search per file ###
+def test_target_size_job(fake_redis, authorized_client, base_url, get_test_image):
+    target_bytes = os.path.getsize(get_test_image) // 2
+    data = {
+        "operation": "compress_image",
+        "input_paths": [get_test_image],
+        "options": {"quality": 95, "target_bytes": target_bytes}
+    }
+
+    response = authorized_client.post(f"{base_url}/api/jobs", json=data)
+    assert response.status_code == 202, response.text
+
+    job = _wait_for_job(authorized_client, base_url, response.json()["job_id"])
+    assert job["status"] == "completed", job
+
+    [result] = job["results"]
+    assert result["iterations"] >= 1
+    assert result["quality"] is not None
+    assert result["target_reached"] is True
+    assert result["output_size"] <= target_bytes
+
+### unknown jobs ###
+def test_unknown_job(fake_redis, authorized_client, base_url):
+    response = authorized_client.get(f"{base_url}/api/jobs/does-not-exist")
+    assert response.status_code == 404
+
+
+### events of a finished job ###
+def test_job_events(fake_redis, authorized_client, base_url, get_test_image):
+    data = {
+        "operation": "convert_image",
+        "input_paths": [get_test_image],
+        "options": {"output_format": "png"}
+    }
+
+    response = authorized_client.post(f"{base_url}/api/jobs", json=data)
+    assert response.status_code == 202, response.text
+
+    job_id = response.json()["job_id"]
+    _wait_for_job(authorized_client, base_url, job_id)
+
+    response = authorized_client.get(f"{base_url}/api/jobs/{job_id}/events")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: status\ndata: ")
+    assert '"status": "completed"' in response.text
+
+    response = authorized_client.get(f"{base_url}/api/jobs/does-not-exist/events")
+    assert response.status_code == 404
+
+
+### cancel a queued job and a finished one ###
+def test_cancel_job(fake_redis, authorized_client, base_url, created_user, get_test_image):
+    # Stored without being queued, so the worker never picks it up
+    now = datetime.now()
+    fake_redis.hset("job:queued-job", mapping={
+        "user_id": str(created_user.UserID),
+        "request": JobSubmit(operation="convert_image", input_paths=[get_test_image]).model_dump_json(),
+        "status": JobStatus(
+            job_id="queued-job", operation="convert_image", status="queued",
+            total=1, created_at=now, updated_at=now
+        ).model_dump_json()
+    })
+
+    response = authorized_client.delete(f"{base_url}/api/jobs/queued-job")
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "cancelled"
+
+    response = authorized_client.get(f"{base_url}/api/jobs/queued-job")
+    assert response.json()["status"] == "cancelled"
+
+    response = authorized_client.get(f"{base_url}/api/jobs/queued-job/result")
+    assert response.status_code == 410
+
+    response = authorized_client.delete(f"{base_url}/api/jobs/queued-job")
+    assert response.status_code == 202
+    response = authorized_client.delete(f"{base_url}/api/jobs/does-not-exist")
+    assert response.status_code == 404
+
+
+### outputs of jobs that expired undownloaded are deleted ###
+def test_expired_job_outputs_swept(fake_redis, tmp_path, monkeypatch):
+    expired = tmp_path / "expired.png"
+    current = tmp_path / "current.png"
+    expired.write_bytes(b"expired")
+    current.write_bytes(b"current")
+
+    JobRepository.track_outputs(fake_redis, [str(current)])
+    monkeypatch.setattr(settings, "JOB_TTL_SECONDS", -1)
+    JobRepository.track_outputs(fake_redis, [str(expired)])
+
+    Core.job_worker.sweep_job_outputs(fake_redis)
+
+    assert not expired.exists()
+    assert current.exists()
+    assert JobRepository.pop_expired_outputs(fake_redis) == []
+
+
+### a client dropping a streamed ZIP stops the batches still running ###
+def test_disconnect_during_streamed_zip(fake_redis, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CANCEL_ON_DISCONNECT", True)
+    monkeypatch.setattr(settings, "CANCEL_POLL_SECONDS", 0.1)
+
+    first_output = tmp_path / "first.txt"
+    first_output.write_text("done")
+    slow_result = {}
+
+    async def quick_batch():
+        return [("first.txt", str(first_output), 4, True)]
+
+    async def slow_batch():
+        # Stands in for a pool task, run_cancellable is what the worker runs
+        try:
+            await asyncio.to_thread(run_cancellable, current_cancel_token(), run_process, ["sleep", "30"])
+        except TaskCancelled as e:
+            slow_result["error"] = e
+        return []
+
+    async def endpoint(scope, receive, send):
+        await receive()
+        response = await zip_streaming_response([quick_batch(), slow_batch()], os.path.basename, "out.zip")
+        await response(scope, receive, send)
+
+    async def scenario():
+        disconnected = asyncio.Event()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            # Drop the connection once the first file is on its way
+            if message["type"] == "http.response.body" and message.get("body"):
+                disconnected.set()
+
+        scope = {"type": "http", "method": "POST", "path": "/api/convert_to/image", "headers": [], "query_string": b""}
+        request = asyncio.create_task(CancelOnDisconnectMiddleware(endpoint)(scope, receive, send))
+
+        deadline = time.time() + 10
+        while not Helpers.subprocess_runner._running_pids and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        pids = set(Helpers.subprocess_runner._running_pids)
+        assert pids, "the slow batch did not start its process"
+
+        await request
+        while (Helpers.subprocess_runner._running_pids or "error" not in slow_result) and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        return pids
+
+    pids = asyncio.run(scenario())
+
+    assert not Helpers.subprocess_runner._running_pids
+    for pid in pids:
+        with pytest.raises(ProcessLookupError):
+            os.killpg(pid, 0)
+    assert "error" in slow_result
+
+
+### only the service routes get a cancel token ###
+def test_cancel_token_routes(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CANCEL_ON_DISCONNECT", True)
+    tokens = {}
+
+    async def endpoint(scope, receive, send):
+        tokens[scope["path"]] = current_cancel_token()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def scenario():
+        for path in ("/api/compress/video", "/api/upload/convert_to/pdf", "/api/auth/login", "/api/jobs"):
+            scope = {"type": "http", "method": "POST", "path": path, "headers": [], "query_string": b""}
+            await CancelOnDisconnectMiddleware(endpoint)(scope, receive, send)
+
+    asyncio.run(scenario())
+
+    assert tokens["/api/compress/video"] is not None
+    assert tokens["/api/upload/convert_to/pdf"] is not None
+    assert tokens["/api/auth/login"] is None
+    assert tokens["/api/jobs"] is None
+
+
+### cancelling a job stops the LibreOffice listener converting its document ###
+def test_office_listener_cancelled(fake_redis, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CANCEL_POLL_SECONDS", 0.05)
+
+    document = tmp_path / "report.docx"
+    document.write_bytes(b"document")
+
+    class StuckListener:
+        """Stands in for an OfficeListener whose document never finishes"""
+        index = 0
+
+        def __init__(self):
+            self.cancelled = False
+            self.killed = threading.Event()
+            self.restarts = 0
+
+        def convert(self, input_path, output_path, timeout):
+            self.cancelled = False
+            self.killed.wait(10)
+            raise ValueError("LibreOffice conversion was cancelled")
+
+        def cancel(self):
+            self.cancelled = True
+            self.killed.set()
+
+        def restart(self):
+            self.restarts += 1
+
+    listener = StuckListener()
+    pool = OfficePool(1)
+
+    async def scenario():
+        pool._idle = asyncio.Queue()
+        pool._idle.put_nowait(listener)
+
+        with cancellable("office-job"):
+            conversion = asyncio.ensure_future(pool.convert_to_pdf(str(document), 60))
+
+        await asyncio.sleep(0.2)
+        cancel("office-job")
+
+        with pytest.raises(TaskCancelled):
+            await conversion
+        return pool._idle.qsize()
+
+    assert asyncio.run(scenario()) == 1
+    assert listener.killed.is_set()
+    assert listener.restarts == 1
@@ -1,5 +1,17 @@
 """Test main service file"""
+import io
+import json
 import os 
+import shutil
+import sqlite3
+import zipfile
+
+import pytest
+from PIL import Image
+
+import Core.result_cache
+from Core.result_cache import ResultCache
+from config import settings
 
 
 def test_converter(authorized_client , base_url, get_test_image):
@@ -35,6 +47,50 @@ def test_compressor(authorized_client, base_url, get_test_image):
     except Exception as e:
         assert 1 == 2, f"Compress image failed: {str(e)}"
 
+def test_compressor_target_size(authorized_client, base_url, get_test_image):
+
+    target_bytes = os.path.getsize(get_test_image) // 2
+
+    data = {
+        "input_paths": [
+            get_test_image
+        ],
+        "quality": 95,
+        "target_bytes": target_bytes
+    }
+
+    response = authorized_client.post(f"{base_url}/api/compress/image", json=data)
+    assert response.status_code == 200, response.text
+
+    assert int(response.headers["X-Compression-Iterations"]) >= 1
+    # Half the size of the fixture is well above what quality 5 gives
+    assert response.headers["X-Target-Reached"] == "true"
+    assert len(response.content) <= target_bytes
+
+def test_pillow_strips_metadata(authorized_client, base_url, get_test_image, tmp_path):
+
+    with Image.open(get_test_image) as image:
+        pixels = image.convert("RGB")
+
+    png_path = tmp_path / "profile.png"
+    pixels.save(png_path, icc_profile=b"not a real profile")
+    tiff_path = tmp_path / "tagged.tiff"
+    pixels.save(tiff_path, tiffinfo={700: b"<x:xmpmeta/>", 33723: b"iptc"})
+
+    for input_path in (png_path, tiff_path):
+        response = authorized_client.post(
+            f"{base_url}/api/compress/image",
+            json={"input_paths": [str(input_path)], "quality": 90, "engine": "pillow"}
+        )
+        assert response.status_code == 200, response.text
+
+        with Image.open(io.BytesIO(response.content)) as compressed:
+            assert "icc_profile" not in compressed.info
+            assert not compressed.getexif()
+            if compressed.format == "TIFF":
+                assert 700 not in compressed.tag_v2
+                assert 33723 not in compressed.tag_v2
+
 def test_removebg(authorized_client, base_url, get_test_image):
 
     data = {
@@ -49,3 +105,209 @@ def test_removebg(authorized_client, base_url, get_test_image):
         assert response.status_code == 200, response.text 
     except Exception as e:
         assert 1 == 2, f"Compress image failed: {str(e)}"
+
+def test_converter_cache_hit(authorized_client, base_url, get_test_image, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+
+    data = {
+        "input_paths": [
+            get_test_image
+        ],
+        "output_format": "png"
+    }
+
+    first = authorized_client.post(f"{base_url}/api/convert_to/image", json=data)
+    assert first.status_code == 200, first.text
+
+    hits_before = authorized_client.get(f"{base_url}/api/cache/stats").json().get("hits", 0)
+
+    second = authorized_client.post(f"{base_url}/api/convert_to/image", json=data)
+    assert second.status_code == 200, second.text
+    assert second.content == first.content
+
+    stats = authorized_client.get(f"{base_url}/api/cache/stats").json()
+    assert stats["enabled"]
+    assert stats["hits"] == hits_before + 1
+
+def test_converter_batch_zip(authorized_client, base_url, get_test_image, tmp_path):
+    input_paths = []
+    for name in ("first.jpg", "second.jpg"):
+        shutil.copyfile(get_test_image, tmp_path / name)
+        input_paths.append(str(tmp_path / name))
+
+    data = {
+        "input_paths": input_paths,
+        "output_format": "png"
+    }
+
+    response = authorized_client.post(f"{base_url}/api/convert_to/image", json=data)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == ["first.png", "manifest.json", "second.png"]
+        # PNG is already compressed so it is stored as is
+        assert archive.getinfo("first.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("second.png").compress_type == zipfile.ZIP_STORED
+
+        manifest = json.loads(archive.read("manifest.json"))
+        assert manifest["X-Total-Files"] == 2
+        assert manifest["X-Failed-Files"] == 0
+        assert manifest["X-Total-Original-Size"] == 2 * os.path.getsize(get_test_image)
+        assert manifest["X-Total-Converted-Size"] == archive.getinfo("first.png").file_size + archive.getinfo("second.png").file_size
+
+def test_upload_converter(authorized_client, base_url, get_test_image):
+
+    with open(get_test_image, "rb") as fp:
+        response = authorized_client.post(
+            f"{base_url}/api/upload/convert_to/image",
+            files=[("files", ("test_img.jpg", fp, "image/jpeg"))],
+            data={"output_format": "png"}
+        )
+
+    assert response.status_code == 200, response.text
+    assert response.content.startswith(b"\x89PNG")
+
+def test_raw_upload(authorized_client, base_url, get_test_image):
+
+    with open(get_test_image, "rb") as fp:
+        content = fp.read()
+
+    def chunks():
+        for i in range(0, len(content), 4096):
+            yield content[i:i + 4096]
+
+    response = authorized_client.post(
+        f"{base_url}/api/uploads",
+        params={"filename": "../test_img.jpg"},
+        content=chunks()
+    )
+    assert response.status_code == 201, response.text
+
+    upload = response.json()
+    assert upload["size"] == len(content)
+    assert os.path.basename(upload["input_path"]) == "test_img.jpg"
+
+    response = authorized_client.post(
+        f"{base_url}/api/convert_to/image",
+        json={"input_paths": [upload["input_path"]], "output_format": "png"}
+    )
+    assert response.status_code == 200, response.text
+
+def test_upload_limits(authorized_client, base_url, get_test_image, monkeypatch):
+
+    with open(get_test_image, "rb") as fp:
+        content = fp.read()
+
+    # Same file count limit as POST /convert_to/image
+    response = authorized_client.post(
+        f"{base_url}/api/upload/convert_to/image",
+        files=[("files", (f"img_{i}.jpg", content, "image/jpeg")) for i in range(6)],
+        data={"output_format": "png"}
+    )
+    assert response.status_code == 400, response.text
+
+    # The body is refused while it streams in, before the form is parsed
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", len(content) // 2)
+    response = authorized_client.post(
+        f"{base_url}/api/upload/convert_to/image",
+        files=[("files", ("test_img.jpg", content, "image/jpeg"))],
+        data={"output_format": "png"}
+    )
+    assert response.status_code == 413, response.text
+
+def test_pdf_to_images(authorized_client, base_url, get_test_image, tmp_path):
+    if shutil.which("pdftoppm") is None:
+        pytest.skip("poppler is not installed")
+
+    pdf_path = tmp_path / "manual.pdf"
+    with Image.open(get_test_image) as image:
+        pages = [image.convert("RGB") for _ in range(3)]
+    pages[0].save(pdf_path, format="PDF", save_all=True, append_images=pages[1:])
+
+    data = {
+        "input_paths": [str(pdf_path)],
+        "output_format": "png",
+        "pages": "1,3",
+        "dpi": 72
+    }
+
+    response = authorized_client.post(f"{base_url}/api/convert_to/pdf", json=data)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["manifest.json", "manual_page_1.png", "manual_page_3.png"]
+        assert archive.read("manual_page_1.png").startswith(b"\x89PNG")
+
+    data["pages"] = "2"
+    data["output_format"] = "webp"
+    response = authorized_client.post(f"{base_url}/api/convert_to/pdf", json=data)
+    assert response.status_code == 200, response.text
+    assert response.content[8:12] == b"WEBP"
+
+    data["pages"] = "7-9"
+    response = authorized_client.post(f"{base_url}/api/convert_to/pdf", json=data)
+    assert response.status_code == 400
+
+def test_pdf_compressor(authorized_client, base_url, get_test_image, tmp_path):
+    response = authorized_client.post(
+        f"{base_url}/api/compress/pdf",
+        json={"input_paths": [get_test_image], "quality": "medium"}
+    )
+    assert response.status_code == 400
+
+    if shutil.which("gs") is None:
+        pytest.skip("Ghostscript is not installed")
+
+    pdf_path = tmp_path / "scan.pdf"
+    with Image.open(get_test_image) as image:
+        image.convert("RGB").resize((2480, 3508)).save(pdf_path, format="PDF", resolution=300, quality=95)
+
+    response = authorized_client.post(
+        f"{base_url}/api/compress/pdf",
+        json={"input_paths": [str(pdf_path)], "quality": "low"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.content.startswith(b"%PDF")
+    assert len(response.content) <= os.path.getsize(pdf_path)
+
+def test_corrupt_media_rejected(authorized_client, base_url, get_test_image, tmp_path):
+    if shutil.which("ffprobe") is None:
+        pytest.skip("ffprobe is not installed")
+
+    broken_path = tmp_path / "broken.mp4"
+    broken_path.write_bytes(b"\x00\x00\x00\x18ftypmp42" + os.urandom(2048))
+
+    response = authorized_client.post(
+        f"{base_url}/api/convert_to/video_audio",
+        json={"input_paths": [str(broken_path)], "output_format": "mkv"}
+    )
+    assert response.status_code == 400, response.text
+    assert "broken.mp4" in response.json()["detail"]
+
+    # A still image is readable by ffprobe but has no audio to compress
+    response = authorized_client.post(
+        f"{base_url}/api/compress/audio",
+        json={"input_paths": [get_test_image], "bitrate": "128k"}
+    )
+    assert response.status_code == 400, response.text
+
+def test_result_cache_prunes_digests(tmp_path, monkeypatch):
+    monkeypatch.setattr(Core.result_cache, "MAX_DIGESTS", 2)
+    cache = ResultCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    key = None
+    for i in range(4):
+        input_path = tmp_path / f"input_{i}.bin"
+        input_path.write_bytes(os.urandom(64))
+        key = cache.make_key(str(input_path), "test", {})
+
+    output_path = tmp_path / "output.bin"
+    output_path.write_bytes(b"output")
+    cache.put(key, str(output_path), {})
+
+    with sqlite3.connect(cache.index_path) as conn:
+        paths = [row[0] for row in conn.execute("SELECT path FROM digests")]
+    assert sorted(os.path.basename(path) for path in paths) == ["input_2.bin", "input_3.bin"]
@@ -0,0 +1,618 @@
+"""Performance test file"""
+import asyncio
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import time
+
+import httpx
+import pytest
+
+from config import settings
+from main import app
+from Repositories.conversion_repository import ConversionRepository
+
+pytestmark = pytest.mark.slow
+
+# /health may get this much slower while a batch runs, a blocked event loop
+# adds the length of a whole encode
+HEALTH_LATENCY_MARGIN = 0.25
+# Noise allowed on a timing comparison whose two sides are close by design
+TIMING_TOLERANCE = 1.1
+
+
+@pytest.fixture(scope="session")
+def ffmpeg_path():
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        pytest.skip("ffmpeg is not installed")
+    return ffmpeg
+
+
+@pytest.fixture(scope="session")
+def test_video(tmp_path_factory, ffmpeg_path):
+    video_path = tmp_path_factory.mktemp("media") / "clip.mp4"
+
+    subprocess.run([
+        ffmpeg_path, "-y",
+        "-f", "lavfi", "-i", "testsrc=duration=10:size=1280x720:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=10",
+        "-shortest", "-c:v", "mpeg4", "-c:a", "aac",
+        str(video_path)
+    ], check=True, capture_output=True)
+
+    return str(video_path)
+
+
+@pytest.fixture(scope="session")
+def test_audio(tmp_path_factory, ffmpeg_path):
+    audio_path = tmp_path_factory.mktemp("media") / "tone.wav"
+
+    subprocess.run([
+        ffmpeg_path, "-y",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+        str(audio_path)
+    ], check=True, capture_output=True)
+
+    return str(audio_path)
+
+
+def _run_ffmpeg(cmd):
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False).returncode
+
+
+def _children_cpu_seconds():
+    """CPU time of the finished child processes, pool workers included once shut down"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _time_variants(label, variants, runs=1):
+    """
+    Median wall time in seconds of each variant over `runs` runs, printed
+    on one line. variants maps a name to a callable doing one run
+    """
+    timings = {}
+    for name, run in variants.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+        timings[name] = statistics.median(samples)
+
+    print(f"{label}: " + ", ".join(f"{name} {seconds*1000:.0f} ms" for name, seconds in timings.items()))
+    return timings
+
+
+async def _health_latency(client: httpx.AsyncClient) -> float:
+    start = time.perf_counter()
+    response = await client.get("/health")
+    assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+### /health stays responsive while a batch runs ###
+async def test_health_latency_during_batch(authorized_client, base_url, test_video):
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url=base_url,
+        headers=dict(authorized_client.headers),
+        timeout=None
+    ) as client:
+        idle_latencies = [await _health_latency(client) for _ in range(5)]
+
+        batch = asyncio.create_task(client.post(
+            "/api/compress/video",
+            json={"input_paths": [test_video] * 3, "quality": "low"}
+        ))
+
+        busy_latencies = []
+        while not batch.done():
+            busy_latencies.append(await _health_latency(client))
+            await asyncio.sleep(0.05)
+
+        response = await batch
+
+    assert response.status_code == 200, response.text
+    assert len(busy_latencies) > 1, "The batch blocked the event loop"
+
+    print(f"/health idle max: {max(idle_latencies)*1000:.1f} ms, busy max: {max(busy_latencies)*1000:.1f} ms")
+    assert max(busy_latencies) <= max(idle_latencies) + HEALTH_LATENCY_MARGIN, "/health latency grew while the batch was running"
+
+
+### ffmpeg launch overhead without the nested Pool(processes=1) ###
+def test_short_audio_overhead(ffmpeg_path, test_audio, tmp_path):
+    cmd = [ffmpeg_path, "-y", "-i", test_audio, "-c:a", "libmp3lame", "-b:a", "192k", str(tmp_path / "out.mp3")]
+
+    def legacy():
+        with multiprocessing.Pool(processes=1) as pool:
+            assert pool.apply_async(_run_ffmpeg, (cmd,)).get(timeout=60) == 0
+
+    def direct():
+        assert ConversionRepository._execute_subprocess(cmd, 60) == 0
+
+    timings = _time_variants("short audio conversion", {"pool": legacy, "direct": direct}, runs=5)
+
+    # The nested pool adds a process start to every conversion
+    assert timings["direct"] < timings["pool"]
+
+
+### rembg latency with a cold model vs the per-process session ###
+def test_rembg_session_reuse(get_test_image):
+    rembg = pytest.importorskip("rembg")
+    from PIL import Image
+    from Core.rembg_session import get_rembg_session
+
+    def cold():
+        with Image.open(get_test_image) as image:
+            rembg.remove(image, session=rembg.new_session(settings.REMBG_MODEL_NAME))
+
+    def warm():
+        with Image.open(get_test_image) as image:
+            rembg.remove(image, session=get_rembg_session())
+
+    # Load the model before timing the warm runs
+    get_rembg_session()
+
+    timings = _time_variants("rembg per image", {"cold model": cold, "warm session": warm}, runs=3)
+
+    # The warm session skips loading the model
+    assert timings["warm session"] < timings["cold model"]
+
+
+### Batched background removal vs one process per image ###
+def test_rembg_batched_throughput(get_test_image, tmp_path):
+    pytest.importorskip("rembg")
+    from concurrent.futures import ProcessPoolExecutor
+    from Repositories.remove_background_repository import RemoveBackgroundRepository
+
+    input_paths = []
+    for i in range(4):
+        shutil.copyfile(get_test_image, tmp_path / f"image_{i}.jpg")
+        input_paths.append(str(tmp_path / f"image_{i}.jpg"))
+
+    outputs = []
+    cpu = {}
+
+    # Fresh processes so each side pays for its own model loads
+    def per_image():
+        before = _children_cpu_seconds()
+        with ProcessPoolExecutor(max_workers=len(input_paths)) as executor:
+            outputs.extend(executor.map(RemoveBackgroundRepository._remove_background_sync, input_paths))
+        cpu["process per image"] = _children_cpu_seconds() - before
+
+    def batched():
+        before = _children_cpu_seconds()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results = executor.submit(RemoveBackgroundRepository._remove_backgrounds_chunk_sync, input_paths).result()
+        cpu["batched"] = _children_cpu_seconds() - before
+        assert all("Error" not in data for data in results)
+        outputs.extend(results)
+
+    _time_variants("4 images", {"process per image": per_image, "batched": batched})
+    print(f"4 images CPU: process per image {cpu['process per image']:.2f} s, batched {cpu['batched']:.2f} s")
+
+    for data in outputs:
+        os.unlink(data["OutputFilePath"])
+
+    # One model load for the batch instead of one per image, the per image
+    # side may still win on wall time by loading in parallel
+    assert cpu["batched"] < cpu["process per image"]
+
+
+### Piped ffmpeg output reaches the client without a temp file ###
+def test_piped_audio_conversion(authorized_client, base_url, test_audio, monkeypatch):
+    monkeypatch.setattr(settings, "FFMPEG_PIPE_OUTPUT", True)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+
+    response = authorized_client.post(
+        f"{base_url}/api/convert_to/video_audio",
+        json={"input_paths": [test_audio], "output_format": "mp3"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert "content-length" not in response.headers
+    assert int(response.headers["X-Total-Original-Size"]) == os.path.getsize(test_audio)
+    assert response.content[:3] == b"ID3" or response.content[0] == 0xFF
+
+
+### A piped output is copied into the result cache, the repeat is a file response ###
+def test_piped_conversion_cached(authorized_client, base_url, test_audio, monkeypatch):
+    monkeypatch.setattr(settings, "FFMPEG_PIPE_OUTPUT", True)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+
+    data = {"input_paths": [test_audio], "output_format": "ogg"}
+    first = authorized_client.post(f"{base_url}/api/convert_to/video_audio", json=data)
+    assert first.status_code == 200, first.text
+    assert "content-length" not in first.headers
+
+    second = authorized_client.post(f"{base_url}/api/convert_to/video_audio", json=data)
+    assert second.status_code == 200, second.text
+    assert int(second.headers["content-length"]) == len(first.content)
+    assert second.content == first.content
+
+
+def _peak_rss_convert(input_path, max_width, max_height, legacy):
+    """Run one conversion in a fresh process, return (seconds, peak RSS in KiB)"""
+    import io
+    from PIL import Image
+
+    start = time.perf_counter()
+    if legacy:
+        # Full read and full decode, then resize
+        with open(input_path, "rb") as fp:
+            image = Image.open(io.BytesIO(fp.read()))
+            image.load()
+        image.thumbnail((max_width, max_height))
+        output = ConversionRepository.create_temp_output_file(".webp")
+        image.save(output, format="WEBP")
+    else:
+        output = ConversionRepository._convert_image_sync.__wrapped__(
+            input_path, "webp", max_width, max_height, "balanced"
+        )["OutputFilePath"]
+    elapsed = time.perf_counter() - start
+
+    os.unlink(output)
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+### Downscaling a 24 MP JPEG with draft/reduce vs a full decode ###
+def test_downscale_draft_mode(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image
+
+    input_path = str(tmp_path / "camera.jpg")
+    Image.effect_mandelbrot((6000, 4000), (-2.0, -1.2, 1.0, 1.2), 64).convert("RGB").save(input_path, quality=92)
+
+    results = {}
+    for name, legacy in (("full decode", True), ("draft", False)):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[name] = executor.submit(_peak_rss_convert, input_path, 1280, 1280, legacy).result()
+
+    for name, (elapsed, peak_rss) in results.items():
+        print(f"24 MP JPEG -> 1280px WebP, {name}: {elapsed*1000:.0f} ms, peak RSS {peak_rss/1024:.0f} MiB")
+
+    assert results["draft"][0] < results["full decode"][0]
+    assert results["draft"][1] < results["full decode"][1]
+
+
+### Encode time and size of the effort profiles ###
+@pytest.mark.parametrize("output_format", ["png", "webp"])
+def test_effort_profiles(tmp_path, output_format):
+    from PIL import Image
+
+    input_path = str(tmp_path / "photo.bmp")
+    Image.effect_mandelbrot((2400, 1600), (-2.0, -1.2, 1.0, 1.2), 64).convert("RGB").save(input_path)
+
+    results = {}
+    for effort in ("fast", "balanced", "max"):
+        data = ConversionRepository._convert_image_sync.__wrapped__(input_path, output_format, None, None, effort)
+        results[effort] = (data["TaskTime"], data["OutputFileSize"])
+        os.unlink(data["OutputFilePath"])
+
+    for effort, (elapsed, size) in results.items():
+        print(f"{output_format.upper()} {effort}: {elapsed*1000:.0f} ms, {size/1024:.0f} KiB")
+
+    # max trades encode time for size
+    assert results["fast"][0] < results["max"][0]
+    assert results["max"][1] <= results["fast"][1]
+
+
+### Pillow in process vs a magick subprocess on small images ###
+@pytest.mark.parametrize("input_format", ["jpg", "png", "webp"])
+def test_compression_engines(tmp_path, input_format):
+    from PIL import Image
+    from Repositories.compression_repository import CompressionRepository
+
+    magick_path = shutil.which("magick") or shutil.which("convert")
+    if magick_path is None:
+        pytest.skip("ImageMagick is not installed")
+
+    input_paths = []
+    for i in range(20):
+        input_path = str(tmp_path / f"small_{i}.{input_format}")
+        Image.effect_mandelbrot((320, 240), (-2.0 + i * 0.05, -1.2, 1.0, 1.2), 64).convert("RGB").save(input_path)
+        input_paths.append(input_path)
+
+    engines = {
+        "imagemagick": CompressionRepository._compress_with_imagemagick_sync.__wrapped__,
+        "pillow": CompressionRepository._compress_with_pillow_sync.__wrapped__,
+    }
+
+    sizes = {}
+
+    def run_engine(name):
+        outputs = [engines[name](input_path, magick_path, 70) for input_path in input_paths]
+        sizes[name] = sum(data["OutputFileSize"] for data in outputs)
+        for data in outputs:
+            os.unlink(data["OutputFilePath"])
+
+    timings = _time_variants(
+        f"20 {input_format.upper()} images",
+        {name: lambda name=name: run_engine(name) for name in engines}
+    )
+    print(", ".join(f"{name} {size/1024:.0f} KiB" for name, size in sizes.items()))
+
+    # In process, no magick start per image
+    assert timings["pillow"] < timings["imagemagick"]
+
+
+### A full batch of ffmpeg jobs with and without the thread budget ###
+def test_ffmpeg_thread_budget(ffmpeg_path, test_video, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from Core.ffmpeg_threads import (
+        acquire_threads, release_threads, pool_task_submitted, pool_task_finished,
+        thread_budget, decoder_thread_args, encoder_thread_args
+    )
+    from Core.worker_pool import get_worker_pool
+
+    # A full batch, one job per pool worker, leased like the pool tasks do
+    worker_pool = get_worker_pool()
+    worker_pool.start()
+    jobs = max(2, worker_pool.max_workers)
+    leases = []
+
+    def encode(index, budgeted):
+        threads = acquire_threads() if budgeted else None
+        try:
+            if threads is not None:
+                leases.append(threads)
+            input_args = decoder_thread_args(threads) if threads is not None else []
+            output_args = encoder_thread_args(threads) if threads is not None else []
+            return _run_ffmpeg([
+                ffmpeg_path, "-y", *input_args, "-i", test_video,
+                "-c:v", "mpeg4", "-q:v", "5", *output_args, str(tmp_path / f"out_{index}.mp4")
+            ])
+        finally:
+            if threads is not None:
+                release_threads()
+
+    def batch(budgeted):
+        if budgeted:
+            for _ in range(jobs):
+                pool_task_submitted()
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                assert all(code == 0 for code in executor.map(encode, range(jobs), [budgeted] * jobs))
+        finally:
+            if budgeted:
+                for _ in range(jobs):
+                    pool_task_finished()
+
+    timings = _time_variants(
+        f"{jobs} parallel encodes",
+        {"unbounded": lambda: batch(False), "budgeted": lambda: batch(True)}
+    )
+    print(f"leases {leases}")
+
+    # The batch divides the budget instead of every job taking a share of its own
+    assert sum(leases) <= max(thread_budget(), jobs)
+    # and is no slower for it
+    assert timings["budgeted"] <= timings["unbounded"] * TIMING_TOLERANCE
+
+
+### Encode fps and output size of the codec/speed matrix ###
+@pytest.mark.parametrize("codec,speed", [
+    ("default", "medium"),
+    ("h264", "veryfast"), ("h264", "fast"), ("h264", "medium"), ("h264", "slow"),
+    ("hevc", "veryfast"), ("hevc", "medium"),
+    ("av1", "veryfast"), ("av1", "medium"),
+])
+def test_video_codec_matrix(ffmpeg_path, test_video, codec, speed):
+    from Helpers.video_codecs import CODEC_MATRIX, available_encoders
+
+    if codec != "default" and CODEC_MATRIX[codec]["encoder"] not in available_encoders(ffmpeg_path):
+        pytest.skip(f"{CODEC_MATRIX[codec]['encoder']} is not in this ffmpeg build")
+
+    data = ConversionRepository._convert_video_audio_sync.__wrapped__(
+        test_video, "mp4", ffmpeg_path, 300, codec, speed, None
+    )
+    os.unlink(data["OutputFilePath"])
+
+    # The clip is 10 s at 30 fps
+    fps = 300 / data["TaskTime"]
+    print(f"{codec} {speed}: {fps:.0f} fps, {data['OutputFileSize']/1024:.0f} KiB")
+
+    assert data["OutputFileSize"] > 0
+
+
+### Remux fast path vs a full transcode into a new container ###
+def test_remux_fast_path(authorized_client, base_url, test_video, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "FFMPEG_PIPE_OUTPUT", False)
+
+    def convert(name, fast_path):
+        monkeypatch.setattr(settings, "FFMPEG_REMUX_FAST_PATH", fast_path)
+        response = authorized_client.post(
+            f"{base_url}/api/convert_to/video_audio",
+            json={"input_paths": [test_video], "output_format": "mkv"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.headers["X-Conversion-Path"] == name
+
+    timings = _time_variants("MP4 -> MKV", {
+        "transcode": lambda: convert("transcode", False),
+        "remux": lambda: convert("remux", True),
+    })
+
+    # A stream copy does not decode or encode a frame
+    assert timings["remux"] < timings["transcode"]
+
+
+### One long video encoded whole vs as parallel segments ###
+def test_segmented_video_compression(authorized_client, base_url, ffmpeg_path, tmp_path, monkeypatch):
+    if shutil.which("ffprobe") is None:
+        pytest.skip("ffprobe is not installed")
+
+    video_path = tmp_path / "long.mp4"
+    subprocess.run([
+        ffmpeg_path, "-y",
+        "-f", "lavfi", "-i", "testsrc=duration=120:size=1280x720:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=120",
+        "-shortest", "-c:v", "mpeg4", "-g", "60", "-c:a", "aac",
+        str(video_path)
+    ], check=True, capture_output=True)
+
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "FFMPEG_PIPE_OUTPUT", False)
+    monkeypatch.setattr(settings, "VIDEO_SEGMENT_MIN_DURATION", 60)
+    monkeypatch.setattr(settings, "VIDEO_SEGMENT_MIN_LENGTH", 10)
+
+    def compress(name, segmented):
+        monkeypatch.setattr(settings, "VIDEO_SEGMENT_ENABLED", segmented)
+        response = authorized_client.post(
+            f"{base_url}/api/compress/video",
+            json={"input_paths": [str(video_path)], "quality": "medium"}
+        )
+        assert response.status_code == 200, response.text
+
+        output_path = tmp_path / f"{name}.mp4"
+        output_path.write_bytes(response.content)
+        duration = float(subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(output_path)],
+            check=True, capture_output=True, text=True
+        ).stdout)
+        assert abs(duration - 120) < 1
+
+    timings = _time_variants("120 s video", {
+        "whole": lambda: compress("whole", False),
+        "segmented": lambda: compress("segmented", True),
+    })
+
+    # The segments only run in parallel with cores to spare
+    if (os.cpu_count() or 1) > 2:
+        assert timings["segmented"] < timings["whole"]
+
+
+### Cold soffice per document vs the LibreOffice listener pool ###
+def test_office_pool_dispatch(tmp_path):
+    from Core.office_pool import OfficePool
+    from Repositories.conversion_repository import ConversionRepository as Repository
+
+    soffice = shutil.which("soffice")
+    if soffice is None or shutil.which("unoserver") is None:
+        pytest.skip("LibreOffice and unoserver are not installed")
+
+    documents = []
+    for index in range(5):
+        document = tmp_path / f"doc_{index}.rtf"
+        document.write_text(r"{\rtf1\ansi{\fonttbl\f0\fswiss Helvetica;}\f0\pard " + f"Page {index}" + r"\par}")
+        documents.append(str(document))
+
+    def cold(document):
+        os.unlink(Repository._convert_office_to_pdf_sync(document, soffice, 120)["OutputFilePath"])
+
+    async def pooled():
+        pool = OfficePool(1)
+        assert await pool.start()
+        try:
+            # The first document pays for loading the filters
+            os.unlink((await pool.convert_to_pdf(documents[0], 120))["OutputFilePath"])
+
+            samples = []
+            for document in documents:
+                start = time.perf_counter()
+                os.unlink((await pool.convert_to_pdf(document, 120))["OutputFilePath"])
+                samples.append(time.perf_counter() - start)
+            return statistics.median(samples)
+        finally:
+            pool.shutdown()
+
+    documents_left = iter(documents)
+    timings = _time_variants(
+        "Office to PDF per document",
+        {"cold soffice": lambda: cold(next(documents_left))},
+        runs=len(documents)
+    )
+    warm = asyncio.run(pooled())
+    print(f"Office to PDF per document: listener pool {warm*1000:.0f} ms")
+
+    # The listener has LibreOffice loaded already
+    assert warm < timings["cold soffice"]
+
+
+### soffice per document vs one soffice run for the batch ###
+def test_office_batch_single_run(tmp_path):
+    soffice = shutil.which("soffice")
+    if soffice is None:
+        pytest.skip("LibreOffice is not installed")
+
+    documents = []
+    for index in range(5):
+        document = tmp_path / f"doc_{index}.rtf"
+        document.write_text(r"{\rtf1\ansi{\fonttbl\f0\fswiss Helvetica;}\f0\pard " + f"Page {index}" + r"\par}")
+        documents.append(str(document))
+
+    def per_document():
+        for document in documents:
+            os.unlink(ConversionRepository._convert_office_to_pdf_sync(document, soffice, 120)["OutputFilePath"])
+
+    def one_run():
+        outcomes = ConversionRepository._convert_office_batch_sync(documents, soffice, 120)
+        assert [outcome["OriginalFilePath"] for outcome in outcomes] == documents
+        for outcome in outcomes:
+            assert "Error" not in outcome, outcome
+            os.unlink(outcome["OutputFilePath"])
+
+    timings = _time_variants(
+        f"Office to PDF for {len(documents)} documents",
+        {"soffice per document": per_document, "one run": one_run}
+    )
+
+    # LibreOffice starts once for the batch
+    assert timings["one run"] < timings["soffice per document"]
+
+
+### Size reduction and seconds per page of the PDF presets ###
+def test_pdf_compression_presets(tmp_path):
+    from PIL import Image, ImageDraw
+    from Repositories.compression_repository import CompressionRepository, PDF_QUALITY_SETTINGS
+
+    ghostscript = shutil.which("gs") or shutil.which("gswin64c")
+    if ghostscript is None:
+        pytest.skip("Ghostscript is not installed")
+
+    # Scanned style documents, A4 pages of 300 dpi photos and text like pages
+    corpus = {}
+    photo_pages = [
+        Image.effect_mandelbrot((2480, 3508), (-2.0 + i * 0.1, -1.5, 1.0, 1.5), 96).convert("RGB")
+        for i in range(8)
+    ]
+    photo_path = tmp_path / "scanned_photos.pdf"
+    photo_pages[0].save(photo_path, format="PDF", resolution=300, quality=95, save_all=True, append_images=photo_pages[1:])
+    corpus[str(photo_path)] = len(photo_pages)
+
+    text_pages = []
+    for i in range(8):
+        page = Image.new("L", (2480, 3508), 255)
+        draw = ImageDraw.Draw(page)
+        for line in range(80):
+            draw.text((200, 200 + line * 40), f"Page {i} line {line} " * 8, fill=0)
+        text_pages.append(page)
+    text_path = tmp_path / "scanned_text.pdf"
+    text_pages[0].save(text_path, format="PDF", resolution=300, save_all=True, append_images=text_pages[1:])
+    corpus[str(text_path)] = len(text_pages)
+
+    results = {}
+    for quality in PDF_QUALITY_SETTINGS:
+        original = compressed = elapsed = 0.0
+        for input_path, page_count in corpus.items():
+            data = CompressionRepository._compress_pdf_sync.__wrapped__(input_path, ghostscript, quality, 300)
+            original += data["OriginalFileSize"]
+            compressed += data["OutputFileSize"]
+            elapsed += data["TaskTime"] / page_count
+            os.unlink(data["OutputFilePath"])
+
+        results[quality] = (1 - compressed / original, elapsed / len(corpus))
+
+    for quality, (reduction, seconds_per_page) in results.items():
+        print(f"PDF {quality}: {reduction*100:.1f}% smaller, {seconds_per_page:.3f} s/page")
+
+    assert results["low"][0] >= results["medium"][0] >= results["high"][0]
+    assert results["medium"][0] > 0